@@ -0,0 +1,39 @@
+"""Add training streak and consistency columns to bruker_dashboard
+
+Revision ID: 1e6f4a9c0b27
+Revises: d8b3c6f2e914
+Create Date: 2026-10-19 14:30:44.019873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e6f4a9c0b27'
+down_revision: Union[str, None] = 'd8b3c6f2e914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('bruker_dashboard', sa.Column('forste_treningsdato', sa.Date(), nullable=True))
+    op.add_column('bruker_dashboard', sa.Column('siste_treningsdato', sa.Date(), nullable=True))
+    op.add_column('bruker_dashboard', sa.Column('navarende_streak', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('bruker_dashboard', sa.Column('lengste_streak', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('bruker_dashboard', sa.Column('treningsdager', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('bruker_dashboard', sa.Column('aktive_uker', sa.Integer(), server_default='0', nullable=False))
+
+    # Existing snapshots lack streak data; they are rebuilt lazily on next read
+    op.execute("DELETE FROM bruker_dashboard")
+
+
+def downgrade() -> None:
+    op.drop_column('bruker_dashboard', 'aktive_uker')
+    op.drop_column('bruker_dashboard', 'treningsdager')
+    op.drop_column('bruker_dashboard', 'lengste_streak')
+    op.drop_column('bruker_dashboard', 'navarende_streak')
+    op.drop_column('bruker_dashboard', 'siste_treningsdato')
+    op.drop_column('bruker_dashboard', 'forste_treningsdato')
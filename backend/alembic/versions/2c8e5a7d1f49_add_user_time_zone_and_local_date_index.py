@@ -0,0 +1,34 @@
+"""Add brukere.tidssone and local date index on ovelser_utfort
+
+Revision ID: 2c8e5a7d1f49
+Revises: 9e3a5c1f7d24
+Create Date: 2026-10-19 18:12:47.360915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c8e5a7d1f49'
+down_revision: Union[str, None] = '9e3a5c1f7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('brukere', sa.Column('tidssone', sa.String(length=64), server_default='Europe/Oslo', nullable=False))
+
+    # Same expression as app.utils.tidssone.lokal_dato for the default time zone
+    op.create_index(
+        'ix_ovelser_utfort_bruker_lokal_dato', 'ovelser_utfort',
+        ['bruker_id', sa.text("CAST(timezone('Europe/Oslo', timezone('UTC', tidspunkt)) AS DATE)")],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ovelser_utfort_bruker_lokal_dato', table_name='ovelser_utfort')
+    op.drop_column('brukere', 'tidssone')
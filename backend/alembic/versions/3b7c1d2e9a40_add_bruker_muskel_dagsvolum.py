@@ -0,0 +1,49 @@
+"""Add bruker_muskel_dagsvolum (daily per-muscle volume buckets)
+
+Revision ID: 3b7c1d2e9a40
+Revises: e5976a9f4fef
+Create Date: 2026-10-19 09:12:31.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c1d2e9a40'
+down_revision: Union[str, None] = 'e5976a9f4fef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('bruker_muskel_dagsvolum',
+    sa.Column('bruker_id', sa.Integer(), nullable=False),
+    sa.Column('muskel_id', sa.Integer(), nullable=False),
+    sa.Column('dato', sa.Date(), nullable=False),
+    sa.Column('volum', sa.DECIMAL(), nullable=False),
+    sa.ForeignKeyConstraint(['bruker_id'], ['brukere.bruker_id'], ),
+    sa.ForeignKeyConstraint(['muskel_id'], ['muskler.muskel_id'], ),
+    sa.PrimaryKeyConstraint('bruker_id', 'muskel_id', 'dato')
+    )
+
+    # Backfill buckets from existing log rows (same weighting as bruker_muskel_status)
+    op.execute("""
+        INSERT INTO bruker_muskel_dagsvolum (bruker_id, muskel_id, dato, volum)
+        SELECT
+            u.bruker_id,
+            om.muskel_id,
+            u.tidspunkt::date,
+            SUM(u.sett * u.repetisjoner * u.vekt
+                * CASE WHEN om.muskel_type = 'primar' THEN 1.0 ELSE 0.5 END)
+        FROM ovelser_utfort u
+        JOIN ovelse_muskler om ON om.ovelse_id = u.ovelse_id
+        WHERE u.tidspunkt IS NOT NULL
+        GROUP BY u.bruker_id, om.muskel_id, u.tidspunkt::date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('bruker_muskel_dagsvolum')
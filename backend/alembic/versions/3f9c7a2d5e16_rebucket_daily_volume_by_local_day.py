@@ -0,0 +1,66 @@
+"""Re-bucket bruker_muskel_dagsvolum by local day and drop dashboard snapshots
+
+Revision ID: 3f9c7a2d5e16
+Revises: 6b1d9f4e2a83
+Create Date: 2026-10-19 19:24:08.519372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c7a2d5e16'
+down_revision: Union[str, None] = '6b1d9f4e2a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_UTC_DAG = "u.tidspunkt::date"
+_LOKAL_DAG = "((u.tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE b.tidssone)::date"
+
+# Buckets up to a user's last archived day also hold archived volume,
+# which is only in the segment files, so they are left as they are
+_FRA_DAG = """
+    (SELECT MAX(s.til_tidspunkt)::date + 1 FROM arkiv_segmenter s WHERE s.bruker_id = {bruker_id})
+"""
+
+
+def _flytt_dagsvolum(fra_dag: str, til_dag: str) -> None:
+    """Move the hot table's volume from buckets keyed by fra_dag to buckets keyed by til_dag."""
+    op.execute(f"""
+        DELETE FROM bruker_muskel_dagsvolum d
+        WHERE d.dato >= COALESCE({_FRA_DAG.format(bruker_id="d.bruker_id")}, '-infinity'::date)
+    """)
+
+    # Rows whose old bucket was deleted, added to the new one (which may be
+    # a kept bucket the day before)
+    op.execute(f"""
+        INSERT INTO bruker_muskel_dagsvolum (bruker_id, muskel_id, dato, volum)
+        SELECT
+            u.bruker_id,
+            om.muskel_id,
+            {til_dag},
+            SUM(u.sett * u.repetisjoner * u.vekt
+                * CASE WHEN om.muskel_type = 'primar' THEN 1.0 ELSE 0.5 END)
+        FROM ovelser_utfort u
+        JOIN brukere b ON b.bruker_id = u.bruker_id
+        JOIN ovelse_muskler om ON om.ovelse_id = u.ovelse_id
+        WHERE {fra_dag} >= COALESCE({_FRA_DAG.format(bruker_id="u.bruker_id")}, '-infinity'::date)
+        GROUP BY 1, 2, 3
+        ON CONFLICT (bruker_id, muskel_id, dato) DO UPDATE SET
+            volum = bruker_muskel_dagsvolum.volum + EXCLUDED.volum
+    """)
+
+    # Day counts and streaks change too; snapshots are rebuilt on next read
+    op.execute("DELETE FROM bruker_dashboard")
+
+
+def upgrade() -> None:
+    _flytt_dagsvolum(_UTC_DAG, _LOKAL_DAG)
+
+
+def downgrade() -> None:
+    _flytt_dagsvolum(_LOKAL_DAG, _UTC_DAG)
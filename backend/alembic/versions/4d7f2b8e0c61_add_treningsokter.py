@@ -0,0 +1,90 @@
+"""Add treningsokter and link ovelser_utfort to sessions
+
+Revision ID: 4d7f2b8e0c61
+Revises: b6e0c3f9a172
+Create Date: 2026-10-19 16:58:33.204816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d7f2b8e0c61'
+down_revision: Union[str, None] = 'b6e0c3f9a172'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same default as OKT_PAUSE_MINUTTER in app/services/treningsokter.py
+PAUSE_MINUTTER = 90
+
+
+def upgrade() -> None:
+    op.create_table('treningsokter',
+    sa.Column('okt_id', sa.Integer(), nullable=False),
+    sa.Column('bruker_id', sa.Integer(), nullable=False),
+    sa.Column('start_tidspunkt', sa.TIMESTAMP(), nullable=False),
+    sa.Column('slutt_tidspunkt', sa.TIMESTAMP(), nullable=False),
+    sa.Column('antall_ovelser', sa.Integer(), nullable=False),
+    sa.Column('antall_logginger', sa.Integer(), nullable=False),
+    sa.Column('total_sett', sa.Integer(), nullable=False),
+    sa.Column('total_volum', sa.DECIMAL(), nullable=False),
+    sa.ForeignKeyConstraint(['bruker_id'], ['brukere.bruker_id'], ),
+    sa.PrimaryKeyConstraint('okt_id')
+    )
+    op.create_index(op.f('ix_treningsokter_okt_id'), 'treningsokter', ['okt_id'], unique=False)
+    op.create_index('ix_treningsokter_bruker_start', 'treningsokter', ['bruker_id', 'start_tidspunkt', 'okt_id'], unique=False)
+
+    op.add_column('ovelser_utfort', sa.Column('okt_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'ovelser_utfort_okt_id_fkey', 'ovelser_utfort', 'treningsokter',
+        ['okt_id'], ['okt_id'], ondelete='SET NULL'
+    )
+    op.create_index(op.f('ix_ovelser_utfort_okt_id'), 'ovelser_utfort', ['okt_id'], unique=False)
+
+    # Backfill: a new session starts after a pause longer than PAUSE_MINUTTER
+    op.execute(f"""
+        WITH merket AS (
+            SELECT
+                bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt, utfort_id,
+                CASE
+                    WHEN tidspunkt - LAG(tidspunkt) OVER (PARTITION BY bruker_id ORDER BY tidspunkt, utfort_id)
+                         <= interval '{PAUSE_MINUTTER} minutes'
+                    THEN 0 ELSE 1
+                END AS ny_okt
+            FROM ovelser_utfort
+        ),
+        gruppert AS (
+            SELECT *, SUM(ny_okt) OVER (PARTITION BY bruker_id ORDER BY tidspunkt, utfort_id) AS okt_nr
+            FROM merket
+        ),
+        okter AS (
+            INSERT INTO treningsokter (
+                bruker_id, start_tidspunkt, slutt_tidspunkt,
+                antall_ovelser, antall_logginger, total_sett, total_volum
+            )
+            SELECT
+                bruker_id, MIN(tidspunkt), MAX(tidspunkt),
+                COUNT(DISTINCT ovelse_id), COUNT(*), SUM(sett), SUM(sett * repetisjoner * vekt)
+            FROM gruppert
+            GROUP BY bruker_id, okt_nr
+            RETURNING okt_id, bruker_id, start_tidspunkt, slutt_tidspunkt
+        )
+        UPDATE ovelser_utfort u
+        SET okt_id = o.okt_id
+        FROM okter o
+        WHERE u.bruker_id = o.bruker_id
+          AND u.tidspunkt BETWEEN o.start_tidspunkt AND o.slutt_tidspunkt
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ovelser_utfort_okt_id'), table_name='ovelser_utfort')
+    op.drop_constraint('ovelser_utfort_okt_id_fkey', 'ovelser_utfort', type_='foreignkey')
+    op.drop_column('ovelser_utfort', 'okt_id')
+    op.drop_index('ix_treningsokter_bruker_start', table_name='treningsokter')
+    op.drop_index(op.f('ix_treningsokter_okt_id'), table_name='treningsokter')
+    op.drop_table('treningsokter')
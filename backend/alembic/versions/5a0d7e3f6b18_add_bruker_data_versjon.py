@@ -0,0 +1,26 @@
+"""Add brukere.data_versjon (per-user data version for ETags)
+
+Revision ID: 5a0d7e3f6b18
+Revises: c4e9f0a1b2d3
+Create Date: 2026-10-19 12:26:58.340117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a0d7e3f6b18'
+down_revision: Union[str, None] = 'c4e9f0a1b2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('brukere', sa.Column('data_versjon', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('brukere', 'data_versjon')
@@ -0,0 +1,42 @@
+"""Add arkiv_segmenter manifest for archived log rows
+
+Revision ID: 6b1d9f4e2a83
+Revises: 2c8e5a7d1f49
+Create Date: 2026-10-19 18:47:20.731644
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1d9f4e2a83'
+down_revision: Union[str, None] = '2c8e5a7d1f49'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('arkiv_segmenter',
+    sa.Column('segment_id', sa.Integer(), nullable=False),
+    sa.Column('bruker_id', sa.Integer(), nullable=False),
+    sa.Column('fil', sa.String(length=255), nullable=False),
+    sa.Column('fra_tidspunkt', sa.TIMESTAMP(), nullable=False),
+    sa.Column('til_tidspunkt', sa.TIMESTAMP(), nullable=False),
+    sa.Column('antall_rader', sa.Integer(), nullable=False),
+    sa.Column('bytes', sa.BigInteger(), nullable=False),
+    sa.Column('opprettet', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['bruker_id'], ['brukere.bruker_id'], ),
+    sa.PrimaryKeyConstraint('segment_id'),
+    sa.UniqueConstraint('fil')
+    )
+    op.create_index(op.f('ix_arkiv_segmenter_segment_id'), 'arkiv_segmenter', ['segment_id'], unique=False)
+    op.create_index('ix_arkiv_segmenter_bruker_fra', 'arkiv_segmenter', ['bruker_id', 'fra_tidspunkt'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_arkiv_segmenter_bruker_fra', table_name='arkiv_segmenter')
+    op.drop_index(op.f('ix_arkiv_segmenter_segment_id'), table_name='arkiv_segmenter')
+    op.drop_table('arkiv_segmenter')
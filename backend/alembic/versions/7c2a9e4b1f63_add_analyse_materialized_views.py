@@ -0,0 +1,68 @@
+"""Add materialized views for admin analytics
+
+Revision ID: 7c2a9e4b1f63
+Revises: 1e6f4a9c0b27
+Create Date: 2026-10-19 15:05:12.347716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2a9e4b1f63'
+down_revision: Union[str, None] = '1e6f4a9c0b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Each view needs a unique index to be refreshed CONCURRENTLY
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_analyse_ovelse_bruk AS
+        SELECT
+            o.ovelse_id,
+            o.ovelse_navn,
+            COUNT(u.utfort_id) AS antall_logginger,
+            COUNT(DISTINCT u.bruker_id) AS antall_brukere,
+            MAX(u.tidspunkt) AS sist_brukt
+        FROM ovelser o
+        JOIN ovelser_utfort u ON u.ovelse_id = o.ovelse_id
+        GROUP BY o.ovelse_id, o.ovelse_navn
+    """)
+    op.create_index('ux_mv_analyse_ovelse_bruk', 'mv_analyse_ovelse_bruk', ['ovelse_id'], unique=True)
+
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_analyse_aktive_brukere_per_dag AS
+        SELECT
+            tidspunkt::date AS dato,
+            COUNT(DISTINCT bruker_id) AS aktive_brukere,
+            COUNT(*) AS antall_logginger,
+            SUM(sett * repetisjoner * vekt) AS total_volum
+        FROM ovelser_utfort
+        GROUP BY tidspunkt::date
+    """)
+    op.create_index('ux_mv_analyse_aktive_brukere_per_dag', 'mv_analyse_aktive_brukere_per_dag', ['dato'], unique=True)
+
+    # Built from the daily buckets rather than the raw log
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_analyse_muskel_volum AS
+        SELECT
+            m.muskel_id,
+            m.muskel_navn,
+            m.hovedkategori,
+            SUM(d.volum) AS total_volum,
+            COUNT(DISTINCT d.bruker_id) AS antall_brukere
+        FROM muskler m
+        JOIN bruker_muskel_dagsvolum d ON d.muskel_id = m.muskel_id
+        GROUP BY m.muskel_id, m.muskel_navn, m.hovedkategori
+    """)
+    op.create_index('ux_mv_analyse_muskel_volum', 'mv_analyse_muskel_volum', ['muskel_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_analyse_muskel_volum")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_analyse_aktive_brukere_per_dag")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_analyse_ovelse_bruk")
@@ -0,0 +1,60 @@
+"""Add personlige_rekorder (personal records index)
+
+Revision ID: 8f21a6c4d5e7
+Revises: 3b7c1d2e9a40
+Create Date: 2026-10-19 10:03:47.552910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f21a6c4d5e7'
+down_revision: Union[str, None] = '3b7c1d2e9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('personlige_rekorder',
+    sa.Column('bruker_id', sa.Integer(), nullable=False),
+    sa.Column('ovelse_id', sa.Integer(), nullable=False),
+    sa.Column('beste_vekt', sa.DECIMAL(), nullable=False),
+    sa.Column('beste_vekt_dato', sa.TIMESTAMP(), nullable=False),
+    sa.Column('beste_e1rm', sa.DECIMAL(), nullable=False),
+    sa.Column('beste_e1rm_dato', sa.TIMESTAMP(), nullable=False),
+    sa.Column('beste_volum', sa.DECIMAL(), nullable=False),
+    sa.Column('beste_volum_dato', sa.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['bruker_id'], ['brukere.bruker_id'], ),
+    sa.ForeignKeyConstraint(['ovelse_id'], ['ovelser.ovelse_id'], ),
+    sa.PrimaryKeyConstraint('bruker_id', 'ovelse_id')
+    )
+
+    # Backfill records from existing log rows (earliest timestamp wins ties)
+    op.execute("""
+        INSERT INTO personlige_rekorder (
+            bruker_id, ovelse_id,
+            beste_vekt, beste_vekt_dato,
+            beste_e1rm, beste_e1rm_dato,
+            beste_volum, beste_volum_dato
+        )
+        SELECT
+            bruker_id,
+            ovelse_id,
+            MAX(vekt),
+            (array_agg(tidspunkt ORDER BY vekt DESC, tidspunkt))[1],
+            MAX(vekt * (1 + repetisjoner / 30.0)),
+            (array_agg(tidspunkt ORDER BY vekt * (1 + repetisjoner / 30.0) DESC, tidspunkt))[1],
+            MAX(sett * repetisjoner * vekt),
+            (array_agg(tidspunkt ORDER BY sett * repetisjoner * vekt DESC, tidspunkt))[1]
+        FROM ovelser_utfort
+        WHERE tidspunkt IS NOT NULL
+        GROUP BY bruker_id, ovelse_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('personlige_rekorder')
@@ -0,0 +1,97 @@
+"""Add change sequence and tombstones for delta sync
+
+Revision ID: 9e3a5c1f7d24
+Revises: 4d7f2b8e0c61
+Create Date: 2026-10-19 17:41:09.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3a5c1f7d24'
+down_revision: Union[str, None] = '4d7f2b8e0c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Tables synced by /api/historikk/endringer
+SYNK_TABELLER = ['ovelser_utfort', 'bruker_muskel_status', 'bruker_utstyr_profiler']
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE endring_seq AS bigint")
+
+    op.create_table('synk_slettinger',
+    sa.Column('endring_nr', sa.BigInteger(), nullable=False),
+    sa.Column('bruker_id', sa.Integer(), nullable=False),
+    sa.Column('tabell', sa.String(length=50), nullable=False),
+    sa.Column('rad_id', sa.Integer(), nullable=False),
+    sa.Column('slettet', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['bruker_id'], ['brukere.bruker_id'], ),
+    sa.PrimaryKeyConstraint('endring_nr')
+    )
+    op.create_index('ix_synk_slettinger_bruker_endring', 'synk_slettinger', ['bruker_id', 'endring_nr'], unique=False)
+
+    # Takes the user's row lock before drawing a number, so a user's
+    # writers commit in sequence order and a reader never sees a number
+    # before a smaller one of the same user is committed
+    op.execute("""
+        CREATE FUNCTION sett_endring_nr() RETURNS trigger AS $$
+        BEGIN
+            PERFORM 1 FROM brukere WHERE bruker_id = NEW.bruker_id FOR NO KEY UPDATE;
+            NEW.endring_nr := nextval('endring_seq');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    # TG_ARGV[0] is the primary key column of the deleted row
+    op.execute("""
+        CREATE FUNCTION registrer_sletting() RETURNS trigger AS $$
+        BEGIN
+            PERFORM 1 FROM brukere WHERE bruker_id = OLD.bruker_id FOR NO KEY UPDATE;
+            INSERT INTO synk_slettinger (endring_nr, bruker_id, tabell, rad_id)
+            VALUES (nextval('endring_seq'), OLD.bruker_id, TG_TABLE_NAME, (to_jsonb(OLD) ->> TG_ARGV[0])::integer);
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    for tabell in SYNK_TABELLER:
+        op.add_column(tabell, sa.Column('endring_nr', sa.BigInteger(), nullable=True))
+
+        # Existing rows get numbers in primary key order
+        op.execute(f"UPDATE {tabell} SET endring_nr = nextval('endring_seq')")
+        op.alter_column(tabell, 'endring_nr', nullable=False)
+
+        op.create_index(f'ix_{tabell}_bruker_endring', tabell, ['bruker_id', 'endring_nr'], unique=False)
+        op.execute(f"""
+            CREATE TRIGGER {tabell}_endring_nr
+            BEFORE INSERT OR UPDATE ON {tabell}
+            FOR EACH ROW EXECUTE FUNCTION sett_endring_nr()
+        """)
+
+    op.execute("""
+        CREATE TRIGGER bruker_utstyr_profiler_sletting
+        AFTER DELETE ON bruker_utstyr_profiler
+        FOR EACH ROW EXECUTE FUNCTION registrer_sletting('profil_id')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER bruker_utstyr_profiler_sletting ON bruker_utstyr_profiler")
+
+    for tabell in reversed(SYNK_TABELLER):
+        op.execute(f"DROP TRIGGER {tabell}_endring_nr ON {tabell}")
+        op.drop_index(f'ix_{tabell}_bruker_endring', table_name=tabell)
+        op.drop_column(tabell, 'endring_nr')
+
+    op.execute("DROP FUNCTION registrer_sletting()")
+    op.execute("DROP FUNCTION sett_endring_nr()")
+    op.drop_index('ix_synk_slettinger_bruker_endring', table_name='synk_slettinger')
+    op.drop_table('synk_slettinger')
+    op.execute("DROP SEQUENCE endring_seq")
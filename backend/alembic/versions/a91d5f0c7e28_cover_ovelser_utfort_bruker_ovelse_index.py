@@ -0,0 +1,32 @@
+"""Make (bruker_id, ovelse_id, tidspunkt) index on ovelser_utfort covering
+
+Revision ID: a91d5f0c7e28
+Revises: 7c2a9e4b1f63
+Create Date: 2026-10-19 15:41:27.902155
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91d5f0c7e28'
+down_revision: Union[str, None] = '7c2a9e4b1f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_ovelser_utfort_bruker_ovelse_tidspunkt', table_name='ovelser_utfort')
+    op.create_index(
+        'ix_ovelser_utfort_bruker_ovelse_tidspunkt', 'ovelser_utfort',
+        ['bruker_id', 'ovelse_id', 'tidspunkt'], unique=False,
+        postgresql_include=['sett', 'repetisjoner', 'vekt']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ovelser_utfort_bruker_ovelse_tidspunkt', table_name='ovelser_utfort')
+    op.create_index('ix_ovelser_utfort_bruker_ovelse_tidspunkt', 'ovelser_utfort', ['bruker_id', 'ovelse_id', 'tidspunkt'], unique=False)
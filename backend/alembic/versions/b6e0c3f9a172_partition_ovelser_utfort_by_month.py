@@ -0,0 +1,163 @@
+"""Convert ovelser_utfort to a table range-partitioned by month
+
+Revision ID: b6e0c3f9a172
+Revises: f3b8e61d2a95
+Create Date: 2026-10-19 16:24:05.571348
+
+The partition key must be part of the primary key, so the key becomes
+(utfort_id, tidspunkt) and tidspunkt NOT NULL. utfort_id keeps its
+sequence and stays unique in practice.
+
+Monthly partitions are created from the first logged month up to three
+months ahead; later months are created by `python manage.py partitions`
+(also run daily by the in-process scheduler). Rows outside all ranges go
+to the DEFAULT partition.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e0c3f9a172'
+down_revision: Union[str, None] = 'f3b8e61d2a95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Analytics views reading ovelser_utfort (from 7c2a9e4b1f63), recreated on the new table
+_VIEWS = {
+    "mv_analyse_ovelse_bruk": ("ovelse_id", """
+        SELECT
+            o.ovelse_id,
+            o.ovelse_navn,
+            COUNT(u.utfort_id) AS antall_logginger,
+            COUNT(DISTINCT u.bruker_id) AS antall_brukere,
+            MAX(u.tidspunkt) AS sist_brukt
+        FROM ovelser o
+        JOIN ovelser_utfort u ON u.ovelse_id = o.ovelse_id
+        GROUP BY o.ovelse_id, o.ovelse_navn
+    """),
+    "mv_analyse_aktive_brukere_per_dag": ("dato", """
+        SELECT
+            tidspunkt::date AS dato,
+            COUNT(DISTINCT bruker_id) AS aktive_brukere,
+            COUNT(*) AS antall_logginger,
+            SUM(sett * repetisjoner * vekt) AS total_volum
+        FROM ovelser_utfort
+        GROUP BY tidspunkt::date
+    """),
+}
+
+
+def _opprett_indekser_og_views() -> None:
+    op.create_index('ix_ovelser_utfort_tidspunkt', 'ovelser_utfort', ['tidspunkt'], unique=False)
+    op.create_index('ix_ovelser_utfort_utfort_id', 'ovelser_utfort', ['utfort_id'], unique=False)
+    op.create_index(
+        'ix_ovelser_utfort_bruker_ovelse_tidspunkt', 'ovelser_utfort',
+        ['bruker_id', 'ovelse_id', 'tidspunkt'], unique=False,
+        postgresql_include=['sett', 'repetisjoner', 'vekt']
+    )
+    op.create_index('ix_ovelser_utfort_bruker_tidspunkt_id', 'ovelser_utfort', ['bruker_id', 'tidspunkt', 'utfort_id'], unique=False)
+
+    for view, (nokkel, sql) in _VIEWS.items():
+        op.execute(f"CREATE MATERIALIZED VIEW {view} AS {sql}")
+        op.create_index(f'ux_{view}', view, [nokkel], unique=True)
+
+
+def upgrade() -> None:
+    for view in _VIEWS:
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view}")
+
+    op.execute("UPDATE ovelser_utfort SET tidspunkt = now() WHERE tidspunkt IS NULL")
+
+    # Keep the old table (and its sequence) aside while copying
+    op.execute("ALTER TABLE ovelser_utfort RENAME TO ovelser_utfort_gammel")
+    op.execute("ALTER TABLE ovelser_utfort_gammel RENAME CONSTRAINT ovelser_utfort_pkey TO ovelser_utfort_gammel_pkey")
+    op.execute("ALTER SEQUENCE ovelser_utfort_utfort_id_seq OWNED BY NONE")
+
+    op.execute("""
+        CREATE TABLE ovelser_utfort (
+            utfort_id INTEGER NOT NULL DEFAULT nextval('ovelser_utfort_utfort_id_seq'),
+            bruker_id INTEGER NOT NULL REFERENCES brukere (bruker_id),
+            ovelse_id INTEGER NOT NULL REFERENCES ovelser (ovelse_id),
+            sett INTEGER NOT NULL,
+            repetisjoner INTEGER NOT NULL,
+            vekt NUMERIC NOT NULL,
+            tidspunkt TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT ovelser_utfort_pkey PRIMARY KEY (utfort_id, tidspunkt)
+        ) PARTITION BY RANGE (tidspunkt)
+    """)
+    op.execute("CREATE TABLE ovelser_utfort_standard PARTITION OF ovelser_utfort DEFAULT")
+
+    # One partition per month from the first log to three months ahead
+    op.execute("""
+        DO $$
+        DECLARE
+            maned date := date_trunc('month', COALESCE((SELECT MIN(tidspunkt) FROM ovelser_utfort_gammel), now()));
+            siste date := date_trunc('month', now()) + interval '3 months';
+        BEGIN
+            WHILE maned <= siste LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF ovelser_utfort FOR VALUES FROM (%L) TO (%L)',
+                    'ovelser_utfort_p' || to_char(maned, 'YYYY_MM'),
+                    maned,
+                    (maned + interval '1 month')::date
+                );
+                maned := (maned + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+
+    op.execute("""
+        INSERT INTO ovelser_utfort (utfort_id, bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt)
+        SELECT utfort_id, bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt
+        FROM ovelser_utfort_gammel
+    """)
+
+    op.execute("DROP TABLE ovelser_utfort_gammel")
+    op.execute("ALTER SEQUENCE ovelser_utfort_utfort_id_seq OWNED BY ovelser_utfort.utfort_id")
+
+    _opprett_indekser_og_views()
+
+
+def downgrade() -> None:
+    for view in _VIEWS:
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view}")
+
+    op.execute("ALTER TABLE ovelser_utfort RENAME TO ovelser_utfort_partisjonert")
+    op.execute("ALTER TABLE ovelser_utfort_partisjonert RENAME CONSTRAINT ovelser_utfort_pkey TO ovelser_utfort_partisjonert_pkey")
+    op.execute("ALTER SEQUENCE ovelser_utfort_utfort_id_seq OWNED BY NONE")
+
+    for indeks in (
+        'ix_ovelser_utfort_tidspunkt',
+        'ix_ovelser_utfort_utfort_id',
+        'ix_ovelser_utfort_bruker_ovelse_tidspunkt',
+        'ix_ovelser_utfort_bruker_tidspunkt_id',
+    ):
+        op.drop_index(indeks, table_name='ovelser_utfort_partisjonert')
+
+    op.execute("""
+        CREATE TABLE ovelser_utfort (
+            utfort_id INTEGER NOT NULL DEFAULT nextval('ovelser_utfort_utfort_id_seq'),
+            bruker_id INTEGER NOT NULL REFERENCES brukere (bruker_id),
+            ovelse_id INTEGER NOT NULL REFERENCES ovelser (ovelse_id),
+            sett INTEGER NOT NULL,
+            repetisjoner INTEGER NOT NULL,
+            vekt NUMERIC NOT NULL,
+            tidspunkt TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
+            CONSTRAINT ovelser_utfort_pkey PRIMARY KEY (utfort_id)
+        )
+    """)
+    op.execute("""
+        INSERT INTO ovelser_utfort (utfort_id, bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt)
+        SELECT utfort_id, bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt
+        FROM ovelser_utfort_partisjonert
+    """)
+
+    # Drops all attached partitions (detached ones are left as plain tables)
+    op.execute("DROP TABLE ovelser_utfort_partisjonert")
+    op.execute("ALTER SEQUENCE ovelser_utfort_utfort_id_seq OWNED BY ovelser_utfort.utfort_id")
+
+    _opprett_indekser_og_views()
@@ -0,0 +1,39 @@
+"""Add bruker_dashboard (per-user dashboard snapshot)
+
+Revision ID: c4e9f0a1b2d3
+Revises: 8f21a6c4d5e7
+Create Date: 2026-10-19 11:41:05.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9f0a1b2d3'
+down_revision: Union[str, None] = '8f21a6c4d5e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Snapshots are built lazily on first dashboard read, so no backfill
+    op.create_table('bruker_dashboard',
+    sa.Column('bruker_id', sa.Integer(), nullable=False),
+    sa.Column('total_utforte_ovelser', sa.Integer(), nullable=False),
+    sa.Column('total_volum', sa.DECIMAL(), nullable=False),
+    sa.Column('unike_ovelser_brukt', sa.Integer(), nullable=False),
+    sa.Column('dagtellinger', sa.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('telling_dato', sa.Date(), nullable=False),
+    sa.Column('total_par', sa.Integer(), nullable=False),
+    sa.Column('balanserte_par', sa.Integer(), nullable=False),
+    sa.Column('oppdatert', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['bruker_id'], ['brukere.bruker_id'], ),
+    sa.PrimaryKeyConstraint('bruker_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('bruker_dashboard')
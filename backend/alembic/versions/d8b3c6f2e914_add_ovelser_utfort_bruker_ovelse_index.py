@@ -0,0 +1,26 @@
+"""Add (bruker_id, ovelse_id, tidspunkt) index on ovelser_utfort
+
+Revision ID: d8b3c6f2e914
+Revises: 5a0d7e3f6b18
+Create Date: 2026-10-19 13:52:10.661204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3c6f2e914'
+down_revision: Union[str, None] = '5a0d7e3f6b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_ovelser_utfort_bruker_ovelse_tidspunkt', 'ovelser_utfort', ['bruker_id', 'ovelse_id', 'tidspunkt'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ovelser_utfort_bruker_ovelse_tidspunkt', table_name='ovelser_utfort')
@@ -0,0 +1,26 @@
+"""Add (bruker_id, tidspunkt, utfort_id) index on ovelser_utfort
+
+Revision ID: f3b8e61d2a95
+Revises: a91d5f0c7e28
+Create Date: 2026-10-19 16:02:48.113590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8e61d2a95'
+down_revision: Union[str, None] = 'a91d5f0c7e28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_ovelser_utfort_bruker_tidspunkt_id', 'ovelser_utfort', ['bruker_id', 'tidspunkt', 'utfort_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ovelser_utfort_bruker_tidspunkt_id', table_name='ovelser_utfort')
@@ -4,7 +4,7 @@ Admin API endpoints
 from typing import List
 from datetime import datetime, timedelta
 import secrets
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -13,9 +13,25 @@ from app.schemas import (
     InvitasjonCreate,
     InvitasjonResponse,
     BrukerAdminResponse,
+    BrukerBelastningResponse,
+    AnalyseOvelseBrukResponse,
+    AnalyseAktiveBrukereResponse,
+    AnalyseMuskelVolumResponse,
     MessageResponse
 )
 from app.utils.security import get_current_active_admin
+from app.services.statistikk import beregn_belastning_alle_brukere
+from app.services.analyse import (
+    hent_ovelse_bruk,
+    hent_aktive_brukere_per_dag,
+    hent_muskel_volum_system,
+    analyse_statistikk
+)
+from app.utils.singleflight import statistikk_singleflight
+from app.utils.snapshot import statistikk_snapshots
+from app.utils.planlegger import planlegger
+from app.utils.hendelser import statistikk_hendelser
+from app.services.treningsramme import treningsrammer
 
 
 router = APIRouter()
@@ -299,3 +315,95 @@ async def get_system_stats(
     }
 
     return stats
+
+
+@router.get("/belastning", response_model=List[BrukerBelastningResponse])
+async def get_belastning_alle_brukere(
+    current_admin: Bruker = Depends(get_current_active_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Get acute:chronic workload ratios for all active users.
+
+    Only admins can view workload for other users.
+    Scores every user in one aggregate query, sorted by highest ratio.
+    """
+    return beregn_belastning_alle_brukere(db)
+
+
+# ============================================================================
+# SYSTEM ANALYTICS (MATERIALIZED VIEWS)
+# ============================================================================
+
+@router.get("/analyse/ovelser", response_model=AnalyseOvelseBrukResponse)
+async def get_analyse_ovelser(
+    current_admin: Bruker = Depends(get_current_active_admin),
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=500, description="Number of exercises (default 20)")
+):
+    """
+    Get the most used exercises across all users.
+
+    Only admins can view system analytics.
+    Read from a materialized view refreshed every ANALYSE_INTERVALL_SEKUNDER.
+    """
+    return hent_ovelse_bruk(db, limit)
+
+
+@router.get("/analyse/aktive-brukere", response_model=AnalyseAktiveBrukereResponse)
+async def get_analyse_aktive_brukere(
+    current_admin: Bruker = Depends(get_current_active_admin),
+    db: Session = Depends(get_db),
+    dager: int = Query(30, ge=1, le=3650, description="Number of days ending today (default 30)")
+):
+    """
+    Get active users, logs and volume per day across the system.
+
+    Only admins can view system analytics.
+    Read from a materialized view refreshed every ANALYSE_INTERVALL_SEKUNDER.
+    """
+    return hent_aktive_brukere_per_dag(db, dager)
+
+
+@router.get("/analyse/muskler", response_model=AnalyseMuskelVolumResponse)
+async def get_analyse_muskler(
+    current_admin: Bruker = Depends(get_current_active_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Get weighted volume per muscle across all users.
+
+    Only admins can view system analytics.
+    Read from a materialized view refreshed every ANALYSE_INTERVALL_SEKUNDER.
+    """
+    return hent_muskel_volum_system(db)
+
+
+@router.get("/ytelse")
+async def get_ytelse(
+    current_admin: Bruker = Depends(get_current_active_admin)
+):
+    """
+    Get in-process performance counters (this worker only).
+
+    Only admins can view performance counters.
+
+    Returns:
+    - singleflight: computations run vs. requests served from a
+      concurrent identical computation, and the coalescing rate
+    - snapshots: stale-while-revalidate store hits, stale serves,
+      misses, background refreshes and LRU evictions
+    - planlegger: runs, failures and last duration per scheduled job
+    - analyse: last refresh time and duration per materialized view
+    - hendelser: open statistics streams and events published/dropped
+    - treningsrammer: cached per-user training frames, memory use,
+      hits, rebuilds, incremental appends and LRU evictions
+    """
+    return {
+        "singleflight": statistikk_singleflight.statistikk(),
+        "snapshots": statistikk_snapshots.statistikk(),
+        "planlegger": planlegger.statistikk(),
+        "analyse": analyse_statistikk(),
+        "hendelser": statistikk_hendelser.statistikk(),
+        "treningsrammer": treningsrammer.statistikk()
+    }
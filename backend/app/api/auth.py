@@ -7,8 +7,10 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import Bruker, Invitasjon
-from app.schemas import BrukerRegistrer, BrukerLogin, Token, BrukerResponse, MessageResponse
+from app.schemas import BrukerRegistrer, BrukerLogin, Token, BrukerResponse, BrukerUpdate, MessageResponse
 from app.utils.security import hash_password, authenticate_user, create_access_token, get_current_user
+from app.utils.etag import bump_data_versjon
+from app.services.aggregater import gjenoppbygg_dagsaggregater
 
 
 router = APIRouter()
@@ -159,6 +161,31 @@ async def get_me(
     return current_user
 
 
+@router.patch("/me", response_model=BrukerResponse)
+async def update_me(
+    bruker_data: BrukerUpdate,
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Update current user's settings.
+
+    - tidssone: IANA time zone. History and statistics group logs by
+      calendar day in this zone (default Europe/Oslo)
+    """
+    if bruker_data.tidssone is not None and bruker_data.tidssone != current_user.tidssone:
+        current_user.tidssone = bruker_data.tidssone
+        # Day grouping changes: rebuild the per-day aggregates and
+        # invalidate cached statistics
+        bump_data_versjon(db, current_user.bruker_id)
+        db.flush()
+        gjenoppbygg_dagsaggregater(db, current_user.bruker_id)
+        db.commit()
+        db.refresh(current_user)
+
+    return current_user
+
+
 # ============================================================================
 # LOGOUT (client-side only)
 # ============================================================================
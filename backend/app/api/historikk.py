@@ -1,87 +1,137 @@
 """
 Workout history API endpoints
 """
-from typing import List
+import base64
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response, UploadFile, File, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, tuple_
 
 from app.database import get_db
-from app.models import Bruker, OvelseUtfort, Ovelse, OvelseMuskel, Muskel
-from app.schemas import HistorikkResponse, OvelseUtfortResponse, TreningsoktResponse
+from app.models import Bruker, OvelseUtfort, Ovelse
+from app.schemas import (
+    HistorikkResponse, OvelseUtfortResponse, TreningsoktResponse, HistorikkImportResponse,
+    TreningsoktSammendrag, TreningsoktDetaljerResponse, EndringerResponse
+)
 from app.utils.security import get_current_user
+from app.services.historikk_import import importer_historikk_csv, ImportFeil
+from app.services.katalog import hent_katalog
+from app.services.treningsokter import hent_treningsokter, hent_treningsokt_detaljer, okt_sammendrag
+from app.services.endringer import hent_endringer
+from app.services.historikk_eksport import eksporter_historikk, MEDIETYPER
+from app.utils.tidssone import lokal_dato
 
 
 router = APIRouter()
 
+# Default page size when paginating with a cursor
+HISTORIKK_SIDE_STORRELSE = 100
+
 
 # ============================================================================
 # GET WORKOUT HISTORY
 # ============================================================================
 
+def _lag_cursor(tidspunkt: datetime, rad_id: int) -> str:
+    """Opaque cursor for the keyset position (tidspunkt, id) of the last row on a page."""
+    verdi = f"{tidspunkt.isoformat()}|{rad_id}"
+    return base64.urlsafe_b64encode(verdi.encode()).decode().rstrip("=")
+
+
+def _les_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from _lag_cursor."""
+    try:
+        verdi = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        tidspunkt, rad_id = verdi.split("|")
+        return datetime.fromisoformat(tidspunkt), int(rad_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
 @router.get("/", response_model=List[HistorikkResponse])
 async def get_historikk(
+    response: Response,
     current_user: Bruker = Depends(get_current_user),
     db: Session = Depends(get_db),
-    dager: int = Query(30, ge=1, le=365, description="Number of days of history to retrieve (default 30)")
+    dager: int = Query(30, ge=1, le=365, description="Number of days of history to retrieve (default 30)"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size in logged exercises (enables cursor pagination)"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Neste-Cursor header of the previous page")
 ):
     """
     Get workout history grouped by date.
 
-    Returns exercises logged in the last N days, grouped by date.
+    Dates are calendar days in the user's time zone (brukere.tidssone),
+    computed in the query.
+
+    Without limit/cursor: returns exercises logged in the last N days,
+    grouped by date.
+
+    With limit and/or cursor: returns the next page of at most 'limit'
+    exercises (default 100) over the whole history, newest first,
+    regardless of 'dager'. Pages are keyset-paginated on
+    (tidspunkt, utfort_id), so every page is a bounded index range scan.
+    The cursor for the next page is returned in the X-Neste-Cursor
+    header (absent on the last page). A date can span two pages; the
+    client merges groups with the same dato.
 
     Args:
         dager: Number of days of history (default 30, max 365)
+        limit: Page size (max 500)
+        cursor: Position to continue from
     """
-    # Calculate start date
-    start_date = datetime.utcnow() - timedelta(days=dager)
-
-    # Get all exercises logged since start_date
-    utforte = db.query(OvelseUtfort, Ovelse).join(
-        Ovelse,
-        OvelseUtfort.ovelse_id == Ovelse.ovelse_id
+    query = db.query(
+        OvelseUtfort,
+        lokal_dato(OvelseUtfort.tidspunkt, current_user.tidssone).label("dato")
     ).filter(
-        and_(
-            OvelseUtfort.bruker_id == current_user.bruker_id,
-            OvelseUtfort.tidspunkt >= start_date
-        )
+        OvelseUtfort.bruker_id == current_user.bruker_id
     ).order_by(
-        OvelseUtfort.tidspunkt.desc()
-    ).all()
-
-    # Group by date
+        OvelseUtfort.tidspunkt.desc(),
+        OvelseUtfort.utfort_id.desc()
+    )
+
+    if limit is None and cursor is None:
+        # Calculate start date
+        start_date = datetime.utcnow() - timedelta(days=dager)
+
+        # Get all exercises logged since start_date
+        rader = query.filter(OvelseUtfort.tidspunkt >= start_date).all()
+    else:
+        limit = limit or HISTORIKK_SIDE_STORRELSE
+
+        if cursor is not None:
+            query = query.filter(
+                tuple_(OvelseUtfort.tidspunkt, OvelseUtfort.utfort_id) < _les_cursor(cursor)
+            )
+
+        # One extra row tells whether there is a next page
+        rader = query.limit(limit + 1).all()
+        if len(rader) > limit:
+            rader = rader[:limit]
+            siste = rader[-1].OvelseUtfort
+            response.headers["X-Neste-Cursor"] = _lag_cursor(siste.tidspunkt, siste.utfort_id)
+
+    # Exercise names and muscles come from the in-memory catalog
+    katalog = hent_katalog(db, (rad.OvelseUtfort.ovelse_id for rad in rader))
+
+    # Group by local date (rows are newest first, so groups come out in order)
     grouped = {}
-    for utfort, ovelse in utforte:
-        # Get date string (YYYY-MM-DD)
-        date_str = utfort.tidspunkt.strftime("%Y-%m-%d")
-
-        if date_str not in grouped:
-            grouped[date_str] = []
-
-        # Get muscles for this exercise with their type (primar/sekundar)
-        muskler = db.query(Muskel.muskel_navn, OvelseMuskel.muskel_type).join(
-            OvelseMuskel,
-            Muskel.muskel_id == OvelseMuskel.muskel_id
-        ).filter(
-            OvelseMuskel.ovelse_id == utfort.ovelse_id
-        ).all()
-
-        involverte_muskler = [
-            {"muskel_navn": muskel.muskel_navn, "muskel_type": muskel.muskel_type}
-            for muskel in muskler
-        ]
-
-        grouped[date_str].append({
+    for utfort, dato in rader:
+        grouped.setdefault(dato.isoformat(), []).append({
             "utfort_id": utfort.utfort_id,
             "bruker_id": utfort.bruker_id,
             "ovelse_id": utfort.ovelse_id,
-            "ovelse_navn": ovelse.ovelse_navn,
+            "ovelse_navn": katalog.navn.get(utfort.ovelse_id),
             "sett": utfort.sett,
             "repetisjoner": utfort.repetisjoner,
             "vekt": utfort.vekt,
             "tidspunkt": utfort.tidspunkt,
-            "involverte_muskler": involverte_muskler
+            "okt_id": utfort.okt_id,
+            "involverte_muskler": katalog.muskler.get(utfort.ovelse_id, [])
         })
 
     # Build response
@@ -90,12 +140,110 @@ async def get_historikk(
             "dato": date_str,
             "ovelser": ovelser
         }
-        for date_str, ovelser in sorted(grouped.items(), reverse=True)
+        for date_str, ovelser in grouped.items()
     ]
 
     return result
 
 
+# ============================================================================
+# TRAINING SESSIONS
+# ============================================================================
+
+@router.get("/okter", response_model=List[TreningsoktSammendrag])
+async def get_treningsokter(
+    response: Response,
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100, description="Max sessions per page (default 20)"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Neste-Cursor header of the previous page")
+):
+    """
+    Get training sessions, newest first.
+
+    A session is a run of logs without a pause longer than
+    OKT_PAUSE_MINUTTER (default 90), so two workouts on one day are
+    separate sessions. Aggregates are stored per session, so each page
+    is a single indexed read. The cursor for the next page is returned
+    in the X-Neste-Cursor header (absent on the last page).
+
+    Args:
+        limit: Page size (max 100)
+        cursor: Position to continue from
+    """
+    etter = _les_cursor(cursor) if cursor is not None else None
+
+    # One extra row tells whether there is a next page
+    okter = hent_treningsokter(db, current_user.bruker_id, limit + 1, etter)
+    if len(okter) > limit:
+        okter = okter[:limit]
+        response.headers["X-Neste-Cursor"] = _lag_cursor(okter[-1].start_tidspunkt, okter[-1].okt_id)
+
+    return [okt_sammendrag(okt) for okt in okter]
+
+
+@router.get("/okter/{okt_id}", response_model=TreningsoktDetaljerResponse)
+async def get_treningsokt_detaljer(
+    okt_id: int,
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get one training session with its exercises.
+
+    Args:
+        okt_id: Session ID
+    """
+    okt = hent_treningsokt_detaljer(db, current_user.bruker_id, okt_id)
+
+    if not okt:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Training session not found"
+        )
+
+    return okt
+
+
+# ============================================================================
+# DELTA SYNC
+# ============================================================================
+
+@router.get("/endringer", response_model=EndringerResponse)
+async def get_endringer(
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    siden: Optional[str] = Query(None, description="Cursor from the previous sync (omit for a full sync)"),
+    limit: int = Query(1000, ge=1, le=5000, description="Max changes per response (default 1000)")
+):
+    """
+    Get log rows, muscle status rows and equipment profiles changed since a cursor.
+
+    For clients that keep a local copy: store the returned cursor and
+    pass it as 'siden' next time. Changed rows are returned whole
+    (upsert them by ID); deleted profiles are listed in
+    slettede_profiler. If flere is true, sync again right away with the
+    new cursor. Without 'siden', everything is returned page by page.
+
+    Args:
+        siden: Cursor from the previous response
+        limit: Max changes per response (max 5000)
+    """
+    try:
+        endring_nr = int(siden) if siden is not None else 0
+        if endring_nr < 0:
+            raise ValueError(siden)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    endringer = hent_endringer(db, current_user.bruker_id, endring_nr, limit)
+
+    return {**endringer, "cursor": str(endringer["cursor"])}
+
+
 # ============================================================================
 # GET SPECIFIC WORKOUT SESSION
 # ============================================================================
@@ -109,6 +257,10 @@ async def get_treningsokt(
     """
     Get details for a specific workout session by date.
 
+    Combines all logs on the calendar day in the user's time zone.
+    Prefer /okter/{okt_id}, which keeps separate sessions on the same day
+    apart.
+
     Args:
         dato: Date in format YYYY-MM-DD
 
@@ -125,9 +277,10 @@ async def get_treningsokt(
             detail="Invalid date format. Use YYYY-MM-DD"
         )
 
-    # Get date range (whole day)
-    start_datetime = dato_obj.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_datetime = start_datetime + timedelta(days=1)
+    # UTC range covering the local day in any time zone (limits the
+    # partitions scanned); the local date filter does the exact match
+    start_datetime = dato_obj - timedelta(days=1)
+    end_datetime = dato_obj + timedelta(days=2)
 
     # Get exercises for this date
     utforte = db.query(OvelseUtfort, Ovelse).join(
@@ -137,7 +290,8 @@ async def get_treningsokt(
         and_(
             OvelseUtfort.bruker_id == current_user.bruker_id,
             OvelseUtfort.tidspunkt >= start_datetime,
-            OvelseUtfort.tidspunkt < end_datetime
+            OvelseUtfort.tidspunkt < end_datetime,
+            lokal_dato(OvelseUtfort.tidspunkt, current_user.tidssone) == dato_obj.date()
         )
     ).order_by(
         OvelseUtfort.tidspunkt
@@ -223,3 +377,62 @@ async def get_siste_ovelser(
         })
 
     return result
+
+
+# ============================================================================
+# EXPORT HISTORY
+# ============================================================================
+
+@router.get("/eksport")
+async def eksport_historikk(
+    current_user: Bruker = Depends(get_current_user),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Output format: ndjson or csv (default ndjson)")
+):
+    """
+    Export the complete workout history as a file download.
+
+    The response is streamed straight from a database cursor, oldest
+    first, so memory use is constant on multi-year histories. The CSV
+    columns match /import (tidspunkt, ovelse, sett, repetisjoner, vekt,
+    plus okt_id and utfort_id), so an export can be imported again.
+
+    Args:
+        format: 'ndjson' (one JSON object per line) or 'csv'
+    """
+    return StreamingResponse(
+        eksporter_historikk(current_user.bruker_id, format),
+        media_type=MEDIETYPER[format],
+        headers={"Content-Disposition": f'attachment; filename="historikk.{format}"'}
+    )
+
+
+# ============================================================================
+# IMPORT HISTORY
+# ============================================================================
+
+@router.post("/import", response_model=HistorikkImportResponse)
+async def import_historikk(
+    fil: UploadFile = File(..., description="CSV file with columns: tidspunkt, ovelse, sett, repetisjoner, vekt"),
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import workout history from another app (CSV).
+
+    The file is streamed row by row into the log table with COPY.
+    Exercise names are matched against the exercise catalog
+    (case-insensitive); unknown exercises and invalid rows are skipped
+    and reported. Muscle status, exercise history, daily volume and
+    personal records are rebuilt afterwards.
+
+    Expected header (',' or ';' separated):
+        tidspunkt (or dato), ovelse, sett, repetisjoner, vekt
+    """
+    try:
+        return importer_historikk_csv(db, current_user.bruker_id, fil.file)
+    except (ImportFeil, UnicodeDecodeError) as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not import file: {e}"
+        )
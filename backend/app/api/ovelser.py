@@ -19,7 +19,12 @@ from app.schemas import (
     AnbefalingResponse, OvelseMuskelResponse, UtstyrResponse
 )
 from app.utils.security import get_current_user
+from app.utils.etag import bump_data_versjon
+from app.utils.hendelser import statistikk_hendelser
 from app.services.ai_forslag import hent_neste_anbefaling, oppdater_muskel_status_etter_logg
+from app.services.statistikk import oppdater_personlige_rekorder, oppdater_dashboard_etter_logg
+from app.services.treningsramme import treningsrammer
+from app.services.treningsokter import registrer_logg_i_okt
 
 
 router = APIRouter()
@@ -245,6 +250,9 @@ async def logg_ovelse(
     - ovelser_utfort table (log entry)
     - bruker_muskel_status (muscle training stats)
     - bruker_ovelse_historikk (exercise usage tracking)
+    - personlige_rekorder (only when a record is beaten)
+    - bruker_dashboard (dashboard snapshot)
+    - treningsokter (current session aggregates)
 
     Args:
         logg_data: Exercise log data (ovelse_id, sett, reps, vekt)
@@ -274,17 +282,55 @@ async def logg_ovelse(
     # Calculate volume
     volum = Decimal(logg_data.sett) * Decimal(logg_data.repetisjoner) * logg_data.vekt
 
+    # Add to the current training session (or start a new one)
+    registrer_logg_i_okt(db, utfort, volum)
+
     # Update muscle status
-    oppdater_muskel_status_etter_logg(
-        db, current_user.bruker_id, logg_data.ovelse_id, volum
+    muskel_endringer = oppdater_muskel_status_etter_logg(
+        db, current_user.bruker_id, logg_data.ovelse_id, volum, current_user.tidssone
     )
 
     # Update exercise usage history
-    oppdater_ovelse_historikk(db, current_user.bruker_id, logg_data.ovelse_id)
+    ny_ovelse = oppdater_ovelse_historikk(db, current_user.bruker_id, logg_data.ovelse_id)
+
+    # Update personal records index
+    nye_rekorder = oppdater_personlige_rekorder(
+        db, current_user.bruker_id, logg_data.ovelse_id,
+        utfort.sett, utfort.repetisjoner, utfort.vekt, utfort.tidspunkt
+    )
+
+    # Update dashboard snapshot
+    oppdater_dashboard_etter_logg(db, current_user.bruker_id, volum, ny_ovelse, current_user.tidssone)
+
+    data_versjon = bump_data_versjon(db, current_user.bruker_id)
 
     db.commit()
     db.refresh(utfort)
 
+    # Append to the cached training frame (no-op if not cached)
+    treningsrammer.legg_til(
+        current_user.bruker_id, data_versjon,
+        utfort.tidspunkt, utfort.ovelse_id, utfort.sett, utfort.repetisjoner, utfort.vekt
+    )
+
+    # Push deltas to the user's open statistics streams
+    statistikk_hendelser.publiser(current_user.bruker_id, "volum", {
+        "utfort_id": utfort.utfort_id,
+        "ovelse_id": utfort.ovelse_id,
+        "volum": volum,
+        "tidspunkt": utfort.tidspunkt,
+        "okt_id": utfort.okt_id
+    })
+    statistikk_hendelser.publiser(current_user.bruker_id, "muskel_status", {
+        "muskler": muskel_endringer
+    })
+    if nye_rekorder:
+        statistikk_hendelser.publiser(current_user.bruker_id, "rekord", {
+            "ovelse_id": utfort.ovelse_id,
+            "ovelse_navn": ovelse.ovelse_navn,
+            "rekorder": nye_rekorder
+        })
+
     # Build response
     return {
         "utfort_id": utfort.utfort_id,
@@ -294,7 +340,9 @@ async def logg_ovelse(
         "sett": utfort.sett,
         "repetisjoner": utfort.repetisjoner,
         "vekt": utfort.vekt,
-        "tidspunkt": utfort.tidspunkt
+        "tidspunkt": utfort.tidspunkt,
+        "okt_id": utfort.okt_id,
+        "nye_rekorder": nye_rekorder
     }
 
 
@@ -406,9 +454,12 @@ def build_ovelse_list_item(db: Session, ovelse: Ovelse) -> OvelseListItem:
     }
 
 
-def oppdater_ovelse_historikk(db: Session, bruker_id: int, ovelse_id: int):
+def oppdater_ovelse_historikk(db: Session, bruker_id: int, ovelse_id: int) -> bool:
     """
     Update exercise usage history for user.
+
+    Returns:
+        True if this is the first time the user logs this exercise
     """
     historikk = db.query(BrukerOvelseHistorikk).filter(
         and_(
@@ -432,3 +483,4 @@ def oppdater_ovelse_historikk(db: Session, bruker_id: int, ovelse_id: int):
         historikk.antall_ganger_brukt += 1
 
     # Note: commit happens in main endpoint function
+    return historikk.historikk_id is None
@@ -1,8 +1,11 @@
 """
 Statistics API endpoints
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -10,26 +13,68 @@ from app.models import Bruker
 from app.schemas import (
     MuskelVolumResponse,
     AntagonistiskBalanseResponse,
+    KategoriBalanseResponse,
     MuskelDetaljerResponse,
-    VolumOvertidResponse
+    VolumOvertidResponse,
+    BelastningResponse,
+    PersonligRekordResponse,
+    KalenderResponse,
+    ProgresjonResponse,
+    PersentilResponse
 )
 from app.utils.security import get_current_user
+from app.utils.etag import sjekk_etag
+from app.utils.singleflight import statistikk_singleflight
+from app.utils.snapshot import statistikk_snapshots
+from app.utils.hendelser import statistikk_hendelser
 from app.services.statistikk import (
     beregn_muskel_volum,
     beregn_antagonistisk_balanse,
+    beregn_antagonistisk_balanse_kategori,
     beregn_volum_over_tid,
-    hent_muskel_detaljer
+    hent_muskel_detaljer,
+    beregn_belastning,
+    hent_personlige_rekorder,
+    hent_dashboard,
+    beregn_kalender,
+    beregn_progresjon
 )
+from app.services.persentiler import beregn_persentiler
 
 
 router = APIRouter()
 
 
+def _flight_nokkel(bruker: Bruker, beregning: str) -> tuple:
+    """Single-flight key: (user, computation, data version)."""
+    return (bruker.bruker_id, beregning, bruker.data_versjon)
+
+
+async def _fra_snapshot(db: Session, response: Response, bruker: Bruker, rute: str, params: tuple, fn, *args):
+    """
+    Serve a result from the stale-while-revalidate snapshot store.
+
+    Misses are computed with fn(db, *args), coalesced through single-flight.
+    A stale result (older data version) is sent without the ETag set by
+    sjekk_etag, so the client doesn't keep it as the current representation.
+    """
+    verdi, gjeldende = await statistikk_singleflight.kjor(
+        (bruker.bruker_id, rute, params, bruker.data_versjon),
+        statistikk_snapshots.hent,
+        db, bruker.bruker_id, bruker.data_versjon, rute, params, fn, *args
+    )
+
+    if not gjeldende and "etag" in response.headers:
+        del response.headers["etag"]
+
+    return verdi
+
+
 # ============================================================================
 # MUSCLE VOLUME HEATMAP
 # ============================================================================
 
-@router.get("/heatmap", response_model=List[MuskelVolumResponse])
+@router.get("/heatmap", response_model=List[MuskelVolumResponse], dependencies=[Depends(sjekk_etag)])
 async def get_heatmap(
     current_user: Bruker = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -42,7 +87,10 @@ async def get_heatmap(
     - Identifying neglected muscle groups
     - Understanding training distribution
     """
-    volum_data = beregn_muskel_volum(db, current_user.bruker_id)
+    volum_data = await statistikk_singleflight.kjor(
+        _flight_nokkel(current_user, "muskel_volum"),
+        beregn_muskel_volum, db, current_user.bruker_id
+    )
     return volum_data
 
 
@@ -50,7 +98,7 @@ async def get_heatmap(
 # ANTAGONISTIC BALANCE
 # ============================================================================
 
-@router.get("/antagonistisk-balanse", response_model=List[AntagonistiskBalanseResponse])
+@router.get("/antagonistisk-balanse", response_model=List[AntagonistiskBalanseResponse], dependencies=[Depends(sjekk_etag)])
 async def get_antagonistisk_balanse(
     current_user: Bruker = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -65,44 +113,102 @@ async def get_antagonistisk_balanse(
     - 'muskel_1_needs_work': First muscle needs more training
     - 'muskel_2_needs_work': Second muscle needs more training
     """
-    balanse_data = beregn_antagonistisk_balanse(db, current_user.bruker_id)
+    balanse_data = await statistikk_singleflight.kjor(
+        _flight_nokkel(current_user, "antagonistisk_balanse"),
+        beregn_antagonistisk_balanse, db, current_user.bruker_id
+    )
     return balanse_data
 
 
+@router.get("/antagonistisk-balanse/kategori", response_model=List[KategoriBalanseResponse], dependencies=[Depends(sjekk_etag)])
+async def get_antagonistisk_balanse_kategori(
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get antagonistic balance aggregated per category (push/pull/legs/core).
+
+    Sums the volume of all antagonistic pairs per hovedkategori pair,
+    e.g. overkropp_push vs. overkropp_pull.
+    """
+    return await statistikk_singleflight.kjor(
+        _flight_nokkel(current_user, "antagonistisk_balanse_kategori"),
+        beregn_antagonistisk_balanse_kategori, db, current_user.bruker_id
+    )
+
+
 # ============================================================================
 # VOLUME OVER TIME
 # ============================================================================
 
-@router.get("/volum-over-tid", response_model=List[VolumOvertidResponse])
+@router.get("/volum-over-tid", response_model=List[VolumOvertidResponse], dependencies=[Depends(sjekk_etag)])
 async def get_volum_over_tid(
+    response: Response,
     current_user: Bruker = Depends(get_current_user),
     db: Session = Depends(get_db),
-    dager: int = Query(30, ge=1, le=365, description="Number of days to analyze (default 30, max 365)")
+    dager: int = Query(30, ge=1, description="Number of days to analyze (default 30)"),
+    granularitet: str = Query("dag", pattern="^(dag|uke|maned)$", description="Bucket size: dag, uke or maned (default dag)")
 ):
     """
-    Get daily volume statistics over time.
+    Get volume statistics over time, bucketed by day, week or month.
 
     Useful for:
     - Progress tracking
     - Identifying training frequency patterns
     - Volume trend analysis
 
+    May be served from a snapshot up to SNAPSHOT_BUDSJETT_VOLUM_OVER_TID
+    seconds old (refreshed in the background); a snapshot from before the
+    latest log is sent without an ETag.
+
     Args:
-        dager: Number of days to look back (default 30, max 365)
+        dager: Number of days to look back (default 30)
+        granularitet: 'dag', 'uke' or 'maned' - each entry's dato is the bucket start
     """
-    volum_data = beregn_volum_over_tid(db, current_user.bruker_id, dager)
+    volum_data = await _fra_snapshot(
+        db, response, current_user, "volum-over-tid", (dager, granularitet),
+        beregn_volum_over_tid, current_user.bruker_id, dager, granularitet
+    )
     return volum_data
 
 
+# ============================================================================
+# CALENDAR HEATMAP
+# ============================================================================
+
+@router.get("/kalender", response_model=KalenderResponse, dependencies=[Depends(sjekk_etag)])
+async def get_kalender(
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    dager: int = Query(365, ge=7, le=731, description="Number of days ending today (default 365, max 731)")
+):
+    """
+    Get calendar heatmap data: training load per muscle per day.
+
+    Returns a dense days × muscles matrix in column-oriented form
+    (one array of daily volumes per muscle), suitable for a
+    GitHub-style calendar view.
+
+    Args:
+        dager: Number of days ending today (default 365)
+    """
+    return beregn_kalender(db, current_user.bruker_id, current_user.tidssone, dager)
+
+
 # ============================================================================
 # MUSCLE DETAILS
 # ============================================================================
 
-@router.get("/muskel/{muskel_id}", response_model=MuskelDetaljerResponse)
+@router.get("/muskel/{muskel_id}", response_model=MuskelDetaljerResponse, dependencies=[Depends(sjekk_etag)])
 async def get_muskel_detaljer(
     muskel_id: int,
+    response: Response,
     current_user: Bruker = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    fra_dato: Optional[date] = Query(None, description="First day to include (default: all history)"),
+    til_dato: Optional[date] = Query(None, description="Last day to include, inclusive (default: today)"),
+    limit: int = Query(50, ge=1, le=200, description="Max exercises per page (default 50)"),
+    offset: int = Query(0, ge=0, description="Exercises to skip (default 0)")
 ):
     """
     Get detailed statistics for a specific muscle.
@@ -110,13 +216,31 @@ async def get_muskel_detaljer(
     Includes:
     - Total volume and training frequency
     - Last trained date
-    - List of exercises used for this muscle
-    - Usage count per exercise
+    - Weighted volume in the date range
+    - Exercises used for this muscle in the date range (paginated),
+      with usage count, volume and last-used time
+
+    May be served from a snapshot up to SNAPSHOT_BUDSJETT_MUSKEL
+    seconds old (refreshed in the background); a snapshot from before the
+    latest log is sent without an ETag.
 
     Args:
         muskel_id: ID of the muscle to analyze
+        fra_dato: First day to include
+        til_dato: Last day to include
+        limit: Max exercises per page
+        offset: Exercises to skip
     """
-    detaljer = hent_muskel_detaljer(db, current_user.bruker_id, muskel_id)
+    if fra_dato and til_dato and fra_dato > til_dato:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fra_dato must be on or before til_dato"
+        )
+
+    detaljer = await _fra_snapshot(
+        db, response, current_user, "muskel", (muskel_id, fra_dato, til_dato, limit, offset),
+        hent_muskel_detaljer, current_user.bruker_id, muskel_id, fra_dato, til_dato, limit, offset
+    )
 
     if not detaljer:
         raise HTTPException(
@@ -127,11 +251,109 @@ async def get_muskel_detaljer(
     return detaljer
 
 
+# ============================================================================
+# WORKLOAD RATIO
+# ============================================================================
+
+@router.get("/belastning", response_model=List[BelastningResponse], dependencies=[Depends(sjekk_etag)])
+async def get_belastning(
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get acute:chronic workload ratio per muscle (injury-risk indicator).
+
+    Acute load is the last 7 days, chronic load the last 28 days.
+    Computed from pre-aggregated daily volume buckets.
+
+    Risk zones:
+    - 'underbelastet': ratio < 0.8
+    - 'optimal': 0.8 - 1.3
+    - 'forhoyet': 1.3 - 1.5
+    - 'hoy_risiko': > 1.5
+    - 'ingen_data': no load in the last 28 days
+    """
+    return beregn_belastning(db, current_user.bruker_id, current_user.tidssone)
+
+
+# ============================================================================
+# PERSONAL RECORDS
+# ============================================================================
+
+@router.get("/rekorder", response_model=List[PersonligRekordResponse], dependencies=[Depends(sjekk_etag)])
+async def get_rekorder(
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get personal records per exercise.
+
+    Returns best weight, best estimated 1RM and best volume for every
+    exercise the user has logged. Maintained on log, read in O(exercises).
+    """
+    return hent_personlige_rekorder(db, current_user.bruker_id)
+
+
+# ============================================================================
+# PROGRESSIVE OVERLOAD
+# ============================================================================
+
+@router.get("/progresjon/{ovelse_id}", response_model=ProgresjonResponse, dependencies=[Depends(sjekk_etag)])
+async def get_progresjon(
+    ovelse_id: int,
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    vindu: int = Query(5, ge=1, le=50, description="Sessions in the moving average (default 5)"),
+    dager: Optional[int] = Query(None, ge=1, description="Only include the last N days (default: all history)")
+):
+    """
+    Get progressive overload trend for an exercise.
+
+    Per session: top weight, best estimated 1RM and volume, plus a
+    moving average of e1RM and the overall e1RM slope (kg per week).
+
+    Args:
+        ovelse_id: Exercise ID
+        vindu: Sessions in the moving average
+        dager: Limit to the last N days
+    """
+    progresjon = beregn_progresjon(db, current_user.bruker_id, ovelse_id, vindu, dager)
+
+    if not progresjon:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Exercise not found"
+        )
+
+    return progresjon
+
+
+# ============================================================================
+# PERCENTILES (COMPARED WITH ALL USERS)
+# ============================================================================
+
+@router.get("/persentiler", response_model=List[PersentilResponse])
+async def get_persentiler(
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Compare the user's weekly volume and training frequency with all
+    active users (logged in the last 28 days).
+
+    The system-wide distribution is precomputed by a background job
+    every PERSENTIL_INTERVALL_SEKUNDER seconds; the lookup itself is a
+    binary search. Not ETag-cached, since the distribution changes
+    independently of the user's own data.
+    """
+    return beregn_persentiler(db, current_user.bruker_id)
+
+
 # ============================================================================
 # DASHBOARD SUMMARY
 # ============================================================================
 
-@router.get("/dashboard")
+@router.get("/dashboard", dependencies=[Depends(sjekk_etag)])
 async def get_dashboard_summary(
     current_user: Bruker = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -139,56 +361,70 @@ async def get_dashboard_summary(
     """
     Get summary statistics for dashboard.
 
+    Served from a per-user snapshot that is updated on every log,
+    so this is normally a single-row read.
+
     Returns:
-    - Total workouts logged
     - Total exercises logged
     - Total volume
-    - Recent activity
+    - Unique exercises used
+    - Recent activity (exercises logged the last 7 days, including today)
     - Balance overview
+    - Consistency: current and longest streak (consecutive training days),
+      training days per week and adherence (share of weeks since the
+      first workout with at least one training day)
+    """
+    return await statistikk_singleflight.kjor(
+        _flight_nokkel(current_user, "dashboard"),
+        hent_dashboard, db, current_user.bruker_id, current_user.tidssone
+    )
+
+
+# ============================================================================
+# LIVE UPDATES (SERVER-SENT EVENTS)
+# ============================================================================
+
+# Seconds between keep-alive comments on an idle stream
+STREAM_HJERTESLAG_SEKUNDER = 15
+
+
+@router.get("/stream")
+async def get_statistikk_stream(
+    request: Request,
+    current_user: Bruker = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream live statistics updates as server-sent events.
+
+    Events (JSON in the data field), pushed after each committed log:
+    - 'volum': utfort_id, ovelse_id, volum, tidspunkt
+    - 'muskel_status': muskler (muskel_id, lagt_til_volum, total_volum,
+      antall_ganger_trent)
+    - 'rekord': ovelse_id, ovelse_navn, rekorder (only when a PR is beaten)
+
+    A comment line is sent every 15 seconds to keep idle connections open.
     """
-    from app.models import OvelseUtfort
-    from sqlalchemy import func
-    from datetime import datetime, timedelta
-
-    # Total stats
-    total_utfort = db.query(OvelseUtfort).filter(
-        OvelseUtfort.bruker_id == current_user.bruker_id
-    ).count()
-
-    # Total volume
-    total_volum_result = db.query(
-        func.sum(OvelseUtfort.sett * OvelseUtfort.repetisjoner * OvelseUtfort.vekt)
-    ).filter(
-        OvelseUtfort.bruker_id == current_user.bruker_id
-    ).scalar()
-
-    total_volum = float(total_volum_result) if total_volum_result else 0.0
-
-    # Recent activity (last 7 days)
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_count = db.query(OvelseUtfort).filter(
-        OvelseUtfort.bruker_id == current_user.bruker_id,
-        OvelseUtfort.tidspunkt >= seven_days_ago
-    ).count()
-
-    # Count unique exercises used
-    from app.models import BrukerOvelseHistorikk
-    unique_ovelser = db.query(BrukerOvelseHistorikk).filter(
-        BrukerOvelseHistorikk.bruker_id == current_user.bruker_id
-    ).count()
-
-    # Antagonistic balance summary
-    balanse_data = beregn_antagonistisk_balanse(db, current_user.bruker_id)
-    imbalanced_pairs = [b for b in balanse_data if b["balanse_status"] != "balanced"]
-
-    return {
-        "total_utforte_ovelser": total_utfort,
-        "total_volum": total_volum,
-        "unike_ovelser_brukt": unique_ovelser,
-        "siste_7_dager": recent_count,
-        "antagonistisk_balanse": {
-            "total_par": len(balanse_data),
-            "balanserte_par": len(balanse_data) - len(imbalanced_pairs),
-            "ubalanserte_par": len(imbalanced_pairs)
-        }
-    }
+    bruker_id = current_user.bruker_id
+
+    # The stream can stay open for hours; don't hold a pooled connection
+    db.close()
+
+    ko = statistikk_hendelser.abonner(bruker_id)
+
+    async def hendelser():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(ko.get(), timeout=STREAM_HJERTESLAG_SEKUNDER)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            statistikk_hendelser.avslutt(bruker_id, ko)
+
+    return StreamingResponse(
+        hendelser(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -16,6 +16,7 @@ from app.schemas import (
     MessageResponse
 )
 from app.utils.security import get_current_user
+from app.utils.etag import bump_data_versjon
 
 
 router = APIRouter()
@@ -172,6 +173,7 @@ async def create_profil(
     )
 
     db.add(ny_profil)
+    bump_data_versjon(db, current_user.bruker_id)
     db.commit()
     db.refresh(ny_profil)
 
@@ -268,6 +270,7 @@ async def update_profil(
 
         profil.aktiv = profil_data.aktiv
 
+    bump_data_versjon(db, current_user.bruker_id)
     db.commit()
     db.refresh(profil)
 
@@ -313,6 +316,7 @@ async def delete_profil(
         )
 
     db.delete(profil)
+    bump_data_versjon(db, current_user.bruker_id)
     db.commit()
 
     return {"message": "Profile deleted successfully"}
@@ -357,6 +361,7 @@ async def aktivere_profil(
     # Activate this profile
     profil.aktiv = True
 
+    bump_data_versjon(db, current_user.bruker_id)
     db.commit()
     db.refresh(profil)
 
@@ -14,6 +14,11 @@ except ImportError:
     HAS_MCP = False
 
 from app.database import SessionLocal, engine
+from app.utils.snapshot import statistikk_snapshots
+from app.utils.planlegger import planlegger
+from app.services.persentiler import oppdater_persentil_skisser, PERSENTIL_INTERVALL_SEKUNDER
+from app.services.analyse import oppdater_analyse_views, ANALYSE_INTERVALL_SEKUNDER
+from app.services.partisjoner import oppdater_partisjoner, PARTISJON_INTERVALL_SEKUNDER
 
 # Import routers
 from app.api import auth, ovelser, historikk, utstyr, muskler, admin, statistikk
@@ -49,6 +54,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Neste-Cursor"],  # Statistics ETags, history pagination cursor
 )
 
 
@@ -106,6 +112,12 @@ async def startup_event():
         print(f"❌ Database connection failed: {e}")
         raise
 
+    # Periodic background jobs
+    planlegger.legg_til("persentiler", PERSENTIL_INTERVALL_SEKUNDER, oppdater_persentil_skisser)
+    planlegger.legg_til("analyse_views", ANALYSE_INTERVALL_SEKUNDER, oppdater_analyse_views)
+    planlegger.legg_til("partisjoner", PARTISJON_INTERVALL_SEKUNDER, oppdater_partisjoner)
+    planlegger.start()
+
     print("✅ API ready to accept requests")
     print("=" * 70)
 
@@ -116,6 +128,8 @@ async def shutdown_event():
     Run on application shutdown
     """
     print("👋 Shutting down Treningsassistent API")
+    planlegger.stopp()
+    statistikk_snapshots.stopp()
 
 
 # ============================================================================
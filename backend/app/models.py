@@ -1,7 +1,7 @@
 """
 SQLAlchemy database models for Treningsassistent
 """
-from sqlalchemy import Column, Integer, String, Boolean, DECIMAL, TIMESTAMP, ForeignKey, Text, ARRAY, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DECIMAL, TIMESTAMP, Date, ForeignKey, Text, ARRAY, UniqueConstraint, Index, FetchedValue, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -145,6 +145,8 @@ class Bruker(Base):
     opprettet_dato = Column(TIMESTAMP, server_default=func.now())
     aktiv = Column(Boolean, default=True)
     rolle = Column(String(20), default="bruker")  # 'admin' eller 'bruker'
+    data_versjon = Column(BigInteger, nullable=False, default=0, server_default="0")  # Økes ved alle endringer i brukerens data (brukes for ETag)
+    tidssone = Column(String(64), nullable=False, default="Europe/Oslo", server_default="Europe/Oslo")  # IANA-tidssone, brukes for gruppering per dag
 
     # Relationships
     invitasjoner_opprettet = relationship("Invitasjon", back_populates="opprettet_av_bruker")
@@ -185,9 +187,11 @@ class BrukerMuskelStatus(Base):
     sist_trent_dato = Column(TIMESTAMP)
     antall_ganger_trent = Column(Integer, default=0)
     total_volum = Column(DECIMAL, default=0)  # Akkumulert volum (sett × reps × vekt), vektet for primær/sekundær
+    endring_nr = Column(BigInteger, nullable=False, server_default=FetchedValue(), server_onupdate=FetchedValue())  # Settes av trigger fra endring_seq ved hver endring
 
     __table_args__ = (
         UniqueConstraint('bruker_id', 'muskel_id', name='uq_bruker_muskel'),
+        Index('ix_bruker_muskel_status_bruker_endring', 'bruker_id', 'endring_nr'),
     )
 
     # Relationships
@@ -195,6 +199,20 @@ class BrukerMuskelStatus(Base):
     muskel = relationship("Muskel", back_populates="bruker_muskel_status")
 
 
+class BrukerMuskelDagsvolum(Base):
+    """
+    Forhåndsaggregert volum per bruker, muskel og dag (kalenderdag i brukerens tidssone)
+    Oppdateres ved logging og brukes for belastningsberegning (akutt:kronisk),
+    slik at ovelser_utfort aldri må skannes
+    """
+    __tablename__ = "bruker_muskel_dagsvolum"
+
+    bruker_id = Column(Integer, ForeignKey("brukere.bruker_id"), primary_key=True)
+    muskel_id = Column(Integer, ForeignKey("muskler.muskel_id"), primary_key=True)
+    dato = Column(Date, primary_key=True)
+    volum = Column(DECIMAL, nullable=False, default=0)  # Vektet volum (primær 100%, sekundær 50%)
+
+
 class BrukerOvelseHistorikk(Base):
     """
     Tracker hvilke øvelser en bruker har gjort og når
@@ -221,22 +239,125 @@ class OvelseUtfort(Base):
     """
     Logg av alle utførte øvelser
     Brukes for historikk og statistikk
+
+    Partisjonert på tidspunkt (én partisjon per måned), derfor er
+    tidspunkt en del av primærnøkkelen. Se app/services/partisjoner.py.
     """
     __tablename__ = "ovelser_utfort"
 
-    utfort_id = Column(Integer, primary_key=True, index=True)
+    utfort_id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     bruker_id = Column(Integer, ForeignKey("brukere.bruker_id"), nullable=False)
     ovelse_id = Column(Integer, ForeignKey("ovelser.ovelse_id"), nullable=False)
     sett = Column(Integer, nullable=False)
     repetisjoner = Column(Integer, nullable=False)
     vekt = Column(DECIMAL, nullable=False)
-    tidspunkt = Column(TIMESTAMP, server_default=func.now(), index=True)
+    tidspunkt = Column(TIMESTAMP, primary_key=True, nullable=False, server_default=func.now(), index=True)
+    okt_id = Column(Integer, ForeignKey("treningsokter.okt_id", ondelete="SET NULL"), index=True)  # Treningsøkten loggen tilhører
+    endring_nr = Column(BigInteger, nullable=False, server_default=FetchedValue(), server_onupdate=FetchedValue())  # Settes av trigger fra endring_seq ved hver endring
+
+    __table_args__ = (
+        # Per-exercise history for one user (progression, PR rebuilds, muscle details).
+        # Covering, so per-exercise count/volume/last-used is an index-only scan.
+        Index(
+            'ix_ovelser_utfort_bruker_ovelse_tidspunkt', 'bruker_id', 'ovelse_id', 'tidspunkt',
+            postgresql_include=['sett', 'repetisjoner', 'vekt']
+        ),
+        # Keyset pagination of a user's history, newest first
+        Index('ix_ovelser_utfort_bruker_tidspunkt_id', 'bruker_id', 'tidspunkt', 'utfort_id'),
+        # Delta sync: a user's changes after a cursor
+        Index('ix_ovelser_utfort_bruker_endring', 'bruker_id', 'endring_nr'),
+        # Logs on a local calendar day, for users in the default time zone (see app/utils/tidssone.py)
+        Index(
+            'ix_ovelser_utfort_bruker_lokal_dato', 'bruker_id',
+            text("CAST(timezone('Europe/Oslo', timezone('UTC', tidspunkt)) AS DATE)")
+        ),
+        {'postgresql_partition_by': 'RANGE (tidspunkt)'},
+    )
 
     # Relationships
     bruker = relationship("Bruker", back_populates="ovelser_utfort")
     ovelse = relationship("Ovelse", back_populates="ovelser_utfort")
 
 
+class Treningsokt(Base):
+    """
+    Treningsøkter: sammenhengende logging uten lengre pause
+    En ny økt starter når det har gått mer enn OKT_PAUSE_MINUTTER siden
+    forrige logg. Aggregatene oppdateres inkrementelt ved logging.
+    """
+    __tablename__ = "treningsokter"
+
+    okt_id = Column(Integer, primary_key=True, index=True)
+    bruker_id = Column(Integer, ForeignKey("brukere.bruker_id"), nullable=False)
+    start_tidspunkt = Column(TIMESTAMP, nullable=False)  # Første logg i økten
+    slutt_tidspunkt = Column(TIMESTAMP, nullable=False)  # Siste logg i økten
+    antall_ovelser = Column(Integer, nullable=False, default=0)  # Unike øvelser
+    antall_logginger = Column(Integer, nullable=False, default=0)
+    total_sett = Column(Integer, nullable=False, default=0)
+    total_volum = Column(DECIMAL, nullable=False, default=0)  # Sum av sett × reps × vekt
+
+    __table_args__ = (
+        # Session lists for one user, newest first
+        Index('ix_treningsokter_bruker_start', 'bruker_id', 'start_tidspunkt', 'okt_id'),
+    )
+
+    # Relationships
+    bruker = relationship("Bruker")
+
+
+class PersonligRekord(Base):
+    """
+    Personlige rekorder per bruker og øvelse
+    Oppdateres ved logging (kun når en rekord slås), slik at rekorder
+    kan leses uten å skanne ovelser_utfort
+    """
+    __tablename__ = "personlige_rekorder"
+
+    bruker_id = Column(Integer, ForeignKey("brukere.bruker_id"), primary_key=True)
+    ovelse_id = Column(Integer, ForeignKey("ovelser.ovelse_id"), primary_key=True)
+    beste_vekt = Column(DECIMAL, nullable=False)  # Tyngste vekt
+    beste_vekt_dato = Column(TIMESTAMP, nullable=False)
+    beste_e1rm = Column(DECIMAL, nullable=False)  # Estimert 1RM (Epley)
+    beste_e1rm_dato = Column(TIMESTAMP, nullable=False)
+    beste_volum = Column(DECIMAL, nullable=False)  # Største volum i én logg (sett × reps × vekt)
+    beste_volum_dato = Column(TIMESTAMP, nullable=False)
+
+    # Relationships
+    bruker = relationship("Bruker")
+    ovelse = relationship("Ovelse")
+
+
+class BrukerDashboard(Base):
+    """
+    Dashboard-øyeblikksbilde per bruker
+    Oppdateres inkrementelt ved logging, slik at dashboardet er én radlesing.
+    Bygges på nytt fra ovelser_utfort hvis raden mangler.
+    """
+    __tablename__ = "bruker_dashboard"
+
+    bruker_id = Column(Integer, ForeignKey("brukere.bruker_id"), primary_key=True)
+    total_utforte_ovelser = Column(Integer, nullable=False, default=0)
+    total_volum = Column(DECIMAL, nullable=False, default=0)
+    unike_ovelser_brukt = Column(Integer, nullable=False, default=0)
+    dagtellinger = Column(ARRAY(Integer), nullable=False)  # Antall logger per dag, indeks 0 = telling_dato, 7 dager bakover
+    telling_dato = Column(Date, nullable=False)
+    total_par = Column(Integer, nullable=False, default=0)
+    balanserte_par = Column(Integer, nullable=False, default=0)
+
+    # Treningsrekker og konsistens (oppdateres inkrementelt ved logging)
+    forste_treningsdato = Column(Date)
+    siste_treningsdato = Column(Date)
+    navarende_streak = Column(Integer, nullable=False, default=0)  # Sammenhengende treningsdager som slutter på siste_treningsdato
+    lengste_streak = Column(Integer, nullable=False, default=0)
+    treningsdager = Column(Integer, nullable=False, default=0)  # Antall unike dager med trening
+    aktive_uker = Column(Integer, nullable=False, default=0)  # Antall uker (man-søn) med minst én trening
+
+    oppdatert = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    bruker = relationship("Bruker")
+
+
 class BrukerUtstyrProfil(Base):
     """
     Utstyrsprofiler per bruker (Gym, Hjemme, Reise, etc.)
@@ -249,10 +370,54 @@ class BrukerUtstyrProfil(Base):
     profil_navn = Column(String(50), nullable=False)  # 'Gym', 'Hjemme', 'Reise'
     utstyr_ids = Column(ARRAY(Integer), nullable=False)  # Array av utstyr_ids
     aktiv = Column(Boolean, default=False)
+    endring_nr = Column(BigInteger, nullable=False, server_default=FetchedValue(), server_onupdate=FetchedValue())  # Settes av trigger fra endring_seq ved hver endring
 
     __table_args__ = (
         UniqueConstraint('bruker_id', 'profil_navn', name='uq_bruker_profil'),
+        Index('ix_bruker_utstyr_profiler_bruker_endring', 'bruker_id', 'endring_nr'),
     )
 
     # Relationships
     bruker = relationship("Bruker", back_populates="utstyr_profiler")
+
+
+class SynkSletting(Base):
+    """
+    Gravsteiner for slettede rader, til delta-synk (/api/historikk/endringer)
+    Skrives av trigger ved sletting, med nummer fra samme endring_seq som
+    endring_nr på de synkede tabellene. Foreløpig kun utstyrsprofiler.
+    """
+    __tablename__ = "synk_slettinger"
+
+    endring_nr = Column(BigInteger, primary_key=True)
+    bruker_id = Column(Integer, ForeignKey("brukere.bruker_id"), nullable=False)
+    tabell = Column(String(50), nullable=False)  # 'bruker_utstyr_profiler'
+    rad_id = Column(Integer, nullable=False)  # Primærnøkkel til den slettede raden
+    slettet = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_synk_slettinger_bruker_endring', 'bruker_id', 'endring_nr'),
+    )
+
+
+class ArkivSegment(Base):
+    """
+    Manifest over arkiverte loggrader (kald lagring)
+    Gamle rader fra ovelser_utfort flyttes til komprimerte kolonnefiler
+    (.npz) på disk, én eller flere per bruker. Se app/services/arkiv.py.
+    """
+    __tablename__ = "arkiv_segmenter"
+
+    segment_id = Column(Integer, primary_key=True, index=True)
+    bruker_id = Column(Integer, ForeignKey("brukere.bruker_id"), nullable=False)
+    fil = Column(String(255), nullable=False, unique=True)  # Sti relativt til ARKIV_KATALOG
+    fra_tidspunkt = Column(TIMESTAMP, nullable=False)  # Første rad i segmentet
+    til_tidspunkt = Column(TIMESTAMP, nullable=False)  # Siste rad i segmentet
+    antall_rader = Column(Integer, nullable=False)
+    bytes = Column(BigInteger, nullable=False)  # Filstørrelse
+    opprettet = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # A user's segments in time order (export, rebuild)
+        Index('ix_arkiv_segmenter_bruker_fra', 'bruker_id', 'fra_tidspunkt'),
+    )
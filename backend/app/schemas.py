@@ -1,12 +1,14 @@
 """
 Pydantic schemas for API request/response validation
 """
-from datetime import datetime
+from datetime import datetime, date
 from typing import List, Optional
 from decimal import Decimal
 
 from pydantic import BaseModel, EmailStr, Field, validator
 
+from app.utils.tidssone import er_gyldig_tidssone
+
 
 # ============================================================================
 # AUTHENTICATION SCHEMAS
@@ -40,11 +42,24 @@ class BrukerResponse(BaseModel):
     opprettet_dato: datetime
     aktiv: bool
     rolle: str
+    tidssone: str = Field(..., description="IANA time zone used for grouping by day")
 
     class Config:
         from_attributes = True
 
 
+class BrukerUpdate(BaseModel):
+    """Schema for updating the current user's settings"""
+    tidssone: Optional[str] = Field(None, max_length=64, description="IANA time zone, e.g. 'Europe/Oslo'")
+
+    @validator('tidssone')
+    def validate_tidssone(cls, v):
+        """Ensure the time zone is a known IANA zone"""
+        if v is not None and not er_gyldig_tidssone(v):
+            raise ValueError(f"Unknown time zone: {v}")
+        return v
+
+
 # ============================================================================
 # MUSKEL SCHEMAS
 # ============================================================================
@@ -194,7 +209,9 @@ class OvelseUtfortResponse(BaseModel):
     repetisjoner: int
     vekt: Decimal
     tidspunkt: datetime
+    okt_id: Optional[int] = Field(None, description="Training session the log belongs to")
     involverte_muskler: List[MuskelInfo] = Field(default_factory=list, description="List of involved muscles with their type (primary/secondary)")
+    nye_rekorder: List[str] = Field(default_factory=list, description="Personal records beaten by this log ('vekt', 'e1rm', 'volum')")
 
     class Config:
         from_attributes = True
@@ -222,6 +239,71 @@ class HistorikkResponse(BaseModel):
     ovelser: List[OvelseUtfortResponse] = Field(..., description="Exercises completed on this date")
 
 
+class HistorikkImportResponse(BaseModel):
+    """Schema for result of a CSV history import"""
+    importert: int = Field(..., description="Number of rows imported")
+    hoppet_over: int = Field(..., description="Number of rows skipped")
+    ukjente_ovelser: List[str] = Field(default_factory=list, description="Exercise names not found in the catalog (capped)")
+    feil: List[str] = Field(default_factory=list, description="Validation errors for skipped rows (capped)")
+
+
+class TreningsoktSammendrag(BaseModel):
+    """Schema for one training session (aggregates only)"""
+    okt_id: int
+    start_tidspunkt: datetime = Field(..., description="First log in the session")
+    slutt_tidspunkt: datetime = Field(..., description="Last log in the session")
+    varighet_minutter: int = Field(..., description="Minutes from first to last log")
+    antall_ovelser: int = Field(..., description="Number of different exercises")
+    antall_logginger: int = Field(..., description="Number of logs")
+    total_sett: int = Field(..., description="Total number of sets")
+    total_volum: Decimal = Field(..., description="Total volume (sett × reps × vekt)")
+
+
+class TreningsoktDetaljerResponse(TreningsoktSammendrag):
+    """Schema for one training session with its exercises"""
+    ovelser: List[OvelseUtfortResponse]
+
+
+class EndringOvelse(BaseModel):
+    """Schema for a changed log row in a delta sync"""
+    utfort_id: int
+    ovelse_id: int
+    sett: int
+    repetisjoner: int
+    vekt: Decimal
+    tidspunkt: datetime
+    okt_id: Optional[int] = None
+    endring_nr: int
+
+
+class EndringMuskelStatus(BaseModel):
+    """Schema for a changed muscle status row in a delta sync"""
+    muskel_id: int
+    sist_trent_dato: Optional[datetime] = None
+    antall_ganger_trent: int
+    total_volum: Decimal
+    endring_nr: int
+
+
+class EndringProfil(BaseModel):
+    """Schema for a changed equipment profile in a delta sync"""
+    profil_id: int
+    profil_navn: str
+    utstyr_ids: List[int]
+    aktiv: bool
+    endring_nr: int
+
+
+class EndringerResponse(BaseModel):
+    """Schema for changes since a sync cursor"""
+    ovelser: List[EndringOvelse] = Field(..., description="New or changed log rows")
+    muskel_status: List[EndringMuskelStatus] = Field(..., description="New or changed muscle status rows")
+    profiler: List[EndringProfil] = Field(..., description="New or changed equipment profiles")
+    slettede_profiler: List[int] = Field(..., description="IDs of deleted equipment profiles")
+    cursor: str = Field(..., description="Cursor to pass as 'siden' in the next sync")
+    flere: bool = Field(..., description="True if more changes are waiting (sync again right away)")
+
+
 class TreningsoktResponse(BaseModel):
     """Schema for single workout session"""
     dato: datetime
@@ -257,6 +339,29 @@ class AntagonistiskBalanseResponse(BaseModel):
     avvik_prosent: float = Field(..., description="Percentage deviation from desired ratio")
 
 
+class KategoriBalanseResponse(BaseModel):
+    """Schema for antagonistic balance aggregated per category pair"""
+    kategori_1: str = Field(..., description="hovedkategori of the first muscles (e.g. overkropp_push)")
+    kategori_2: str = Field(..., description="hovedkategori of the opposing muscles (e.g. overkropp_pull)")
+    antall_par: int = Field(..., description="Number of antagonistic pairs in this category pair")
+    kategori_1_volum: Decimal
+    kategori_2_volum: Decimal
+    faktisk_ratio: Decimal = Field(..., description="Actual volume ratio (kategori_1 / kategori_2)")
+    onsket_ratio: Decimal = Field(..., description="Desired ratio (average of the pairs)")
+    balanse_status: str = Field(..., description="'balanced', 'muskel_1_needs_work', or 'muskel_2_needs_work'")
+    avvik_prosent: float = Field(..., description="Percentage deviation from desired ratio")
+
+
+class MuskelOvelseBruk(BaseModel):
+    """Schema for usage of one exercise in muscle details"""
+    ovelse_id: int
+    ovelse_navn: Optional[str] = None
+    muskel_type: str = Field(..., description="'primar' or 'sekundar' for this muscle")
+    antall_ganger_brukt: int
+    volum: Decimal = Field(..., description="Volume (sets × reps × weight) in the date range")
+    sist_brukt: datetime
+
+
 class MuskelDetaljerResponse(BaseModel):
     """Schema for detailed muscle statistics"""
     muskel_id: int
@@ -266,14 +371,80 @@ class MuskelDetaljerResponse(BaseModel):
     total_volum: Decimal
     antall_ganger_trent: int
     sist_trent_dato: Optional[datetime] = None
-    ovelser_brukt: List[dict] = Field(default_factory=list, description="List of exercises used for this muscle with counts")
+    fra_dato: Optional[date] = None
+    til_dato: Optional[date] = None
+    periode_volum: Decimal = Field(..., description="Weighted volume for this muscle in the date range")
+    antall_ovelser: int = Field(..., description="Total exercises used for this muscle in the date range (all pages)")
+    limit: int
+    offset: int
+    ovelser_brukt: List[MuskelOvelseBruk] = Field(default_factory=list, description="Exercises used for this muscle, most used first")
 
 
 class VolumOvertidResponse(BaseModel):
     """Schema for volume over time"""
-    dato: str = Field(..., description="Date (YYYY-MM-DD)")
-    total_volum: Decimal = Field(..., description="Total volume on this date")
-    antall_ovelser: int = Field(..., description="Number of exercises on this date")
+    dato: str = Field(..., description="Start date of the bucket (YYYY-MM-DD)")
+    total_volum: Decimal = Field(..., description="Total volume in this bucket")
+    antall_ovelser: int = Field(..., description="Number of distinct exercises in this bucket")
+
+
+class BelastningResponse(BaseModel):
+    """Schema for acute:chronic workload ratio per muscle"""
+    muskel_id: int
+    muskel_navn: str
+    akutt_volum: Decimal = Field(..., description="Weighted volume last 7 days")
+    kronisk_volum: Decimal = Field(..., description="Weighted volume last 28 days")
+    ratio: Optional[float] = Field(None, description="Acute week / average chronic week (None if no chronic load)")
+    risiko: str = Field(..., description="'ingen_data', 'underbelastet', 'optimal', 'forhoyet' or 'hoy_risiko'")
+
+
+class KalenderResponse(BaseModel):
+    """Schema for calendar heatmap (column-oriented days × muscles matrix)"""
+    start_dato: str = Field(..., description="First day in the matrix (YYYY-MM-DD)")
+    antall_dager: int = Field(..., description="Number of days (length of each volume array)")
+    muskel_ids: List[int] = Field(..., description="Muscle IDs, one per volume array")
+    muskel_navn: List[str] = Field(..., description="Muscle names, one per volume array")
+    volum: List[List[float]] = Field(..., description="volum[i][j] = weighted volume for muscle i on day start_dato + j")
+
+
+class ProgresjonOkt(BaseModel):
+    """Schema for one session in a progression trend"""
+    dato: str = Field(..., description="Session date (YYYY-MM-DD)")
+    topp_vekt: Decimal = Field(..., description="Heaviest weight in the session")
+    e1rm: Decimal = Field(..., description="Best estimated 1RM in the session (Epley)")
+    volum: Decimal = Field(..., description="Total volume in the session")
+    e1rm_glidende_snitt: Decimal = Field(..., description="Moving average of e1RM over the last 'vindu' sessions")
+
+
+class ProgresjonResponse(BaseModel):
+    """Schema for progressive overload trend of one exercise"""
+    ovelse_id: int
+    ovelse_navn: str
+    vindu: int = Field(..., description="Sessions in the moving average")
+    antall_okter: int
+    stigning_e1rm_per_uke: Optional[float] = Field(None, description="Least-squares slope of e1RM, kg per week (None if < 2 sessions)")
+    okter: List[ProgresjonOkt] = Field(default_factory=list)
+
+
+class PersonligRekordResponse(BaseModel):
+    """Schema for personal records of one exercise"""
+    ovelse_id: int
+    ovelse_navn: str
+    beste_vekt: Decimal = Field(..., description="Heaviest weight logged")
+    beste_vekt_dato: datetime
+    beste_e1rm: Decimal = Field(..., description="Best estimated 1RM (Epley)")
+    beste_e1rm_dato: datetime
+    beste_volum: Decimal = Field(..., description="Best volume in one log (sets × reps × weight)")
+    beste_volum_dato: datetime
+
+
+class PersentilResponse(BaseModel):
+    """Schema for a user's percentile among all active users for one metric"""
+    metrikk: str = Field(..., description="'ukentlig_volum' or 'treningsdager_per_uke'")
+    beskrivelse: str
+    verdi: float = Field(..., description="The user's own value")
+    persentil: Optional[float] = Field(None, description="Share of active users (0-100) below the user's value (None until computed)")
+    antall_brukere: int = Field(..., description="Active users in the comparison")
+    beregnet: Optional[datetime] = Field(None, description="When the system-wide distribution was computed")
 
 
 # ============================================================================
@@ -305,6 +476,59 @@ class BrukerAdminResponse(BrukerResponse):
     pass
 
 
+class BrukerBelastningResponse(BaseModel):
+    """Schema for workload ratios of one user (admin view)"""
+    bruker_id: int
+    brukernavn: Optional[str] = None
+    hoyeste_ratio: Optional[float] = Field(None, description="Highest workload ratio across muscles")
+    risiko: str = Field(..., description="Risk zone for the highest ratio")
+    muskler: List[BelastningResponse] = Field(default_factory=list)
+
+
+class AnalyseOvelse(BaseModel):
+    """Schema for system-wide usage of one exercise"""
+    ovelse_id: int
+    ovelse_navn: str
+    antall_logginger: int
+    antall_brukere: int
+    sist_brukt: Optional[datetime] = None
+
+
+class AnalyseOvelseBrukResponse(BaseModel):
+    """Schema for most used exercises (admin analytics)"""
+    oppfrisket: Optional[datetime] = Field(None, description="Last view refresh by this worker (None if not yet refreshed)")
+    ovelser: List[AnalyseOvelse] = Field(default_factory=list)
+
+
+class AnalyseDag(BaseModel):
+    """Schema for system-wide activity on one day"""
+    dato: date
+    aktive_brukere: int
+    antall_logginger: int
+    total_volum: Decimal
+
+
+class AnalyseAktiveBrukereResponse(BaseModel):
+    """Schema for active users per day (admin analytics)"""
+    oppfrisket: Optional[datetime] = Field(None, description="Last view refresh by this worker (None if not yet refreshed)")
+    dager: List[AnalyseDag] = Field(default_factory=list)
+
+
+class AnalyseMuskel(BaseModel):
+    """Schema for system-wide volume of one muscle"""
+    muskel_id: int
+    muskel_navn: str
+    hovedkategori: str
+    total_volum: Decimal = Field(..., description="Weighted volume across all users")
+    antall_brukere: int
+
+
+class AnalyseMuskelVolumResponse(BaseModel):
+    """Schema for volume per muscle across the system (admin analytics)"""
+    oppfrisket: Optional[datetime] = Field(None, description="Last view refresh by this worker (None if not yet refreshed)")
+    muskler: List[AnalyseMuskel] = Field(default_factory=list)
+
+
 # ============================================================================
 # GENERIC RESPONSE SCHEMAS
 # ============================================================================
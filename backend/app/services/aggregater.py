@@ -0,0 +1,201 @@
+"""
+Rebuild of per-user aggregates derived from ovelser_utfort
+
+Normally these tables are maintained incrementally when logging.
+After bulk operations (e.g. history import) they are rebuilt for one
+user with set-based statements instead of replaying every row.
+
+Archived rows (see services/arkiv) are loaded into a temp table and
+included, so lifetime aggregates still cover the whole history.
+"""
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.arkiv import logg_med_arkiv
+from app.services.statistikk import beregn_dashboard
+from app.services.treningsokter import OKT_PAUSE_MINUTTER
+
+
+# Volume weighting per muscle type (same as oppdater_muskel_status_etter_logg)
+_VEKTET_VOLUM = """
+    u.sett * u.repetisjoner * u.vekt
+    * CASE WHEN om.muskel_type = 'primar' THEN 1.0 ELSE 0.5 END
+"""
+
+
+def gjenoppbygg_dagsaggregater(db: Session, bruker_id: int, logg: Optional[str] = None):
+    """
+    Rebuild the aggregates grouped by the user's local calendar day.
+
+    Rebuilds bruker_muskel_dagsvolum and bruker_dashboard. Used by the
+    full rebuild and when the user's time zone changes.
+
+    Note: commit happens in the caller.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        logg: Log source if the archive is already loaded (see
+              arkiv.logg_med_arkiv); loaded here if None
+    """
+    params = {"bruker_id": bruker_id}
+
+    if logg is None:
+        logg = logg_med_arkiv(db, bruker_id)
+
+    db.execute(text("""
+        DELETE FROM bruker_muskel_dagsvolum WHERE bruker_id = :bruker_id
+    """), params)
+
+    db.execute(text(f"""
+        INSERT INTO bruker_muskel_dagsvolum (bruker_id, muskel_id, dato, volum)
+        SELECT
+            u.bruker_id,
+            om.muskel_id,
+            ((u.tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE b.tidssone)::date AS dato,
+            SUM({_VEKTET_VOLUM})
+        FROM {logg} u
+        JOIN brukere b ON b.bruker_id = u.bruker_id
+        JOIN ovelse_muskler om ON om.ovelse_id = u.ovelse_id
+        WHERE u.bruker_id = :bruker_id
+        GROUP BY 1, 2, 3
+    """), params)
+
+    beregn_dashboard(db, bruker_id, logg)
+
+
+def gjenoppbygg_bruker_aggregater(db: Session, bruker_id: int):
+    """
+    Rebuild all log-derived aggregates for a user in one set-based pass.
+
+    Rebuilds:
+    - bruker_muskel_status
+    - bruker_ovelse_historikk
+    - personlige_rekorder
+    - bruker_muskel_dagsvolum and bruker_dashboard (gjenoppbygg_dagsaggregater)
+    - treningsokter (and ovelser_utfort.okt_id); sessions of archived
+      rows are kept, all other sessions are rebuilt from the hot table
+
+    Note: commit happens in the caller.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+    """
+    params = {"bruker_id": bruker_id}
+
+    logg = logg_med_arkiv(db, bruker_id)
+    arkiv_lastet = logg != "ovelser_utfort"
+
+    db.execute(text(f"""
+        INSERT INTO bruker_muskel_status (
+            bruker_id, muskel_id, sist_trent_dato, antall_ganger_trent, total_volum
+        )
+        SELECT
+            u.bruker_id,
+            om.muskel_id,
+            MAX(u.tidspunkt),
+            COUNT(*),
+            SUM({_VEKTET_VOLUM})
+        FROM {logg} u
+        JOIN ovelse_muskler om ON om.ovelse_id = u.ovelse_id
+        WHERE u.bruker_id = :bruker_id
+        GROUP BY u.bruker_id, om.muskel_id
+        ON CONFLICT (bruker_id, muskel_id) DO UPDATE SET
+            sist_trent_dato = EXCLUDED.sist_trent_dato,
+            antall_ganger_trent = EXCLUDED.antall_ganger_trent,
+            total_volum = EXCLUDED.total_volum
+    """), params)
+
+    db.execute(text(f"""
+        INSERT INTO bruker_ovelse_historikk (
+            bruker_id, ovelse_id, sist_brukt_dato, antall_ganger_brukt
+        )
+        SELECT bruker_id, ovelse_id, MAX(tidspunkt), COUNT(*)
+        FROM {logg} u
+        WHERE bruker_id = :bruker_id
+        GROUP BY bruker_id, ovelse_id
+        ON CONFLICT (bruker_id, ovelse_id) DO UPDATE SET
+            sist_brukt_dato = EXCLUDED.sist_brukt_dato,
+            antall_ganger_brukt = EXCLUDED.antall_ganger_brukt
+    """), params)
+
+    db.execute(text("""
+        DELETE FROM personlige_rekorder WHERE bruker_id = :bruker_id
+    """), params)
+
+    db.execute(text(f"""
+        INSERT INTO personlige_rekorder (
+            bruker_id, ovelse_id,
+            beste_vekt, beste_vekt_dato,
+            beste_e1rm, beste_e1rm_dato,
+            beste_volum, beste_volum_dato
+        )
+        SELECT
+            bruker_id,
+            ovelse_id,
+            MAX(vekt),
+            (array_agg(tidspunkt ORDER BY vekt DESC, tidspunkt))[1],
+            MAX(vekt * (1 + repetisjoner / 30.0)),
+            (array_agg(tidspunkt ORDER BY vekt * (1 + repetisjoner / 30.0) DESC, tidspunkt))[1],
+            MAX(sett * repetisjoner * vekt),
+            (array_agg(tidspunkt ORDER BY sett * repetisjoner * vekt DESC, tidspunkt))[1]
+        FROM {logg} u
+        WHERE bruker_id = :bruker_id
+        GROUP BY bruker_id, ovelse_id
+    """), params)
+
+    # The dashboard reads the muscle status and exercise history rebuilt above
+    gjenoppbygg_dagsaggregater(db, bruker_id, logg)
+
+    # Sessions: a new one starts after a pause longer than OKT_PAUSE_MINUTTER.
+    # Deleting sets okt_id to NULL on the log (ON DELETE SET NULL). Archiving
+    # never splits a session, so sessions holding archived rows are kept
+    # as-is; every hot row without a session (including imported rows older
+    # than the archive) is grouped into new sessions.
+    okt_params = {**params, "pause_minutter": OKT_PAUSE_MINUTTER}
+    behold_arkiverte = """
+          AND NOT EXISTS (SELECT 1 FROM arkiv_logg a WHERE a.okt_id = treningsokter.okt_id)
+    """ if arkiv_lastet else ""
+
+    db.execute(text(f"""
+        DELETE FROM treningsokter
+        WHERE bruker_id = :bruker_id {behold_arkiverte}
+    """), okt_params)
+
+    db.execute(text(f"""
+        WITH merket AS (
+            SELECT
+                ovelse_id, sett, repetisjoner, vekt, tidspunkt, utfort_id,
+                CASE
+                    WHEN tidspunkt - LAG(tidspunkt) OVER (ORDER BY tidspunkt, utfort_id)
+                         <= make_interval(mins => :pause_minutter)
+                    THEN 0 ELSE 1
+                END AS ny_okt
+            FROM ovelser_utfort
+            WHERE bruker_id = :bruker_id AND okt_id IS NULL
+        ),
+        gruppert AS (
+            SELECT *, SUM(ny_okt) OVER (ORDER BY tidspunkt, utfort_id) AS okt_nr
+            FROM merket
+        ),
+        okter AS (
+            INSERT INTO treningsokter (
+                bruker_id, start_tidspunkt, slutt_tidspunkt,
+                antall_ovelser, antall_logginger, total_sett, total_volum
+            )
+            SELECT
+                :bruker_id, MIN(tidspunkt), MAX(tidspunkt),
+                COUNT(DISTINCT ovelse_id), COUNT(*), SUM(sett), SUM(sett * repetisjoner * vekt)
+            FROM gruppert
+            GROUP BY okt_nr
+            RETURNING okt_id, start_tidspunkt, slutt_tidspunkt
+        )
+        UPDATE ovelser_utfort u
+        SET okt_id = o.okt_id
+        FROM okter o
+        WHERE u.bruker_id = :bruker_id
+          AND u.okt_id IS NULL
+          AND u.tidspunkt BETWEEN o.start_tidspunkt AND o.slutt_tidspunkt
+    """), okt_params)
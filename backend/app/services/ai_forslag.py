@@ -12,12 +12,14 @@ from typing import List, Optional, Tuple
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
+from sqlalchemy.dialects.postgresql import insert
 
 from app.models import (
     Bruker, Muskel, Ovelse, OvelseMuskel, OvelseUtstyr,
-    BrukerMuskelStatus, BrukerUtstyrProfil, AntagonistiskPar,
+    BrukerMuskelStatus, BrukerMuskelDagsvolum, BrukerUtstyrProfil, AntagonistiskPar,
     OvelseUtfort
 )
+from app.utils.tidssone import lokal_idag
 
 
 # ============================================================================
@@ -334,8 +336,9 @@ def oppdater_muskel_status_etter_logg(
     db: Session,
     bruker_id: int,
     ovelse_id: int,
-    volum: Decimal
-):
+    volum: Decimal,
+    tidssone: str
+) -> List[dict]:
     """
     Update muscle status after logging an exercise.
 
@@ -343,12 +346,21 @@ def oppdater_muskel_status_etter_logg(
     - sist_trent_dato
     - antall_ganger_trent
     - total_volum (weighted by muscle involvement)
+    - daily volume bucket (bruker_muskel_dagsvolum)
+
+    Note: commit happens in the caller, together with the log row and
+    the data version bump.
 
     Args:
         db: Database session
         bruker_id: User ID
         ovelse_id: Exercise ID that was logged
         volum: Volume (sett × reps × vekt)
+        tidssone: User's time zone (the daily bucket is the local day)
+
+    Returns:
+        List of changed muscle statuses (muskel_id, lagt_til_volum,
+        total_volum, antall_ganger_trent)
     """
     # Get muscles involved in this exercise
     ovelse_muskler = db.query(OvelseMuskel).filter(
@@ -356,6 +368,8 @@ def oppdater_muskel_status_etter_logg(
     ).all()
 
     now = datetime.utcnow()
+    idag = lokal_idag(tidssone)
+    endringer = []
 
     for ovelse_muskel in ovelse_muskler:
         muskel_id = ovelse_muskel.muskel_id
@@ -393,4 +407,24 @@ def oppdater_muskel_status_etter_logg(
             status.antall_ganger_trent += 1
             status.total_volum = (status.total_volum or Decimal(0)) + weighted_volum
 
-    db.commit()
+        # Add to today's volume bucket (used for workload ratio)
+        bucket = insert(BrukerMuskelDagsvolum).values(
+            bruker_id=bruker_id,
+            muskel_id=muskel_id,
+            dato=idag,
+            volum=weighted_volum
+        )
+        bucket = bucket.on_conflict_do_update(
+            index_elements=["bruker_id", "muskel_id", "dato"],
+            set_={"volum": BrukerMuskelDagsvolum.volum + bucket.excluded.volum}
+        )
+        db.execute(bucket)
+
+        endringer.append({
+            "muskel_id": muskel_id,
+            "lagt_til_volum": weighted_volum,
+            "total_volum": status.total_volum,
+            "antall_ganger_trent": status.antall_ganger_trent
+        })
+
+    return endringer
@@ -0,0 +1,134 @@
+"""
+Cross-user analytics for admins, read from materialized views
+
+The views (see alembic revision 7c2a9e4b1f63) aggregate the whole
+ovelser_utfort table. They are refreshed CONCURRENTLY by a scheduled
+job, so readers always see the previous contents and never block on a
+refresh. Admin endpoints only ever query the views.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+
+# Seconds between view refreshes
+ANALYSE_INTERVALL_SEKUNDER = float(os.getenv("ANALYSE_INTERVALL_SEKUNDER", "600"))
+
+ANALYSE_VIEWS = [
+    "mv_analyse_ovelse_bruk",
+    "mv_analyse_aktive_brukere_per_dag",
+    "mv_analyse_muskel_volum",
+]
+
+# View name -> (finished at, duration in seconds) of the last refresh in this process
+_siste_oppfriskning: Dict[str, tuple] = {}
+
+
+def oppfrisk_analyse_views(db: Session):
+    """
+    Refresh all analytics views concurrently, one transaction per view.
+
+    Args:
+        db: Database session
+    """
+    for view in ANALYSE_VIEWS:
+        start = time.monotonic()
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+        db.commit()
+        _siste_oppfriskning[view] = (datetime.utcnow(), round(time.monotonic() - start, 3))
+
+
+def oppdater_analyse_views():
+    """Scheduled job: refresh the views with its own session."""
+    db = SessionLocal()
+    try:
+        oppfrisk_analyse_views(db)
+    finally:
+        db.close()
+
+
+def _oppfrisket(view: str) -> Optional[datetime]:
+    siste = _siste_oppfriskning.get(view)
+    return siste[0] if siste else None
+
+
+def hent_ovelse_bruk(db: Session, limit: int = 20) -> Dict:
+    """
+    Most used exercises across all users.
+
+    Args:
+        db: Database session
+        limit: Number of exercises to return
+
+    Returns:
+        Dict with oppfrisket and ovelser (sorted by number of logs)
+    """
+    rader = db.execute(text("""
+        SELECT ovelse_id, ovelse_navn, antall_logginger, antall_brukere, sist_brukt
+        FROM mv_analyse_ovelse_bruk
+        ORDER BY antall_logginger DESC, ovelse_id
+        LIMIT :limit
+    """), {"limit": limit}).mappings().all()
+
+    return {
+        "oppfrisket": _oppfrisket("mv_analyse_ovelse_bruk"),
+        "ovelser": [dict(rad) for rad in rader]
+    }
+
+
+def hent_aktive_brukere_per_dag(db: Session, dager: int = 30) -> Dict:
+    """
+    Active users, logs and volume per day across the system.
+
+    Args:
+        db: Database session
+        dager: Number of days ending today
+
+    Returns:
+        Dict with oppfrisket and dager (sorted by date)
+    """
+    start = datetime.utcnow().date() - timedelta(days=dager - 1)
+
+    rader = db.execute(text("""
+        SELECT dato, aktive_brukere, antall_logginger, total_volum
+        FROM mv_analyse_aktive_brukere_per_dag
+        WHERE dato >= :start
+        ORDER BY dato
+    """), {"start": start}).mappings().all()
+
+    return {
+        "oppfrisket": _oppfrisket("mv_analyse_aktive_brukere_per_dag"),
+        "dager": [dict(rad) for rad in rader]
+    }
+
+
+def hent_muskel_volum_system(db: Session) -> Dict:
+    """
+    Weighted volume per muscle across all users.
+
+    Returns:
+        Dict with oppfrisket and muskler (sorted by volume)
+    """
+    rader = db.execute(text("""
+        SELECT muskel_id, muskel_navn, hovedkategori, total_volum, antall_brukere
+        FROM mv_analyse_muskel_volum
+        ORDER BY total_volum DESC, muskel_id
+    """)).mappings().all()
+
+    return {
+        "oppfrisket": _oppfrisket("mv_analyse_muskel_volum"),
+        "muskler": [dict(rad) for rad in rader]
+    }
+
+
+def analyse_statistikk() -> Dict[str, Dict]:
+    """Last refresh per view (this worker only) for monitoring."""
+    return {
+        view: {"oppfrisket": tidspunkt, "varighet_sekunder": varighet}
+        for view, (tidspunkt, varighet) in _siste_oppfriskning.items()
+    }
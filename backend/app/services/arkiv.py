@@ -0,0 +1,356 @@
+"""
+Cold storage of old log rows in compressed segment files
+
+Rows in ovelser_utfort older than a horizon are moved per user into
+compressed columnar segment files (NumPy .npz) under ARKIV_KATALOG, and
+recorded in the arkiv_segmenter manifest. The hot table and its indexes
+only hold recent history.
+
+- The archive boundary is moved back to the start of the session that
+  spans the horizon, so a training session is never split
+- Per-user aggregates (muscle status, records, dashboard, sessions) are
+  kept as they are, so lifetime totals are unchanged
+- Export (services/historikk_eksport), aggregate rebuilds
+  (services/aggregater) and the dashboard build read the segments
+  transparently
+- History pages, delta sync and the statistics frame only see the hot
+  table; archived rows disappear from them like detached partitions
+
+Segment columns: utfort_id, tidspunkt (datetime64[us]), ovelse_id, sett,
+repetisjoner, vekt_hundredeler (vekt × 100, exact) and okt_id (-1 for
+none). A segment holds at most ARKIV_SEGMENT_RADER rows.
+"""
+import csv
+import io
+import os
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import ArkivSegment
+from app.utils.etag import bump_data_versjon
+
+
+# Directory for segment files
+ARKIV_KATALOG = Path(os.getenv("ARKIV_KATALOG", "arkiv"))
+
+# Rows older than this many months are archived
+ARKIV_HORISONT_MANEDER = int(os.getenv("ARKIV_HORISONT_MANEDER", "24"))
+
+# Max rows per segment file (bounds memory when writing and reading)
+ARKIV_SEGMENT_RADER = int(os.getenv("ARKIV_SEGMENT_RADER", "100000"))
+
+# Same attributes as the log rows read by the export
+ArkivRad = namedtuple("ArkivRad", ["utfort_id", "tidspunkt", "ovelse_id", "sett", "repetisjoner", "vekt", "okt_id"])
+
+# The log including archived rows (temp table from last_arkiv_til_temp)
+LOGG_MED_ARKIV = """(
+    SELECT bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt FROM ovelser_utfort
+    UNION ALL
+    SELECT bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt FROM arkiv_logg
+)"""
+
+_ARKIV_RADER_SQL = text("""
+    SELECT utfort_id, tidspunkt, ovelse_id, sett, repetisjoner, vekt, okt_id
+    FROM ovelser_utfort
+    WHERE bruker_id = :bruker_id AND tidspunkt < :grense
+    ORDER BY tidspunkt, utfort_id
+""")
+
+
+def arkiv_horisont(maneder: int = ARKIV_HORISONT_MANEDER) -> datetime:
+    """First day of the month 'maneder' months before the current month."""
+    idag = datetime.utcnow()
+    indeks = idag.year * 12 + idag.month - 1 - maneder
+    return datetime(indeks // 12, indeks % 12 + 1, 1)
+
+
+def _skriv_segment(bruker_id: int, rader: List) -> tuple:
+    """
+    Write rows to a new segment file.
+
+    The file is written under a temporary name and renamed when
+    complete, so a crash never leaves a partial segment.
+
+    Returns:
+        (path relative to ARKIV_KATALOG, file size in bytes)
+    """
+    utfort_id, tidspunkt, ovelse_id, sett, repetisjoner, vekt, okt_id = zip(*rader)
+
+    relativ = Path(str(bruker_id)) / f"{tidspunkt[0]:%Y%m%d}_{utfort_id[0]}.npz"
+    fil = ARKIV_KATALOG / relativ
+    fil.parent.mkdir(parents=True, exist_ok=True)
+
+    midlertidig = fil.with_suffix(".tmp")
+    with open(midlertidig, "wb") as f:
+        np.savez_compressed(
+            f,
+            utfort_id=np.array(utfort_id, dtype=np.int64),
+            tidspunkt=np.array(tidspunkt, dtype="datetime64[us]"),
+            ovelse_id=np.array(ovelse_id, dtype=np.int32),
+            sett=np.array(sett, dtype=np.int16),
+            repetisjoner=np.array(repetisjoner, dtype=np.int16),
+            vekt_hundredeler=np.array([int((v * 100).to_integral_value()) for v in vekt], dtype=np.int64),
+            okt_id=np.array([-1 if o is None else o for o in okt_id], dtype=np.int64)
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(midlertidig, fil)
+
+    return str(relativ), fil.stat().st_size
+
+
+def _les_segment(segment: ArkivSegment) -> Dict[str, np.ndarray]:
+    """Load all columns of a segment file."""
+    with np.load(ARKIV_KATALOG / segment.fil, allow_pickle=False) as data:
+        return {navn: data[navn] for navn in data.files}
+
+
+def arkiver_bruker(db: Session, bruker_id: int, horisont: datetime) -> List[ArkivSegment]:
+    """
+    Move a user's rows older than the horizon into segment files.
+
+    Rows are read with a server-side cursor, one segment at a time, and
+    deleted from ovelser_utfort once all segments are written. Bumps the
+    user's data version first, which also holds the user's row lock so
+    no log or import for the user runs concurrently.
+
+    Note: commit happens in the caller. If this fails, files already
+    written are removed; if the commit fails, the caller must remove
+    the files of the returned segments (see slett_segmentfiler).
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        horisont: Archive rows logged before this time
+
+    Returns:
+        The new segments (empty if nothing to archive)
+    """
+    bump_data_versjon(db, bruker_id)
+
+    # Don't split the session that spans the horizon
+    okt_start = db.execute(text("""
+        SELECT MIN(start_tidspunkt) FROM treningsokter
+        WHERE bruker_id = :bruker_id AND slutt_tidspunkt >= :horisont
+    """), {"bruker_id": bruker_id, "horisont": horisont}).scalar()
+    grense = min(horisont, okt_start) if okt_start is not None else horisont
+
+    params = {"bruker_id": bruker_id, "grense": grense}
+    resultat = db.execute(_ARKIV_RADER_SQL.execution_options(yield_per=ARKIV_SEGMENT_RADER), params)
+
+    segmenter = []
+    try:
+        for rader in resultat.partitions():
+            fil, storrelse = _skriv_segment(bruker_id, rader)
+            segmenter.append(ArkivSegment(
+                bruker_id=bruker_id,
+                fil=fil,
+                fra_tidspunkt=rader[0].tidspunkt,
+                til_tidspunkt=rader[-1].tidspunkt,
+                antall_rader=len(rader),
+                bytes=storrelse
+            ))
+
+        if segmenter:
+            db.add_all(segmenter)
+            db.execute(text("""
+                DELETE FROM ovelser_utfort
+                WHERE bruker_id = :bruker_id AND tidspunkt < :grense
+            """), params)
+    except Exception:
+        slett_segmentfiler(segmenter)
+        raise
+
+    return segmenter
+
+
+def slett_segmentfiler(segmenter: List[ArkivSegment]):
+    """Remove segment files (after a rolled back archive run)."""
+    for segment in segmenter:
+        (ARKIV_KATALOG / segment.fil).unlink(missing_ok=True)
+
+
+def arkiver_gamle_rader(db: Session, maneder: int = ARKIV_HORISONT_MANEDER) -> List[Dict]:
+    """
+    Archive rows older than 'maneder' months for all users.
+
+    Commits once per user; a failing user is rolled back (and its new
+    files removed) before the error is raised.
+
+    Args:
+        db: Database session
+        maneder: Archive horizon in months before the current month
+
+    Returns:
+        List of dicts with bruker_id, segmenter and rader per archived user
+    """
+    horisont = arkiv_horisont(maneder)
+
+    # Only scans the partitions before the horizon
+    bruker_ids = db.execute(text("""
+        SELECT DISTINCT bruker_id FROM ovelser_utfort WHERE tidspunkt < :horisont
+    """), {"horisont": horisont}).scalars().all()
+    db.commit()
+
+    arkivert = []
+    for bruker_id in bruker_ids:
+        try:
+            segmenter = arkiver_bruker(db, bruker_id, horisont)
+        except Exception:
+            db.rollback()
+            raise
+
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            slett_segmentfiler(segmenter)
+            raise
+
+        if segmenter:
+            arkivert.append({
+                "bruker_id": bruker_id,
+                "segmenter": len(segmenter),
+                "rader": sum(s.antall_rader for s in segmenter)
+            })
+
+    return arkivert
+
+
+def hent_segmenter(db: Session, bruker_id: int) -> List[ArkivSegment]:
+    """A user's segments, oldest first."""
+    return db.query(ArkivSegment).filter(
+        ArkivSegment.bruker_id == bruker_id
+    ).order_by(
+        ArkivSegment.fra_tidspunkt,
+        ArkivSegment.segment_id
+    ).all()
+
+
+def arkiv_rader(db: Session, bruker_id: int, batch_storrelse: int) -> Iterator[List[ArkivRad]]:
+    """
+    Read a user's archived rows, oldest first.
+
+    Only one segment is in memory at a time.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        batch_storrelse: Max rows per yielded batch
+
+    Yields:
+        Lists of ArkivRad
+    """
+    for segment in hent_segmenter(db, bruker_id):
+        data = _les_segment(segment)
+
+        for i in range(0, segment.antall_rader, batch_storrelse):
+            utsnitt = slice(i, i + batch_storrelse)
+            kolonner = zip(
+                data["utfort_id"][utsnitt].tolist(),
+                data["tidspunkt"][utsnitt].tolist(),
+                data["ovelse_id"][utsnitt].tolist(),
+                data["sett"][utsnitt].tolist(),
+                data["repetisjoner"][utsnitt].tolist(),
+                data["vekt_hundredeler"][utsnitt].tolist(),
+                data["okt_id"][utsnitt].tolist()
+            )
+            yield [
+                ArkivRad(utfort_id, tidspunkt, ovelse_id, sett, repetisjoner,
+                         Decimal(vekt).scaleb(-2), okt_id if okt_id >= 0 else None)
+                for utfort_id, tidspunkt, ovelse_id, sett, repetisjoner, vekt, okt_id in kolonner
+            ]
+
+
+def last_arkiv_til_temp(db: Session, bruker_id: int) -> int:
+    """
+    Load a user's archived rows into the temp table arkiv_logg.
+
+    The table has the columns of ovelser_utfort that aggregates are
+    built from (okt_id is NULL for rows without a session), lives until
+    the end of the transaction, and is filled with COPY one segment at
+    a time.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+
+    Returns:
+        Number of rows loaded (0 means the table was not created)
+    """
+    segmenter = hent_segmenter(db, bruker_id)
+    if not segmenter:
+        return 0
+
+    db.execute(text("DROP TABLE IF EXISTS arkiv_logg"))
+    db.execute(text("""
+        CREATE TEMP TABLE arkiv_logg (
+            utfort_id integer,
+            bruker_id integer,
+            ovelse_id integer,
+            sett integer,
+            repetisjoner integer,
+            vekt numeric,
+            tidspunkt timestamp,
+            okt_id integer
+        ) ON COMMIT DROP
+    """))
+
+    antall = 0
+    cursor = db.connection().connection.cursor()
+    try:
+        for segment in segmenter:
+            data = _les_segment(segment)
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            for utfort_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt, okt_id in zip(
+                data["utfort_id"].tolist(),
+                data["ovelse_id"].tolist(),
+                data["sett"].tolist(),
+                data["repetisjoner"].tolist(),
+                data["vekt_hundredeler"].tolist(),
+                data["tidspunkt"].tolist(),
+                data["okt_id"].tolist()
+            ):
+                writer.writerow([
+                    utfort_id, bruker_id, ovelse_id, sett, repetisjoner,
+                    Decimal(vekt).scaleb(-2), tidspunkt.isoformat(sep=" "),
+                    okt_id if okt_id >= 0 else ""
+                ])
+            buffer.seek(0)
+
+            cursor.copy_expert(
+                "COPY arkiv_logg (utfort_id, bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt, okt_id) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            antall += segment.antall_rader
+    finally:
+        cursor.close()
+
+    return antall
+
+
+def logg_med_arkiv(db: Session, bruker_id: int) -> str:
+    """
+    SQL source for a user's whole log, including archived rows.
+
+    Loads the archive into arkiv_logg (see last_arkiv_til_temp) if the
+    user has segments. Use as "FROM {logg} u" with a bruker_id filter.
+
+    Returns:
+        A union of ovelser_utfort and arkiv_logg, or "ovelser_utfort"
+        if nothing is archived
+    """
+    if not last_arkiv_til_temp(db, bruker_id):
+        return "ovelser_utfort"
+
+    return LOGG_MED_ARKIV
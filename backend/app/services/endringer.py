@@ -0,0 +1,105 @@
+"""
+Delta sync for offline-first clients
+
+Every insert or update of a log row, muscle status row or equipment
+profile draws a number from the database sequence endring_seq
+(endring_nr, set by trigger, see alembic revision 9e3a5c1f7d24).
+Deleted profiles leave a tombstone in synk_slettinger with a number
+from the same sequence.
+
+A client keeps the highest number it has seen as its cursor and asks
+for everything above it. The trigger takes the user's row lock before
+drawing a number, so a user's changes become visible in number order
+and a cursor never skips a change that commits later.
+
+Rows in detached partitions (see app/services/partisjoner.py) or moved
+to cold storage (app/services/arkiv.py) disappear from the log without
+tombstones; clients keep them as archived history.
+"""
+from typing import Dict, List
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app.models import OvelseUtfort, BrukerMuskelStatus, BrukerUtstyrProfil, SynkSletting
+
+
+def _endrede_rader(db: Session, modell, bruker_id: int, siden: int, limit: int) -> List:
+    """At most 'limit' rows of one table changed after 'siden', in number order."""
+    return db.query(modell).filter(
+        and_(
+            modell.bruker_id == bruker_id,
+            modell.endring_nr > siden
+        )
+    ).order_by(
+        modell.endring_nr
+    ).limit(limit).all()
+
+
+def hent_endringer(db: Session, bruker_id: int, siden: int, limit: int) -> Dict:
+    """
+    A user's changes after a change number, at most 'limit' in total.
+
+    Each table is read with one index range scan of at most limit + 1
+    rows. The page is cut at the limit-th smallest number across all
+    tables, so every change up to the new cursor is included.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        siden: Change number from the previous sync (0 for a full sync)
+        limit: Max changes to return
+
+    Returns:
+        Dict with ovelser, muskel_status, profiler, slettede_profiler,
+        cursor (highest number included, or 'siden' if nothing changed)
+        and flere (True if there are more changes after cursor)
+    """
+    endringer = []
+    for modell in (OvelseUtfort, BrukerMuskelStatus, BrukerUtstyrProfil, SynkSletting):
+        endringer.extend(_endrede_rader(db, modell, bruker_id, siden, limit + 1))
+
+    endringer.sort(key=lambda rad: rad.endring_nr)
+    flere = len(endringer) > limit
+    endringer = endringer[:limit]
+
+    resultat = {
+        "ovelser": [],
+        "muskel_status": [],
+        "profiler": [],
+        "slettede_profiler": [],
+        "cursor": endringer[-1].endring_nr if endringer else siden,
+        "flere": flere
+    }
+
+    for rad in endringer:
+        if isinstance(rad, OvelseUtfort):
+            resultat["ovelser"].append({
+                "utfort_id": rad.utfort_id,
+                "ovelse_id": rad.ovelse_id,
+                "sett": rad.sett,
+                "repetisjoner": rad.repetisjoner,
+                "vekt": rad.vekt,
+                "tidspunkt": rad.tidspunkt,
+                "okt_id": rad.okt_id,
+                "endring_nr": rad.endring_nr
+            })
+        elif isinstance(rad, BrukerMuskelStatus):
+            resultat["muskel_status"].append({
+                "muskel_id": rad.muskel_id,
+                "sist_trent_dato": rad.sist_trent_dato,
+                "antall_ganger_trent": rad.antall_ganger_trent,
+                "total_volum": rad.total_volum,
+                "endring_nr": rad.endring_nr
+            })
+        elif isinstance(rad, BrukerUtstyrProfil):
+            resultat["profiler"].append({
+                "profil_id": rad.profil_id,
+                "profil_navn": rad.profil_navn,
+                "utstyr_ids": rad.utstyr_ids,
+                "aktiv": rad.aktiv,
+                "endring_nr": rad.endring_nr
+            })
+        elif rad.tabell == BrukerUtstyrProfil.__tablename__:
+            resultat["slettede_profiler"].append(rad.rad_id)
+
+    return resultat
@@ -0,0 +1,128 @@
+"""
+Streaming export of a user's complete workout history
+
+Rows are read from ovelser_utfort with a server-side cursor (yield_per)
+in (tidspunkt, utfort_id) order, which is an index range scan on
+ix_ovelser_utfort_bruker_tidspunkt_id. Exercise names come from the
+in-memory catalog. Output is produced batch by batch, so memory use is
+constant regardless of history length. Archived rows (see
+services/arkiv) are read from their segment files first, one segment
+at a time.
+
+Formats:
+- ndjson: one JSON object per line
+- csv: header row plus one row per log; the columns are the ones
+  /api/historikk/import expects, so an export can be imported again
+"""
+import csv
+import io
+import json
+from typing import Iterator, List
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import OvelseUtfort
+from app.services.arkiv import arkiv_rader
+from app.services.katalog import hent_katalog
+
+
+# Rows fetched from the cursor (and written to the response) at a time
+EKSPORT_BATCH_STORRELSE = 1000
+
+CSV_KOLONNER = ["tidspunkt", "ovelse", "sett", "repetisjoner", "vekt", "okt_id", "utfort_id"]
+
+MEDIETYPER = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _ndjson_linjer(rader: List, navn: dict) -> str:
+    return "".join(
+        json.dumps({
+            "utfort_id": rad.utfort_id,
+            "tidspunkt": rad.tidspunkt.isoformat(),
+            "ovelse_id": rad.ovelse_id,
+            "ovelse_navn": navn.get(rad.ovelse_id),
+            "sett": rad.sett,
+            "repetisjoner": rad.repetisjoner,
+            "vekt": float(rad.vekt),
+            "okt_id": rad.okt_id
+        }) + "\n"
+        for rad in rader
+    )
+
+
+def _csv_linjer(rader: List, navn: dict) -> str:
+    buffer = io.StringIO()
+    skriver = csv.writer(buffer)
+    for rad in rader:
+        skriver.writerow([
+            rad.tidspunkt.isoformat(sep=" "),
+            navn.get(rad.ovelse_id, ""),
+            rad.sett,
+            rad.repetisjoner,
+            rad.vekt,
+            rad.okt_id if rad.okt_id is not None else "",
+            rad.utfort_id
+        ])
+    return buffer.getvalue()
+
+
+def _eksporter_rader(db: Session, bruker_id: int, format: str) -> Iterator[str]:
+    navn = hent_katalog(db).navn
+    formater = _csv_linjer if format == "csv" else _ndjson_linjer
+
+    if format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(CSV_KOLONNER)
+        yield buffer.getvalue()
+
+    for batch in arkiv_rader(db, bruker_id, EKSPORT_BATCH_STORRELSE):
+        yield formater(batch, navn)
+
+    rader = db.query(
+        OvelseUtfort.utfort_id,
+        OvelseUtfort.tidspunkt,
+        OvelseUtfort.ovelse_id,
+        OvelseUtfort.sett,
+        OvelseUtfort.repetisjoner,
+        OvelseUtfort.vekt,
+        OvelseUtfort.okt_id
+    ).filter(
+        OvelseUtfort.bruker_id == bruker_id
+    ).order_by(
+        OvelseUtfort.tidspunkt,
+        OvelseUtfort.utfort_id
+    ).yield_per(EKSPORT_BATCH_STORRELSE)
+
+    batch = []
+    for rad in rader:
+        batch.append(rad)
+        if len(batch) == EKSPORT_BATCH_STORRELSE:
+            yield formater(batch, navn)
+            batch = []
+
+    if batch:
+        yield formater(batch, navn)
+
+
+def eksporter_historikk(bruker_id: int, format: str) -> Iterator[str]:
+    """
+    Stream a user's complete history as NDJSON or CSV.
+
+    Opens its own database session, held only while the response is
+    being written (the request's session is closed by then).
+
+    Args:
+        bruker_id: User ID
+        format: 'ndjson' or 'csv'
+
+    Yields:
+        Chunks of output, one batch of rows each
+    """
+    db = SessionLocal()
+    try:
+        yield from _eksporter_rader(db, bruker_id, format)
+    finally:
+        db.close()
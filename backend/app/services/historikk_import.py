@@ -0,0 +1,231 @@
+"""
+Streaming CSV import of workout history
+
+Rows are parsed one at a time from the uploaded file, mapped to
+ovelse_id through the in-memory catalog, and streamed into
+ovelser_utfort with PostgreSQL COPY. Memory use is constant
+regardless of file size.
+
+Expected CSV columns (header row required, ',' or ';' separated):
+    tidspunkt (or dato), ovelse, sett, repetisjoner, vekt
+"""
+import csv
+import io
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Dict, Iterator, List
+from sqlalchemy.orm import Session
+
+from app.services.katalog import hent_katalog
+from app.services.aggregater import gjenoppbygg_bruker_aggregater
+from app.utils.etag import bump_data_versjon
+
+
+PAKREVDE_KOLONNER = {"tidspunkt", "ovelse", "sett", "repetisjoner", "vekt"}
+KOLONNE_ALIASER = {"dato": "tidspunkt"}
+
+# Caps on what is collected for the response (keeps memory constant)
+MAKS_UKJENTE_OVELSER = 50
+MAKS_FEILMELDINGER = 20
+
+
+class ImportFeil(ValueError):
+    """Raised when the uploaded file cannot be imported at all."""
+
+
+class _CopyKilde:
+    """
+    File-like adapter that feeds COPY from a line generator.
+
+    psycopg2's copy_expert calls read(size) repeatedly; lines are pulled
+    from the generator only as needed.
+    """
+
+    def __init__(self, linjer: Iterator[str]):
+        self._linjer = linjer
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._linjer)
+            except StopIteration:
+                break
+
+        if size < 0:
+            data, self._buffer = self._buffer, ""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+
+        return data
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+class _ImportStatus:
+    """Counters and capped diagnostics for one import."""
+
+    def __init__(self):
+        self.importert = 0
+        self.hoppet_over = 0
+        self.ukjente_ovelser: List[str] = []
+        self.feil: List[str] = []
+
+    def registrer_feil(self, linje: int, melding: str):
+        self.hoppet_over += 1
+        if len(self.feil) < MAKS_FEILMELDINGER:
+            self.feil.append(f"Line {linje}: {melding}")
+
+    def registrer_ukjent_ovelse(self, ovelse_navn: str):
+        self.hoppet_over += 1
+        if ovelse_navn not in self.ukjente_ovelser and len(self.ukjente_ovelser) < MAKS_UKJENTE_OVELSER:
+            self.ukjente_ovelser.append(ovelse_navn)
+
+
+def _les_tidspunkt(verdi: str) -> datetime:
+    """
+    Parse an ISO date or datetime ('YYYY-MM-DD', 'YYYY-MM-DD HH:MM[:SS]').
+
+    Values with a UTC offset ('...+02:00', '...Z') are converted to naive
+    UTC like the rest of the log; values without one are taken as UTC.
+    """
+    tidspunkt = datetime.fromisoformat(verdi.strip().replace("T", " "))
+    if tidspunkt.tzinfo is not None:
+        tidspunkt = tidspunkt.astimezone(timezone.utc).replace(tzinfo=None)
+    return tidspunkt
+
+
+def _les_desimal(verdi: str) -> Decimal:
+    """Parse a decimal number, accepting comma as decimal separator."""
+    return Decimal(verdi.strip().replace(",", "."))
+
+
+def _parse_rad(rad: Dict[str, str]) -> tuple:
+    """
+    Parse and validate one CSV row.
+
+    Uses the same bounds as OvelseLogg (sett 1-20, reps 1-100, vekt >= 0).
+
+    Raises:
+        ValueError: If the row is invalid
+    """
+    try:
+        tidspunkt = _les_tidspunkt(rad["tidspunkt"])
+        sett = int(rad["sett"])
+        repetisjoner = int(rad["repetisjoner"])
+        vekt = round(_les_desimal(rad["vekt"]), 2)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError("invalid value in tidspunkt, sett, repetisjoner or vekt")
+
+    if not 1 <= sett <= 20:
+        raise ValueError("sett must be between 1 and 20")
+    if not 1 <= repetisjoner <= 100:
+        raise ValueError("repetisjoner must be between 1 and 100")
+    if vekt < 0:
+        raise ValueError("vekt cannot be negative")
+
+    return tidspunkt, sett, repetisjoner, vekt
+
+
+def _copy_linjer(
+    rader: Iterator[Dict[str, str]],
+    bruker_id: int,
+    katalog,
+    status: _ImportStatus
+) -> Iterator[str]:
+    """Turn parsed CSV rows into COPY (CSV format) lines."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    # Line 1 is the header
+    for linje_nr, rad in enumerate(rader, start=2):
+        ovelse_navn = (rad.get("ovelse") or "").strip()
+        ovelse_id = katalog.finn_ovelse_id(ovelse_navn)
+
+        if ovelse_id is None:
+            status.registrer_ukjent_ovelse(ovelse_navn)
+            continue
+
+        try:
+            tidspunkt, sett, repetisjoner, vekt = _parse_rad(rad)
+        except ValueError as e:
+            status.registrer_feil(linje_nr, str(e))
+            continue
+
+        writer.writerow([bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt.isoformat(sep=" ")])
+        status.importert += 1
+
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def importer_historikk_csv(
+    db: Session,
+    bruker_id: int,
+    fil: BinaryIO
+) -> Dict:
+    """
+    Import workout history from a CSV file.
+
+    Streams the file into ovelser_utfort with COPY, then rebuilds the
+    user's aggregates (muscle status, exercise history, daily volume,
+    personal records) in one set-based pass. Commits on success.
+
+    Args:
+        db: Database session
+        bruker_id: User ID to import history for
+        fil: Binary file object with CSV content
+
+    Returns:
+        Dict with importert, hoppet_over, ukjente_ovelser and feil
+
+    Raises:
+        ImportFeil: If the header is missing or lacks required columns
+    """
+    tekst = io.TextIOWrapper(fil, encoding="utf-8-sig", newline="")
+
+    header_linje = tekst.readline()
+    if not header_linje.strip():
+        raise ImportFeil("CSV file is empty")
+
+    skilletegn = ";" if header_linje.count(";") > header_linje.count(",") else ","
+    header = [
+        KOLONNE_ALIASER.get(kolonne.strip().lower(), kolonne.strip().lower())
+        for kolonne in next(csv.reader([header_linje], delimiter=skilletegn))
+    ]
+
+    mangler = PAKREVDE_KOLONNER - set(header)
+    if mangler:
+        raise ImportFeil(f"Missing required columns: {', '.join(sorted(mangler))}")
+
+    rader = csv.DictReader(tekst, fieldnames=header, delimiter=skilletegn)
+    katalog = hent_katalog(db)
+    status = _ImportStatus()
+
+    kilde = _CopyKilde(_copy_linjer(rader, bruker_id, katalog, status))
+
+    # COPY runs on the session's own connection, inside the same transaction
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY ovelser_utfort (bruker_id, ovelse_id, sett, repetisjoner, vekt, tidspunkt) "
+            "FROM STDIN WITH (FORMAT csv)",
+            kilde
+        )
+    finally:
+        cursor.close()
+
+    if status.importert:
+        gjenoppbygg_bruker_aggregater(db, bruker_id)
+        bump_data_versjon(db, bruker_id)
+
+    db.commit()
+
+    return {
+        "importert": status.importert,
+        "hoppet_over": status.hoppet_over,
+        "ukjente_ovelser": status.ukjente_ovelser,
+        "feil": status.feil
+    }
@@ -0,0 +1,94 @@
+"""
+In-memory exercise catalog
+
+The exercise catalog (ovelser) is global and only changes when the
+import scripts are run, so it is loaded once per process and shared
+by all requests.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session
+
+from app.models import Ovelse, OvelseMuskel, Muskel
+
+
+class Katalog:
+    """
+    Lookup maps for the exercise catalog.
+
+    Attributes:
+        navn: ovelse_id -> ovelse_navn
+        id_for_navn: normalized ovelse_navn -> ovelse_id
+        muskler: ovelse_id -> involved muscles ({muskel_navn, muskel_type})
+    """
+
+    def __init__(self, ovelser, ovelse_muskler=()):
+        self.navn: Dict[int, str] = {}
+        self.id_for_navn: Dict[str, int] = {}
+        self.muskler: Dict[int, List[dict]] = {}
+
+        for ovelse_id, ovelse_navn in ovelser:
+            self.navn[ovelse_id] = ovelse_navn
+            self.id_for_navn[normaliser_navn(ovelse_navn)] = ovelse_id
+
+        for ovelse_id, muskel_navn, muskel_type in ovelse_muskler:
+            self.muskler.setdefault(ovelse_id, []).append(
+                {"muskel_navn": muskel_navn, "muskel_type": muskel_type}
+            )
+
+    def finn_ovelse_id(self, ovelse_navn: str) -> Optional[int]:
+        """Look up exercise ID by name (case and whitespace insensitive)."""
+        return self.id_for_navn.get(normaliser_navn(ovelse_navn))
+
+
+_katalog: Optional[Katalog] = None
+_katalog_lock = threading.Lock()
+
+
+def normaliser_navn(navn: str) -> str:
+    """Normalize an exercise name for lookups."""
+    return " ".join(navn.split()).casefold()
+
+
+def hent_katalog(db: Session, ovelse_ids: Iterable[int] = ()) -> Katalog:
+    """
+    Get the process-wide exercise catalog, loading it on first use.
+
+    Args:
+        db: Database session (only used on first load)
+        ovelse_ids: Exercise IDs the caller needs; if any is unknown the
+            catalog changed since it was loaded (import scripts were
+            run) and is reloaded once
+
+    Returns:
+        Katalog with lookup maps
+    """
+    global _katalog
+
+    katalog = _katalog
+    if katalog is not None and any(ovelse_id not in katalog.navn for ovelse_id in ovelse_ids):
+        nullstill_katalog()
+
+    if _katalog is None:
+        with _katalog_lock:
+            if _katalog is None:
+                ovelser = db.query(Ovelse.ovelse_id, Ovelse.ovelse_navn).all()
+                ovelse_muskler = db.query(
+                    OvelseMuskel.ovelse_id, Muskel.muskel_navn, OvelseMuskel.muskel_type
+                ).join(
+                    Muskel,
+                    OvelseMuskel.muskel_id == Muskel.muskel_id
+                ).order_by(
+                    OvelseMuskel.ovelse_id, OvelseMuskel.muskel_type, Muskel.muskel_navn
+                ).all()
+                _katalog = Katalog(ovelser, ovelse_muskler)
+
+    return _katalog
+
+
+def nullstill_katalog():
+    """Drop the cached catalog (next call to hent_katalog reloads it)."""
+    global _katalog
+
+    with _katalog_lock:
+        _katalog = None
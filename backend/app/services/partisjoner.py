@@ -0,0 +1,185 @@
+"""
+Partition maintenance for ovelser_utfort
+
+ovelser_utfort is range-partitioned by month on tidspunkt (see alembic
+revision b6e0c3f9a172). Partitions are named ovelser_utfort_pYYYY_MM.
+
+- Future partitions must exist before rows for that month arrive
+  (otherwise rows land in the DEFAULT partition, ovelser_utfort_standard,
+  and are moved out when the month's partition is created)
+- Old partitions can be detached: the table is kept as-is, but no
+  longer part of the log, so history and statistics queries, vacuum and
+  index maintenance don't touch it anymore
+
+Queries that filter on tidspunkt only scan the matching partitions.
+"""
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+
+# Months ahead to keep partitions for
+PARTISJON_MANEDER_FREMOVER = int(os.getenv("PARTISJON_MANEDER_FREMOVER", "3"))
+
+# Seconds between scheduled partition maintenance runs
+PARTISJON_INTERVALL_SEKUNDER = float(os.getenv("PARTISJON_INTERVALL_SEKUNDER", "86400"))
+
+_NAVN_MONSTER = re.compile(r"^ovelser_utfort_p(\d{4})_(\d{2})$")
+
+STANDARD_PARTISJON = "ovelser_utfort_standard"
+
+
+def _legg_til_maneder(maned: date, antall: int) -> date:
+    """First day of the month 'antall' months after 'maned'."""
+    indeks = maned.year * 12 + maned.month - 1 + antall
+    return date(indeks // 12, indeks % 12 + 1, 1)
+
+
+def partisjon_navn(maned: date) -> str:
+    """Partition name for the month containing 'maned'."""
+    return f"ovelser_utfort_p{maned.year:04d}_{maned.month:02d}"
+
+
+def hent_partisjoner(db: Session) -> List[Dict]:
+    """
+    List attached monthly partitions with their month and row estimate.
+
+    Returns:
+        List of dicts with navn, maned (first day) and estimerte_rader,
+        oldest first
+    """
+    rader = db.execute(text("""
+        SELECT c.relname AS navn, c.reltuples::bigint AS estimerte_rader
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'ovelser_utfort'::regclass
+    """)).all()
+
+    partisjoner = []
+    for rad in rader:
+        treff = _NAVN_MONSTER.match(rad.navn)
+        if treff:
+            partisjoner.append({
+                "navn": rad.navn,
+                "maned": date(int(treff.group(1)), int(treff.group(2)), 1),
+                "estimerte_rader": max(rad.estimerte_rader, 0)
+            })
+
+    return sorted(partisjoner, key=lambda p: p["maned"])
+
+
+def opprett_fremtidige_partisjoner(db: Session, maneder: int = PARTISJON_MANEDER_FREMOVER) -> List[Tuple[str, int]]:
+    """
+    Create monthly partitions from the current month to 'maneder' ahead.
+
+    Existing partitions are left alone. If the DEFAULT partition already
+    holds rows for a month (e.g. a late import), it is detached while the
+    month's partition is created and those rows are moved into it, since
+    Postgres refuses to create a partition whose range matches DEFAULT
+    rows. Moved rows draw new change numbers, so clients sync them again.
+
+    Note: commit happens in the caller.
+
+    Args:
+        db: Database session
+        maneder: Number of months ahead of the current month
+
+    Returns:
+        (name, rows moved from DEFAULT) for each partition created
+    """
+    denne_maned = datetime.utcnow().date().replace(day=1)
+    eksisterende = {p["navn"] for p in hent_partisjoner(db)}
+
+    opprettet = []
+    for i in range(maneder + 1):
+        maned = _legg_til_maneder(denne_maned, i)
+        navn = partisjon_navn(maned)
+        if navn in eksisterende:
+            continue
+
+        fra, til = maned, _legg_til_maneder(maned, 1)
+        grenser = {"fra": fra, "til": til}
+        i_standard = db.execute(text(f"""
+            SELECT EXISTS (
+                SELECT 1 FROM {STANDARD_PARTISJON}
+                WHERE tidspunkt >= :fra AND tidspunkt < :til
+            )
+        """), grenser).scalar()
+
+        if i_standard:
+            db.execute(text(f"ALTER TABLE ovelser_utfort DETACH PARTITION {STANDARD_PARTISJON}"))
+
+        db.execute(text(
+            f"CREATE TABLE {navn} PARTITION OF ovelser_utfort "
+            f"FOR VALUES FROM ('{fra.isoformat()}') TO ('{til.isoformat()}')"
+        ))
+
+        flyttet = 0
+        if i_standard:
+            flyttet = db.execute(text(f"""
+                WITH flyttet AS (
+                    DELETE FROM {STANDARD_PARTISJON}
+                    WHERE tidspunkt >= :fra AND tidspunkt < :til
+                    RETURNING *
+                )
+                INSERT INTO ovelser_utfort SELECT * FROM flyttet
+            """), grenser).rowcount
+            db.execute(text(f"ALTER TABLE ovelser_utfort ATTACH PARTITION {STANDARD_PARTISJON} DEFAULT"))
+
+        opprettet.append((navn, flyttet))
+
+    return opprettet
+
+
+def koble_fra_gamle_partisjoner(db: Session, eldre_enn_maneder: int) -> List[str]:
+    """
+    Detach partitions for months older than 'eldre_enn_maneder' months.
+
+    Detached tables keep their rows but are no longer part of the log.
+    Users with rows in them get their data version bumped, so cached
+    statistics and ETags are invalidated. Per-user aggregates (muscle
+    status, records, dashboard) are kept as they are.
+
+    Note: commit happens in the caller.
+
+    Args:
+        db: Database session
+        eldre_enn_maneder: Keep this many months before the current month
+
+    Returns:
+        Names of the detached partitions
+    """
+    grense = _legg_til_maneder(datetime.utcnow().date().replace(day=1), -eldre_enn_maneder)
+
+    frakoblet = []
+    for partisjon in hent_partisjoner(db):
+        if partisjon["maned"] >= grense:
+            break
+
+        navn = partisjon["navn"]
+        db.execute(text(f"""
+            UPDATE brukere SET data_versjon = data_versjon + 1
+            WHERE bruker_id IN (SELECT DISTINCT bruker_id FROM {navn})
+        """))
+        db.execute(text(f"ALTER TABLE ovelser_utfort DETACH PARTITION {navn}"))
+        frakoblet.append(navn)
+
+    return frakoblet
+
+
+def oppdater_partisjoner():
+    """Scheduled job: make sure upcoming monthly partitions exist."""
+    db = SessionLocal()
+    try:
+        opprettet = opprett_fremtidige_partisjoner(db)
+        db.commit()
+        for navn, flyttet in opprettet:
+            flyttet_tekst = f" (moved {flyttet} rows from {STANDARD_PARTISJON})" if flyttet else ""
+            print(f"Created partition {navn}{flyttet_tekst}")
+    finally:
+        db.close()
@@ -0,0 +1,180 @@
+"""
+System-wide percentile comparisons
+
+A background job summarizes each metric across all active users as a
+quantile sketch: the values at every whole percentile (101 cut points,
+computed in one query with percentile_disc). The sketch is kept in
+memory, so "your percentile" is a binary search over the cut points
+instead of a query over all users.
+"""
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+
+# Seconds between sketch rebuilds
+PERSENTIL_INTERVALL_SEKUNDER = float(os.getenv("PERSENTIL_INTERVALL_SEKUNDER", "3600"))
+
+# Users with at least one log in this window are included
+AKTIV_DAGER = 28
+
+# Metric name -> description (column names in the queries below)
+METRIKKER = {
+    "ukentlig_volum": "Total volume (sets × reps × weight) last 7 days",
+    "treningsdager_per_uke": "Average training days per week last 28 days",
+}
+
+# Cut points at 0, 1, ..., 100 percent
+_ANDELER = [i / 100 for i in range(101)]
+
+_SKISSE_SQL = text("""
+    WITH per_bruker AS (
+        SELECT
+            u.bruker_id,
+            COALESCE(SUM(u.sett * u.repetisjoner * u.vekt) FILTER (WHERE u.tidspunkt >= :uke_start), 0)::float8 AS ukentlig_volum,
+            (COUNT(DISTINCT ((u.tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE b.tidssone)::date)
+                / (:aktiv_dager / 7.0))::float8 AS treningsdager_per_uke
+        FROM ovelser_utfort u
+        JOIN brukere b ON b.bruker_id = u.bruker_id AND b.aktiv
+        WHERE u.tidspunkt >= :start
+        GROUP BY u.bruker_id
+    )
+    SELECT
+        COUNT(*) AS antall_brukere,
+        percentile_disc(CAST(:andeler AS float8[])) WITHIN GROUP (ORDER BY ukentlig_volum) AS ukentlig_volum,
+        percentile_disc(CAST(:andeler AS float8[])) WITHIN GROUP (ORDER BY treningsdager_per_uke) AS treningsdager_per_uke
+    FROM per_bruker
+""")
+
+_BRUKER_SQL = text("""
+    SELECT
+        COALESCE(SUM(u.sett * u.repetisjoner * u.vekt) FILTER (WHERE u.tidspunkt >= :uke_start), 0)::float8 AS ukentlig_volum,
+        (COUNT(DISTINCT ((u.tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE b.tidssone)::date)
+            / (:aktiv_dager / 7.0))::float8 AS treningsdager_per_uke
+    FROM ovelser_utfort u
+    JOIN brukere b ON b.bruker_id = u.bruker_id
+    WHERE u.bruker_id = :bruker_id AND u.tidspunkt >= :start
+""")
+
+
+class PersentilSkisse:
+    """
+    Sorted cut points for one metric.
+
+    punkter[i] is the smallest value at or above which i percent of
+    users fall.
+    """
+
+    __slots__ = ("punkter",)
+
+    def __init__(self, punkter: List[float]):
+        self.punkter = punkter
+
+    def persentil(self, verdi: float) -> float:
+        """
+        Percentile of a value, O(log cut points).
+
+        Ties (e.g. many users with the same value) get the middle of the
+        tied range, so a value equal to everyone's is the 50th percentile.
+        """
+        lav = bisect_left(self.punkter, verdi)
+        hoy = bisect_right(self.punkter, verdi)
+        rang = (lav + hoy) / 2
+        return round(min(100.0, rang / len(self.punkter) * 100), 1)
+
+
+class _Skisser:
+    """The current set of sketches (replaced atomically on rebuild)."""
+
+    def __init__(self, skisser: Dict[str, PersentilSkisse], antall_brukere: int):
+        self.skisser = skisser
+        self.antall_brukere = antall_brukere
+        self.beregnet = datetime.utcnow()
+
+
+_skisser: Optional[_Skisser] = None
+_skisser_lock = threading.Lock()
+
+
+def _vinduer() -> Dict:
+    """Query parameters for the activity and weekly windows."""
+    na = datetime.utcnow()
+    return {
+        "start": na - timedelta(days=AKTIV_DAGER),
+        "uke_start": na - timedelta(days=7),
+        "aktiv_dager": AKTIV_DAGER,
+    }
+
+
+def bygg_persentil_skisser(db: Session):
+    """
+    Rebuild the percentile sketches for all metrics from one query.
+
+    Args:
+        db: Database session
+    """
+    global _skisser
+
+    rad = db.execute(_SKISSE_SQL, {**_vinduer(), "andeler": _ANDELER}).one()
+
+    skisser = {}
+    if rad.antall_brukere:
+        skisser = {
+            metrikk: PersentilSkisse(list(getattr(rad, metrikk)))
+            for metrikk in METRIKKER
+        }
+
+    with _skisser_lock:
+        _skisser = _Skisser(skisser, rad.antall_brukere)
+
+
+def oppdater_persentil_skisser():
+    """Scheduled job: rebuild the sketches with its own session."""
+    db = SessionLocal()
+    try:
+        bygg_persentil_skisser(db)
+    finally:
+        db.close()
+
+
+def beregn_persentiler(db: Session, bruker_id: int) -> List[Dict]:
+    """
+    Compare a user's metrics with all active users.
+
+    The user's own values come from a small per-user query; the
+    comparison is a lookup in the in-memory sketches.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+
+    Returns:
+        List of dicts per metric with verdi, persentil (None until the
+        first sketch is built), antall_brukere and beregnet
+    """
+    rad = db.execute(_BRUKER_SQL, {**_vinduer(), "bruker_id": bruker_id}).one()
+
+    with _skisser_lock:
+        gjeldende = _skisser
+
+    resultat = []
+    for metrikk, beskrivelse in METRIKKER.items():
+        verdi = getattr(rad, metrikk)
+        skisse = gjeldende.skisser.get(metrikk) if gjeldende else None
+
+        resultat.append({
+            "metrikk": metrikk,
+            "beskrivelse": beskrivelse,
+            "verdi": round(verdi, 2),
+            "persentil": skisse.persentil(verdi) if skisse else None,
+            "antall_brukere": gjeldende.antall_brukere if gjeldende else 0,
+            "beregnet": gjeldende.beregnet if gjeldende else None
+        })
+
+    return resultat
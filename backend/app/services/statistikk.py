@@ -1,15 +1,24 @@
 """
 Statistics calculation service
 """
-from typing import List, Dict
-from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+from datetime import datetime, date, timedelta
 from decimal import Decimal
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, and_, or_, case, text
+from sqlalchemy.dialects.postgresql import insert
 
 from app.models import (
-    Bruker, Muskel, BrukerMuskelStatus, AntagonistiskPar,
-    OvelseUtfort, Ovelse, OvelseMuskel
+    Bruker, Muskel, BrukerMuskelStatus, BrukerMuskelDagsvolum, AntagonistiskPar,
+    OvelseUtfort, Ovelse, OvelseMuskel, PersonligRekord, BrukerDashboard
+)
+from app.utils.tidssone import lokal_dato, lokal_idag, dagstart_utc
+from app.services.arkiv import logg_med_arkiv
+from app.services.katalog import hent_katalog
+from app.services.treningsramme import (
+    treningsrammer,
+    volum_over_tid as ramme_volum_over_tid,
+    progresjon as ramme_progresjon
 )
 
 
@@ -70,6 +79,88 @@ def beregn_muskel_volum(
 # ANTAGONISTIC BALANCE
 # ============================================================================
 
+BALANSE_TOLERANSE = Decimal('0.3')  # 30% tolerance
+
+
+def _klassifiser_balanse(volum_1: Decimal, volum_2: Decimal, onsket_ratio: Decimal) -> Dict:
+    """
+    Calculate ratio, balance status and deviation for two volumes.
+
+    Returns:
+        Dict with faktisk_ratio, balanse_status and avvik_prosent
+    """
+    # Calculate ratio
+    if volum_2 > 0:
+        faktisk_ratio = volum_1 / volum_2
+    else:
+        faktisk_ratio = Decimal(0) if volum_1 == 0 else Decimal(999)  # Infinity-like value
+
+    # Determine balance status
+    min_ratio = onsket_ratio * (Decimal('1') - BALANSE_TOLERANSE)
+    max_ratio = onsket_ratio * (Decimal('1') + BALANSE_TOLERANSE)
+
+    if volum_1 == 0 and volum_2 == 0:
+        balanse_status = "balanced"  # Neither trained yet
+        avvik_prosent = 0.0
+    else:
+        avvik_prosent = abs(float((faktisk_ratio - onsket_ratio) / onsket_ratio * 100))
+        if min_ratio <= faktisk_ratio <= max_ratio:
+            balanse_status = "balanced"
+        elif faktisk_ratio < min_ratio:
+            balanse_status = "muskel_1_needs_work"
+        else:
+            balanse_status = "muskel_2_needs_work"
+
+    return {
+        "faktisk_ratio": faktisk_ratio,
+        "balanse_status": balanse_status,
+        "avvik_prosent": avvik_prosent
+    }
+
+
+def _hent_balanse_rader(db: Session, bruker_id: int):
+    """
+    Fetch all antagonistic pairs with both muscles and both statuses.
+
+    One query: pairs joined to both muscles, outer-joined to the user's
+    status row for each muscle.
+    """
+    muskel_1 = aliased(Muskel)
+    muskel_2 = aliased(Muskel)
+    status_1 = aliased(BrukerMuskelStatus)
+    status_2 = aliased(BrukerMuskelStatus)
+
+    return db.query(
+        AntagonistiskPar.onsket_ratio,
+        muskel_1.muskel_navn.label("muskel_1_navn"),
+        muskel_1.hovedkategori.label("kategori_1"),
+        muskel_2.muskel_navn.label("muskel_2_navn"),
+        muskel_2.hovedkategori.label("kategori_2"),
+        func.coalesce(status_1.total_volum, 0).label("volum_1"),
+        func.coalesce(status_2.total_volum, 0).label("volum_2")
+    ).join(
+        muskel_1,
+        AntagonistiskPar.muskel_1_id == muskel_1.muskel_id
+    ).join(
+        muskel_2,
+        AntagonistiskPar.muskel_2_id == muskel_2.muskel_id
+    ).outerjoin(
+        status_1,
+        and_(
+            status_1.muskel_id == AntagonistiskPar.muskel_1_id,
+            status_1.bruker_id == bruker_id
+        )
+    ).outerjoin(
+        status_2,
+        and_(
+            status_2.muskel_id == AntagonistiskPar.muskel_2_id,
+            status_2.bruker_id == bruker_id
+        )
+    ).order_by(
+        AntagonistiskPar.par_id
+    ).all()
+
+
 def beregn_antagonistisk_balanse(
     db: Session,
     bruker_id: int
@@ -77,73 +168,70 @@ def beregn_antagonistisk_balanse(
     """
     Calculate antagonistic muscle balance.
 
-    Compares volume between opposing muscle groups.
+    Compares volume between opposing muscle groups. The whole report is
+    built from a single query (see _hent_balanse_rader).
 
     Returns:
         List of dicts with balance information for each pair
     """
-    # Get all antagonistic pairs
-    par_liste = db.query(AntagonistiskPar).all()
-
     result = []
-    for par in par_liste:
-        # Get muscle names
-        muskel_1 = db.query(Muskel).get(par.muskel_1_id)
-        muskel_2 = db.query(Muskel).get(par.muskel_2_id)
-
-        # Get volume for each muscle
-        status_1 = db.query(BrukerMuskelStatus).filter(
-            and_(
-                BrukerMuskelStatus.bruker_id == bruker_id,
-                BrukerMuskelStatus.muskel_id == par.muskel_1_id
-            )
-        ).first()
-
-        status_2 = db.query(BrukerMuskelStatus).filter(
-            and_(
-                BrukerMuskelStatus.bruker_id == bruker_id,
-                BrukerMuskelStatus.muskel_id == par.muskel_2_id
-            )
-        ).first()
-
-        volum_1 = status_1.total_volum if status_1 and status_1.total_volum else Decimal(0)
-        volum_2 = status_2.total_volum if status_2 and status_2.total_volum else Decimal(0)
-
-        # Calculate ratio
-        if volum_2 > 0:
-            faktisk_ratio = volum_1 / volum_2
-        else:
-            faktisk_ratio = Decimal(0) if volum_1 == 0 else Decimal(999)  # Infinity-like value
+    for rad in _hent_balanse_rader(db, bruker_id):
+        volum_1 = Decimal(rad.volum_1)
+        volum_2 = Decimal(rad.volum_2)
 
-        onsket_ratio = par.onsket_ratio
+        result.append({
+            "muskel_1_navn": rad.muskel_1_navn,
+            "muskel_2_navn": rad.muskel_2_navn,
+            "muskel_1_volum": volum_1,
+            "muskel_2_volum": volum_2,
+            "onsket_ratio": rad.onsket_ratio,
+            **_klassifiser_balanse(volum_1, volum_2, rad.onsket_ratio)
+        })
 
-        # Determine balance status
-        TOLERANCE = Decimal('0.3')  # 30% tolerance
-        min_ratio = onsket_ratio * (Decimal('1') - TOLERANCE)
-        max_ratio = onsket_ratio * (Decimal('1') + TOLERANCE)
+    return result
 
-        if volum_1 == 0 and volum_2 == 0:
-            balanse_status = "balanced"  # Neither trained yet
-            avvik_prosent = 0.0
-        elif min_ratio <= faktisk_ratio <= max_ratio:
-            balanse_status = "balanced"
-            avvik_prosent = abs(float((faktisk_ratio - onsket_ratio) / onsket_ratio * 100))
-        elif faktisk_ratio < min_ratio:
-            balanse_status = "muskel_1_needs_work"
-            avvik_prosent = abs(float((faktisk_ratio - onsket_ratio) / onsket_ratio * 100))
-        else:
-            balanse_status = "muskel_2_needs_work"
-            avvik_prosent = abs(float((faktisk_ratio - onsket_ratio) / onsket_ratio * 100))
+
+def beregn_antagonistisk_balanse_kategori(
+    db: Session,
+    bruker_id: int
+) -> List[Dict]:
+    """
+    Calculate antagonistic balance aggregated per category pair.
+
+    Uses the same single query as beregn_antagonistisk_balanse, summing
+    volume per (hovedkategori_1, hovedkategori_2), e.g. overkropp_push
+    vs. overkropp_pull. The desired ratio for a category pair is the
+    average of its pairs' desired ratios.
+
+    Returns:
+        List of dicts with balance information for each category pair
+    """
+    kategorier = {}
+    for rad in _hent_balanse_rader(db, bruker_id):
+        nokkel = (rad.kategori_1, rad.kategori_2)
+        if nokkel not in kategorier:
+            kategorier[nokkel] = {
+                "volum_1": Decimal(0),
+                "volum_2": Decimal(0),
+                "onsket_ratioer": []
+            }
+
+        kategorier[nokkel]["volum_1"] += Decimal(rad.volum_1)
+        kategorier[nokkel]["volum_2"] += Decimal(rad.volum_2)
+        kategorier[nokkel]["onsket_ratioer"].append(Decimal(rad.onsket_ratio))
+
+    result = []
+    for (kategori_1, kategori_2), verdier in kategorier.items():
+        onsket_ratio = sum(verdier["onsket_ratioer"]) / len(verdier["onsket_ratioer"])
 
         result.append({
-            "muskel_1_navn": muskel_1.muskel_navn,
-            "muskel_2_navn": muskel_2.muskel_navn,
-            "muskel_1_volum": volum_1,
-            "muskel_2_volum": volum_2,
-            "faktisk_ratio": faktisk_ratio,
+            "kategori_1": kategori_1,
+            "kategori_2": kategori_2,
+            "antall_par": len(verdier["onsket_ratioer"]),
+            "kategori_1_volum": verdier["volum_1"],
+            "kategori_2_volum": verdier["volum_2"],
             "onsket_ratio": onsket_ratio,
-            "balanse_status": balanse_status,
-            "avvik_prosent": avvik_prosent
+            **_klassifiser_balanse(verdier["volum_1"], verdier["volum_2"], onsket_ratio)
         })
 
     return result
@@ -156,85 +244,101 @@ def beregn_antagonistisk_balanse(
 def beregn_volum_over_tid(
     db: Session,
     bruker_id: int,
-    dager: int = 30
+    dager: int = 30,
+    granularitet: str = "dag"
 ) -> List[Dict]:
     """
-    Calculate total volume per day over specified time period.
+    Calculate total volume per time bucket over specified time period.
+
+    Computed with vectorized operations over the user's cached
+    training frame (see services/treningsramme), so repeated calls with
+    the same or shorter windows and other bucket sizes don't re-query
+    the log. A miss loads only the requested window.
 
     Args:
         db: Database session
         bruker_id: User ID
         dager: Number of days to look back (default 30)
+        granularitet: Bucket size - 'dag', 'uke' (ISO week, Monday) or 'maned'
 
     Returns:
-        List of dicts with date, total_volum, antall_ovelser
+        List of dicts with date (bucket start), total_volum, antall_ovelser
     """
-    # Calculate start date
     start_date = datetime.utcnow() - timedelta(days=dager)
+    ramme = treningsrammer.hent(db, bruker_id, start_date)
 
-    # Get all exercises in time period
-    utforte = db.query(OvelseUtfort).filter(
-        and_(
-            OvelseUtfort.bruker_id == bruker_id,
-            OvelseUtfort.tidspunkt >= start_date
-        )
-    ).all()
-
-    # Group by date
-    daily_volum = {}
-    for utfort in utforte:
-        date_str = utfort.tidspunkt.strftime("%Y-%m-%d")
-
-        if date_str not in daily_volum:
-            daily_volum[date_str] = {
-                "volum": Decimal(0),
-                "ovelser": set()
-            }
-
-        # Calculate volume
-        volum = Decimal(utfort.sett) * Decimal(utfort.repetisjoner) * utfort.vekt
-        daily_volum[date_str]["volum"] += volum
-        daily_volum[date_str]["ovelser"].add(utfort.ovelse_id)
-
-    # Build result
-    result = []
-    for date_str in sorted(daily_volum.keys()):
-        result.append({
-            "dato": date_str,
-            "total_volum": daily_volum[date_str]["volum"],
-            "antall_ovelser": len(daily_volum[date_str]["ovelser"])
-        })
-
-    return result
+    return ramme_volum_over_tid(ramme, start_date, granularitet)
 
 
 # ============================================================================
 # MUSCLE DETAILS
 # ============================================================================
 
+# Per-exercise usage for one muscle. Runs as one index-only range scan of
+# ix_ovelser_utfort_bruker_ovelse_tidspunkt per exercise involving the muscle.
+# The total is counted before paging and every row carries it; a page past
+# the end returns one row with only the total (ovelse_id NULL).
+_MUSKEL_OVELSER_SQL = text("""
+    WITH per_ovelse AS (
+        SELECT
+            om.ovelse_id,
+            om.muskel_type,
+            COUNT(*) AS antall_ganger_brukt,
+            SUM(u.sett * u.repetisjoner * u.vekt) AS volum,
+            MAX(u.tidspunkt) AS sist_brukt
+        FROM ovelse_muskler om
+        JOIN ovelser_utfort u
+          ON u.bruker_id = :bruker_id
+         AND u.ovelse_id = om.ovelse_id
+         AND u.tidspunkt >= :fra
+         AND u.tidspunkt < :til
+        WHERE om.muskel_id = :muskel_id
+        GROUP BY om.ovelse_id, om.muskel_type
+    ),
+    side AS (
+        SELECT * FROM per_ovelse
+        ORDER BY antall_ganger_brukt DESC, ovelse_id
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT t.antall_ovelser, s.*
+    FROM (SELECT COUNT(*) AS antall_ovelser FROM per_ovelse) AS t
+    LEFT JOIN side s ON true
+    ORDER BY s.antall_ganger_brukt DESC, s.ovelse_id
+""")
+
+
 def hent_muskel_detaljer(
     db: Session,
     bruker_id: int,
-    muskel_id: int
+    muskel_id: int,
+    fra_dato: Optional[date] = None,
+    til_dato: Optional[date] = None,
+    limit: int = 50,
+    offset: int = 0
 ) -> Dict:
     """
     Get detailed statistics for a specific muscle.
 
     Includes:
-    - Volume and training frequency
-    - List of exercises used for this muscle
-    - Usage count per exercise
+    - Volume and training frequency (all time, from muscle status)
+    - Weighted volume in the date range (from the daily rollup)
+    - Exercises used for this muscle in the date range, one page at a
+      time, with usage count, volume and last-used time
 
     Args:
         db: Database session
         bruker_id: User ID
         muskel_id: Muscle ID
+        fra_dato: First day to include (default: all history)
+        til_dato: Last day to include, inclusive (default: today)
+        limit: Max exercises to return
+        offset: Number of exercises to skip
 
     Returns:
         Dict with muscle details and exercise breakdown
     """
     # Get muscle info
-    muskel = db.query(Muskel).get(muskel_id)
+    muskel = db.get(Muskel, muskel_id)
 
     if not muskel:
         return None
@@ -247,43 +351,807 @@ def hent_muskel_detaljer(
         )
     ).first()
 
-    # Get exercises used for this muscle
-    # Query all exercises logged by user that involve this muscle
-    ovelser_brukt = db.query(
-        Ovelse.ovelse_navn,
-        func.count(OvelseUtfort.utfort_id).label('antall')
-    ).join(
-        OvelseMuskel,
-        Ovelse.ovelse_id == OvelseMuskel.ovelse_id
-    ).join(
-        OvelseUtfort,
-        Ovelse.ovelse_id == OvelseUtfort.ovelse_id
+    fra = datetime.combine(fra_dato, datetime.min.time()) if fra_dato else datetime.min
+    til = datetime.combine(til_dato + timedelta(days=1), datetime.min.time()) if til_dato else datetime.max
+
+    periode_filter = [
+        BrukerMuskelDagsvolum.bruker_id == bruker_id,
+        BrukerMuskelDagsvolum.muskel_id == muskel_id
+    ]
+    if fra_dato:
+        periode_filter.append(BrukerMuskelDagsvolum.dato >= fra_dato)
+    if til_dato:
+        periode_filter.append(BrukerMuskelDagsvolum.dato <= til_dato)
+
+    periode_volum = db.query(
+        func.coalesce(func.sum(BrukerMuskelDagsvolum.volum), 0)
+    ).filter(*periode_filter).scalar()
+
+    rader = db.execute(_MUSKEL_OVELSER_SQL, {
+        "bruker_id": bruker_id,
+        "muskel_id": muskel_id,
+        "fra": fra,
+        "til": til,
+        "limit": limit,
+        "offset": offset
+    }).all()
+
+    navn = hent_katalog(db).navn
+
+    return {
+        "muskel_id": muskel.muskel_id,
+        "muskel_navn": muskel.muskel_navn,
+        "hovedkategori": muskel.hovedkategori,
+        "underkategori": muskel.underkategori,
+        "total_volum": status.total_volum if status else Decimal(0),
+        "antall_ganger_trent": status.antall_ganger_trent if status else 0,
+        "sist_trent_dato": status.sist_trent_dato if status else None,
+        "fra_dato": fra_dato,
+        "til_dato": til_dato,
+        "periode_volum": periode_volum,
+        "antall_ovelser": rader[0].antall_ovelser,
+        "limit": limit,
+        "offset": offset,
+        "ovelser_brukt": [
+            {
+                "ovelse_id": rad.ovelse_id,
+                "ovelse_navn": navn.get(rad.ovelse_id),
+                "muskel_type": rad.muskel_type,
+                "antall_ganger_brukt": rad.antall_ganger_brukt,
+                "volum": rad.volum,
+                "sist_brukt": rad.sist_brukt
+            }
+            for rad in rader
+            if rad.ovelse_id is not None
+        ]
+    }
+
+
+# ============================================================================
+# WORKLOAD RATIO (ACUTE:CHRONIC)
+# ============================================================================
+
+AKUTT_DAGER = 7
+KRONISK_DAGER = 28
+
+
+def _klassifiser_belastning(ratio: Optional[float]) -> str:
+    """
+    Classify an acute:chronic workload ratio into a risk zone.
+
+    Zones follow the commonly used ACWR thresholds:
+    < 0.8 under-loaded, 0.8-1.3 optimal, 1.3-1.5 elevated, > 1.5 high risk.
+    """
+    if ratio is None:
+        return "ingen_data"
+    if ratio < 0.8:
+        return "underbelastet"
+    if ratio <= 1.3:
+        return "optimal"
+    if ratio <= 1.5:
+        return "forhoyet"
+    return "hoy_risiko"
+
+
+def _belastning_query(db: Session, idag):
+    """
+    Build the grouped workload query over the daily volume buckets.
+
+    idag is a date, or a SQL date expression (per-user local today).
+
+    Acute and chronic sums are computed in a single pass using FILTER,
+    and the ratio (acute week vs. average chronic week) is computed in SQL.
+    """
+    kronisk_start = idag - timedelta(days=KRONISK_DAGER - 1)
+    akutt_start = idag - timedelta(days=AKUTT_DAGER - 1)
+
+    akutt_volum = func.coalesce(
+        func.sum(BrukerMuskelDagsvolum.volum).filter(BrukerMuskelDagsvolum.dato >= akutt_start),
+        0
+    )
+    kronisk_volum = func.coalesce(func.sum(BrukerMuskelDagsvolum.volum), 0)
+    ratio = akutt_volum * (KRONISK_DAGER / AKUTT_DAGER) / func.nullif(kronisk_volum, 0)
+
+    return db.query(
+        BrukerMuskelDagsvolum.bruker_id,
+        BrukerMuskelDagsvolum.muskel_id,
+        akutt_volum.label("akutt_volum"),
+        kronisk_volum.label("kronisk_volum"),
+        ratio.label("ratio")
     ).filter(
         and_(
-            OvelseMuskel.muskel_id == muskel_id,
-            OvelseUtfort.bruker_id == bruker_id
+            BrukerMuskelDagsvolum.dato >= kronisk_start,
+            BrukerMuskelDagsvolum.dato <= idag
         )
     ).group_by(
-        Ovelse.ovelse_navn
+        BrukerMuskelDagsvolum.bruker_id,
+        BrukerMuskelDagsvolum.muskel_id
+    )
+
+
+def _belastning_rad(muskel: Muskel, rad) -> Dict:
+    """Build a workload dict for one muscle from an aggregated row (or None)."""
+    ratio = float(rad.ratio) if rad is not None and rad.ratio is not None else None
+    return {
+        "muskel_id": muskel.muskel_id,
+        "muskel_navn": muskel.muskel_navn,
+        "akutt_volum": rad.akutt_volum if rad is not None else Decimal(0),
+        "kronisk_volum": rad.kronisk_volum if rad is not None else Decimal(0),
+        "ratio": round(ratio, 3) if ratio is not None else None,
+        "risiko": _klassifiser_belastning(ratio)
+    }
+
+
+def beregn_belastning(
+    db: Session,
+    bruker_id: int,
+    tidssone: str
+) -> List[Dict]:
+    """
+    Calculate acute:chronic workload ratio per muscle.
+
+    Reads only the pre-aggregated daily buckets (bruker_muskel_dagsvolum),
+    never the raw ovelser_utfort rows.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        tidssone: User's time zone (the windows end on the local today)
+
+    Returns:
+        List of dicts with acute/chronic volume, ratio and risk zone per muscle
+    """
+    idag = lokal_idag(tidssone)
+
+    rader = _belastning_query(db, idag).filter(
+        BrukerMuskelDagsvolum.bruker_id == bruker_id
+    ).all()
+    rad_per_muskel = {rad.muskel_id: rad for rad in rader}
+
+    muskler = db.query(Muskel).order_by(Muskel.muskel_id).all()
+
+    return [_belastning_rad(muskel, rad_per_muskel.get(muskel.muskel_id)) for muskel in muskler]
+
+
+def beregn_belastning_alle_brukere(db: Session) -> List[Dict]:
+    """
+    Calculate workload ratios for all active users in one pass.
+
+    Used by the admin view. Only muscles with load in the chronic window
+    are included, and users are sorted by their highest ratio.
+
+    Returns:
+        List of dicts with user info, highest ratio and per-muscle workload
+    """
+    # Each user's windows end on the local today in their time zone
+    idag = lokal_dato(func.timezone("UTC", func.now()), Bruker.tidssone)
+
+    rader = _belastning_query(db, idag).join(
+        Bruker,
+        BrukerMuskelDagsvolum.bruker_id == Bruker.bruker_id
+    ).filter(
+        Bruker.aktiv == True
+    ).all()
+
+    muskler = {muskel.muskel_id: muskel for muskel in db.query(Muskel).all()}
+    brukernavn = dict(
+        db.query(Bruker.bruker_id, Bruker.brukernavn).filter(Bruker.aktiv == True).all()
+    )
+
+    per_bruker = {}
+    for rad in rader:
+        per_bruker.setdefault(rad.bruker_id, []).append(
+            _belastning_rad(muskler[rad.muskel_id], rad)
+        )
+
+    result = []
+    for bruker_id, belastning in per_bruker.items():
+        ratioer = [b["ratio"] for b in belastning if b["ratio"] is not None]
+        hoyeste_ratio = max(ratioer) if ratioer else None
+        result.append({
+            "bruker_id": bruker_id,
+            "brukernavn": brukernavn.get(bruker_id),
+            "hoyeste_ratio": hoyeste_ratio,
+            "risiko": _klassifiser_belastning(hoyeste_ratio),
+            "muskler": sorted(belastning, key=lambda b: b["muskel_id"])
+        })
+
+    result.sort(key=lambda r: r["hoyeste_ratio"] or 0, reverse=True)
+
+    return result
+
+
+# ============================================================================
+# PERSONAL RECORDS
+# ============================================================================
+
+def beregn_e1rm(vekt: Decimal, repetisjoner: int) -> Decimal:
+    """
+    Estimate one-rep max with the Epley formula: vekt × (1 + reps / 30).
+    """
+    return Decimal(vekt) * (Decimal(1) + Decimal(repetisjoner) / Decimal(30))
+
+
+def oppdater_personlige_rekorder(
+    db: Session,
+    bruker_id: int,
+    ovelse_id: int,
+    sett: int,
+    repetisjoner: int,
+    vekt: Decimal,
+    tidspunkt: datetime
+) -> List[str]:
+    """
+    Update the personal records index after logging an exercise.
+
+    Runs a single conditional UPSERT that only touches the row when at
+    least one record is beaten, so PR detection is O(1) per log.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        ovelse_id: Exercise ID that was logged
+        sett, repetisjoner, vekt: Logged values
+        tidspunkt: Timestamp of the log entry
+
+    Returns:
+        List of record types beaten by this log ('vekt', 'e1rm', 'volum').
+        Empty if no record was beaten.
+    """
+    vekt = Decimal(vekt)
+    e1rm = beregn_e1rm(vekt, repetisjoner)
+    volum = Decimal(sett) * Decimal(repetisjoner) * vekt
+
+    stmt = insert(PersonligRekord).values(
+        bruker_id=bruker_id,
+        ovelse_id=ovelse_id,
+        beste_vekt=vekt,
+        beste_vekt_dato=tidspunkt,
+        beste_e1rm=e1rm,
+        beste_e1rm_dato=tidspunkt,
+        beste_volum=volum,
+        beste_volum_dato=tidspunkt
+    )
+    ny = stmt.excluded
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bruker_id", "ovelse_id"],
+        set_={
+            "beste_vekt": func.greatest(PersonligRekord.beste_vekt, ny.beste_vekt),
+            "beste_vekt_dato": case(
+                (ny.beste_vekt > PersonligRekord.beste_vekt, ny.beste_vekt_dato),
+                else_=PersonligRekord.beste_vekt_dato
+            ),
+            "beste_e1rm": func.greatest(PersonligRekord.beste_e1rm, ny.beste_e1rm),
+            "beste_e1rm_dato": case(
+                (ny.beste_e1rm > PersonligRekord.beste_e1rm, ny.beste_e1rm_dato),
+                else_=PersonligRekord.beste_e1rm_dato
+            ),
+            "beste_volum": func.greatest(PersonligRekord.beste_volum, ny.beste_volum),
+            "beste_volum_dato": case(
+                (ny.beste_volum > PersonligRekord.beste_volum, ny.beste_volum_dato),
+                else_=PersonligRekord.beste_volum_dato
+            ),
+        },
+        where=or_(
+            ny.beste_vekt > PersonligRekord.beste_vekt,
+            ny.beste_e1rm > PersonligRekord.beste_e1rm,
+            ny.beste_volum > PersonligRekord.beste_volum
+        )
+    ).returning(
+        PersonligRekord.beste_vekt_dato,
+        PersonligRekord.beste_e1rm_dato,
+        PersonligRekord.beste_volum_dato
+    )
+
+    rad = db.execute(stmt).first()
+
+    # No row returned = conflict where no record was beaten
+    if rad is None:
+        return []
+
+    # A record was set by this log if its date now equals our timestamp
+    nye_rekorder = []
+    if rad.beste_vekt_dato == tidspunkt:
+        nye_rekorder.append("vekt")
+    if rad.beste_e1rm_dato == tidspunkt:
+        nye_rekorder.append("e1rm")
+    if rad.beste_volum_dato == tidspunkt:
+        nye_rekorder.append("volum")
+
+    return nye_rekorder
+
+
+def hent_personlige_rekorder(
+    db: Session,
+    bruker_id: int
+) -> List[Dict]:
+    """
+    Get personal records for all exercises the user has logged.
+
+    Reads the personlige_rekorder index directly (one row per exercise).
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+
+    Returns:
+        List of dicts with best weight, estimated 1RM and volume per exercise
+    """
+    rekorder = db.query(PersonligRekord, Ovelse.ovelse_navn).join(
+        Ovelse,
+        PersonligRekord.ovelse_id == Ovelse.ovelse_id
+    ).filter(
+        PersonligRekord.bruker_id == bruker_id
     ).order_by(
-        func.count(OvelseUtfort.utfort_id).desc()
+        Ovelse.ovelse_navn
     ).all()
 
-    ovelser_list = [
+    return [
         {
+            "ovelse_id": rekord.ovelse_id,
             "ovelse_navn": ovelse_navn,
-            "antall_ganger_brukt": antall
+            "beste_vekt": rekord.beste_vekt,
+            "beste_vekt_dato": rekord.beste_vekt_dato,
+            "beste_e1rm": round(rekord.beste_e1rm, 2),
+            "beste_e1rm_dato": rekord.beste_e1rm_dato,
+            "beste_volum": rekord.beste_volum,
+            "beste_volum_dato": rekord.beste_volum_dato
         }
-        for ovelse_navn, antall in ovelser_brukt
+        for rekord, ovelse_navn in rekorder
     ]
 
+
+# ============================================================================
+# DASHBOARD
+# ============================================================================
+
+DASHBOARD_DAGER = 7
+
+# All dashboard figures in one round trip. Balance classification mirrors
+# _klassifiser_balanse: both untrained, or ratio within tolerance.
+# {logg} is the log source (see arkiv.logg_med_arkiv). Days are local
+# calendar days in the user's time zone; :start is the UTC start of the
+# first local day in the window.
+_DASHBOARD_SQL = """
+    WITH totalt AS (
+        SELECT
+            COUNT(*) AS total_utforte_ovelser,
+            COALESCE(SUM(sett * repetisjoner * vekt), 0) AS total_volum
+        FROM {logg} u
+        WHERE bruker_id = :bruker_id
+    ),
+    unike AS (
+        SELECT COUNT(*) AS unike_ovelser_brukt
+        FROM bruker_ovelse_historikk
+        WHERE bruker_id = :bruker_id
+    ),
+    per_dag AS (
+        SELECT :idag - ((tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE :tidssone)::date AS dager_siden, COUNT(*) AS antall
+        FROM {logg} u
+        WHERE bruker_id = :bruker_id
+          AND tidspunkt >= :start
+        GROUP BY 1
+    ),
+    siste_dager AS (
+        SELECT array_agg(COALESCE(per_dag.antall, 0)::int ORDER BY i) AS dagtellinger
+        FROM generate_series(0, :antall_dager - 1) AS i
+        LEFT JOIN per_dag ON per_dag.dager_siden = i
+    ),
+    par AS (
+        SELECT
+            p.onsket_ratio AS r,
+            COALESCE(s1.total_volum, 0) AS v1,
+            COALESCE(s2.total_volum, 0) AS v2
+        FROM antagonistiske_par p
+        LEFT JOIN bruker_muskel_status s1
+            ON s1.muskel_id = p.muskel_1_id AND s1.bruker_id = :bruker_id
+        LEFT JOIN bruker_muskel_status s2
+            ON s2.muskel_id = p.muskel_2_id AND s2.bruker_id = :bruker_id
+    ),
+    balanse AS (
+        SELECT
+            COUNT(*) AS total_par,
+            COUNT(*) FILTER (
+                WHERE (v1 = 0 AND v2 = 0)
+                   OR (v2 > 0 AND v1 / v2 BETWEEN r * (1 - :toleranse) AND r * (1 + :toleranse))
+            ) AS balanserte_par
+        FROM par
+    ),
+    dager AS (
+        SELECT DISTINCT ((tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE :tidssone)::date AS d
+        FROM {logg} u
+        WHERE bruker_id = :bruker_id
+    ),
+    rekker AS (
+        -- Gaps and islands: consecutive days share d - row_number
+        SELECT COUNT(*) AS lengde, MAX(d) AS slutt
+        FROM (SELECT d, d - (ROW_NUMBER() OVER (ORDER BY d))::int AS gruppe FROM dager) AS oyer
+        GROUP BY gruppe
+    ),
+    konsistens AS (
+        SELECT
+            MIN(d) AS forste_treningsdato,
+            MAX(d) AS siste_treningsdato,
+            COUNT(*) AS treningsdager,
+            COUNT(DISTINCT date_trunc('week', d)) AS aktive_uker,
+            COALESCE((SELECT MAX(lengde) FROM rekker), 0) AS lengste_streak,
+            COALESCE((SELECT lengde FROM rekker ORDER BY slutt DESC LIMIT 1), 0) AS navarende_streak
+        FROM dager
+    )
+    SELECT *
+    FROM totalt, unike, siste_dager, balanse, konsistens
+"""
+
+
+def _uke_start(dato: date) -> date:
+    """Monday of the week containing dato."""
+    return dato - timedelta(days=dato.weekday())
+
+
+def _forskyv_dagtellinger(dagtellinger: List[int], fra_dato: date, til_dato: date) -> List[int]:
+    """
+    Shift a per-day count window so that index 0 is til_dato.
+
+    Days that fall out of the window are dropped, new days start at 0.
+    """
+    skift = min((til_dato - fra_dato).days, DASHBOARD_DAGER)
+    if skift <= 0:
+        return list(dagtellinger)
+    return ([0] * skift + list(dagtellinger))[:DASHBOARD_DAGER]
+
+
+def beregn_dashboard(db: Session, bruker_id: int, logg: Optional[str] = None) -> BrukerDashboard:
+    """
+    Compute (or recompute) the dashboard snapshot for a user.
+
+    Uses a single CTE query over the whole log, including archived rows,
+    and stores the result in bruker_dashboard.
+    Note: commit happens in the caller.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        logg: Log source if the archive is already loaded (see
+              arkiv.logg_med_arkiv); loaded here if None
+
+    Returns:
+        The BrukerDashboard snapshot row
+    """
+    if logg is None:
+        logg = logg_med_arkiv(db, bruker_id)
+
+    tidssone = db.query(Bruker.tidssone).filter(Bruker.bruker_id == bruker_id).scalar()
+    idag = lokal_idag(tidssone)
+
+    rad = db.execute(text(_DASHBOARD_SQL.format(logg=logg)), {
+        "bruker_id": bruker_id,
+        "tidssone": tidssone,
+        "idag": idag,
+        "start": dagstart_utc(idag - timedelta(days=DASHBOARD_DAGER - 1), tidssone),
+        "antall_dager": DASHBOARD_DAGER,
+        "toleranse": BALANSE_TOLERANSE
+    }).one()
+
+    verdier = {
+        "total_utforte_ovelser": rad.total_utforte_ovelser,
+        "total_volum": rad.total_volum,
+        "unike_ovelser_brukt": rad.unike_ovelser_brukt,
+        "dagtellinger": list(rad.dagtellinger),
+        "telling_dato": idag,
+        "total_par": rad.total_par,
+        "balanserte_par": rad.balanserte_par,
+        "forste_treningsdato": rad.forste_treningsdato,
+        "siste_treningsdato": rad.siste_treningsdato,
+        "navarende_streak": rad.navarende_streak,
+        "lengste_streak": rad.lengste_streak,
+        "treningsdager": rad.treningsdager,
+        "aktive_uker": rad.aktive_uker,
+        "oppdatert": func.now()
+    }
+
+    # Upsert so concurrent first reads don't collide on the primary key
+    stmt = insert(BrukerDashboard).values(bruker_id=bruker_id, **verdier)
+    stmt = stmt.on_conflict_do_update(index_elements=["bruker_id"], set_=verdier)
+    db.execute(stmt)
+
+    return db.get(BrukerDashboard, bruker_id, populate_existing=True)
+
+
+def oppdater_dashboard_etter_logg(
+    db: Session,
+    bruker_id: int,
+    volum: Decimal,
+    ny_ovelse: bool,
+    tidssone: str
+):
+    """
+    Incrementally update the dashboard snapshot after logging an exercise.
+
+    If the user has no snapshot yet, nothing is done - it is built from
+    scratch on the next dashboard read.
+
+    Note: commit happens in the caller.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        volum: Volume of the logged exercise (sett × reps × vekt)
+        ny_ovelse: True if this is the first time the user logs this exercise
+        tidssone: User's time zone (days are local calendar days)
+    """
+    snapshot = db.query(BrukerDashboard).filter(
+        BrukerDashboard.bruker_id == bruker_id
+    ).with_for_update().first()
+
+    if not snapshot:
+        return
+
+    idag = lokal_idag(tidssone)
+
+    dagtellinger = _forskyv_dagtellinger(snapshot.dagtellinger, snapshot.telling_dato, idag)
+    dagtellinger[0] += 1
+
+    snapshot.dagtellinger = dagtellinger
+    snapshot.telling_dato = idag
+    snapshot.total_utforte_ovelser += 1
+    snapshot.total_volum = (snapshot.total_volum or Decimal(0)) + volum
+    if ny_ovelse:
+        snapshot.unike_ovelser_brukt += 1
+
+    # Streaks and consistency (logs are always "today", so this is O(1))
+    siste = snapshot.siste_treningsdato
+    if siste != idag:
+        if siste == idag - timedelta(days=1):
+            snapshot.navarende_streak += 1
+        else:
+            snapshot.navarende_streak = 1
+        snapshot.lengste_streak = max(snapshot.lengste_streak, snapshot.navarende_streak)
+        snapshot.treningsdager += 1
+
+        if siste is None or _uke_start(siste) != _uke_start(idag):
+            snapshot.aktive_uker += 1
+
+        snapshot.forste_treningsdato = snapshot.forste_treningsdato or idag
+        snapshot.siste_treningsdato = idag
+
+    # Muscle status changed, so re-count balanced pairs (single query)
+    balanse_data = beregn_antagonistisk_balanse(db, bruker_id)
+    snapshot.total_par = len(balanse_data)
+    snapshot.balanserte_par = sum(1 for b in balanse_data if b["balanse_status"] == "balanced")
+
+
+def hent_dashboard(db: Session, bruker_id: int, tidssone: str) -> Dict:
+    """
+    Get dashboard summary for a user.
+
+    Normally a single-row read of the snapshot. The snapshot is built
+    (and committed) on first access. Days are local calendar days in
+    the user's time zone.
+
+    Returns:
+        Dict with totals, recent activity and balance overview
+    """
+    snapshot = db.get(BrukerDashboard, bruker_id)
+
+    if not snapshot:
+        snapshot = beregn_dashboard(db, bruker_id)
+        db.commit()
+
+    idag = lokal_idag(tidssone)
+    dagtellinger = _forskyv_dagtellinger(snapshot.dagtellinger, snapshot.telling_dato, idag)
+
     return {
-        "muskel_id": muskel.muskel_id,
-        "muskel_navn": muskel.muskel_navn,
-        "hovedkategori": muskel.hovedkategori,
-        "underkategori": muskel.underkategori,
-        "total_volum": status.total_volum if status else Decimal(0),
-        "antall_ganger_trent": status.antall_ganger_trent if status else 0,
-        "sist_trent_dato": status.sist_trent_dato if status else None,
-        "ovelser_brukt": ovelser_list
+        **_dashboard_sammendrag(snapshot, dagtellinger),
+        "konsistens": _dashboard_konsistens(snapshot, idag)
+    }
+
+
+def _dashboard_konsistens(snapshot: BrukerDashboard, idag: date) -> Dict:
+    """Streak and consistency figures from the snapshot counters."""
+    if snapshot.siste_treningsdato is None:
+        return {
+            "navarende_streak": 0,
+            "lengste_streak": 0,
+            "siste_treningsdato": None,
+            "treningsdager_per_uke": 0.0,
+            "etterlevelse_prosent": 0.0
+        }
+
+    # Streak is broken if neither today nor yesterday was a training day
+    navarende_streak = snapshot.navarende_streak
+    if snapshot.siste_treningsdato < idag - timedelta(days=1):
+        navarende_streak = 0
+
+    uker = (_uke_start(idag) - _uke_start(snapshot.forste_treningsdato)).days // 7 + 1
+
+    return {
+        "navarende_streak": navarende_streak,
+        "lengste_streak": snapshot.lengste_streak,
+        "siste_treningsdato": snapshot.siste_treningsdato.isoformat(),
+        "treningsdager_per_uke": round(snapshot.treningsdager / uker, 2),
+        "etterlevelse_prosent": round(snapshot.aktive_uker / uker * 100, 1)
+    }
+
+
+def _dashboard_sammendrag(snapshot: BrukerDashboard, dagtellinger: List[int]) -> Dict:
+    """Totals, recent activity and balance overview from the snapshot."""
+    return {
+        "total_utforte_ovelser": snapshot.total_utforte_ovelser,
+        "total_volum": float(snapshot.total_volum or 0),
+        "unike_ovelser_brukt": snapshot.unike_ovelser_brukt,
+        "siste_7_dager": sum(dagtellinger),
+        "antagonistisk_balanse": {
+            "total_par": snapshot.total_par,
+            "balanserte_par": snapshot.balanserte_par,
+            "ubalanserte_par": snapshot.total_par - snapshot.balanserte_par
+        }
+    }
+
+
+# ============================================================================
+# CALENDAR HEATMAP (DATE × MUSCLE)
+# ============================================================================
+
+# Dense days × muscles matrix from the daily buckets, one array per muscle
+_KALENDER_SQL = text("""
+    SELECT
+        m.muskel_id,
+        m.muskel_navn,
+        array_agg(COALESCE(round(d.volum, 1), 0)::float8 ORDER BY g.dato) AS volum
+    FROM muskler m
+    CROSS JOIN generate_series(CAST(:start AS date), CAST(:slutt AS date), interval '1 day') AS g(dato)
+    LEFT JOIN bruker_muskel_dagsvolum d
+        ON d.bruker_id = :bruker_id
+       AND d.muskel_id = m.muskel_id
+       AND d.dato = g.dato::date
+    GROUP BY m.muskel_id, m.muskel_navn
+    ORDER BY m.muskel_id
+""")
+
+
+def beregn_kalender(
+    db: Session,
+    bruker_id: int,
+    tidssone: str,
+    dager: int = 365
+) -> Dict:
+    """
+    Calculate a calendar heatmap: training load per muscle per day.
+
+    Computed in one aggregate query over the daily volume buckets and
+    returned column-oriented (one array of daily volumes per muscle)
+    instead of a list of per-cell dicts.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        tidssone: User's time zone (the buckets are local calendar days)
+        dager: Number of days, ending today (default 365)
+
+    Returns:
+        Dict with start_dato, antall_dager, muskel_ids, muskel_navn and
+        volum (volum[i][j] = volume for muscle i on day start_dato + j)
+    """
+    slutt = lokal_idag(tidssone)
+    start = slutt - timedelta(days=dager - 1)
+
+    rader = db.execute(_KALENDER_SQL, {
+        "bruker_id": bruker_id,
+        "start": start,
+        "slutt": slutt
+    }).all()
+
+    return {
+        "start_dato": start.isoformat(),
+        "antall_dager": dager,
+        "muskel_ids": [rad.muskel_id for rad in rader],
+        "muskel_navn": [rad.muskel_navn for rad in rader],
+        "volum": [list(rad.volum) for rad in rader]
+    }
+
+
+# ============================================================================
+# PROGRESSIVE OVERLOAD (PER EXERCISE)
+# ============================================================================
+
+# Per-session top set, e1RM and volume, with moving average and trend slope
+# computed by window functions. Served by ix_ovelser_utfort_bruker_ovelse_tidspunkt.
+# Sessions are local calendar days in the user's time zone.
+_PROGRESJON_SQL = text("""
+    WITH okter AS (
+        SELECT
+            ((u.tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE b.tidssone)::date AS dato,
+            MAX(u.vekt) AS topp_vekt,
+            MAX(u.vekt * (1 + u.repetisjoner / 30.0)) AS e1rm,
+            SUM(u.sett * u.repetisjoner * u.vekt) AS volum
+        FROM ovelser_utfort u
+        JOIN brukere b ON b.bruker_id = u.bruker_id
+        WHERE u.bruker_id = :bruker_id
+          AND u.ovelse_id = :ovelse_id
+          AND u.tidspunkt >= :start
+        GROUP BY 1
+    )
+    SELECT
+        dato,
+        topp_vekt,
+        e1rm,
+        volum,
+        AVG(e1rm) OVER (
+            ORDER BY dato ROWS BETWEEN :foregaende PRECEDING AND CURRENT ROW
+        ) AS e1rm_glidende_snitt,
+        regr_slope(e1rm::float8, (dato - DATE '2000-01-01')::float8) OVER () AS stigning_per_dag
+    FROM okter
+    ORDER BY dato
+""")
+
+
+def beregn_progresjon(
+    db: Session,
+    bruker_id: int,
+    ovelse_id: int,
+    vindu: int = 5,
+    dager: Optional[int] = None
+) -> Optional[Dict]:
+    """
+    Calculate progressive overload trend for one exercise.
+
+    One row per training day with the top weight, best estimated 1RM
+    (Epley) and total volume, plus a moving average of e1RM and the
+    least-squares slope of e1RM over time. Served from the user's
+    training frame if one covering the window is cached; otherwise one
+    index range scan over this exercise's rows (a miss never loads the
+    user's other exercises).
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        ovelse_id: Exercise ID
+        vindu: Number of sessions in the moving average (default 5)
+        dager: Only include the last N days (default: all history)
+
+    Returns:
+        Dict with exercise info, slope and per-session points,
+        or None if the exercise does not exist
+    """
+    ovelse_navn = hent_katalog(db).navn.get(ovelse_id)
+    if ovelse_navn is None:
+        return None
+
+    start = datetime.utcnow() - timedelta(days=dager) if dager else datetime.min
+
+    ramme = treningsrammer.hent(db, bruker_id, start, bygg=False)
+    if ramme is not None:
+        trend = ramme_progresjon(ramme, ovelse_id, start, vindu)
+    else:
+        rader = db.execute(_PROGRESJON_SQL, {
+            "bruker_id": bruker_id,
+            "ovelse_id": ovelse_id,
+            "start": start,
+            "foregaende": vindu - 1
+        }).all()
+
+        trend = {
+            "stigning_per_dag": rader[0].stigning_per_dag if rader else None,
+            "okter": [
+                {
+                    "dato": rad.dato.isoformat(),
+                    "topp_vekt": rad.topp_vekt,
+                    "e1rm": round(rad.e1rm, 2),
+                    "volum": rad.volum,
+                    "e1rm_glidende_snitt": round(rad.e1rm_glidende_snitt, 2)
+                }
+                for rad in rader
+            ]
+        }
+
+    stigning_per_dag = trend["stigning_per_dag"]
+
+    return {
+        "ovelse_id": ovelse_id,
+        "ovelse_navn": ovelse_navn,
+        "vindu": vindu,
+        "antall_okter": len(trend["okter"]),
+        "stigning_e1rm_per_uke": round(stigning_per_dag * 7, 3) if stigning_per_dag is not None else None,
+        "okter": trend["okter"]
     }
@@ -0,0 +1,180 @@
+"""
+Training sessions (treningsokter)
+
+A session is a run of logs without a pause longer than
+OKT_PAUSE_MINUTTER, so two workouts on one day are separate sessions and
+a late-night session is not split at midnight. Session aggregates are
+maintained on every log; lists and details are plain indexed reads.
+"""
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import OvelseUtfort, Treningsokt
+from app.services.katalog import hent_katalog
+
+
+# A log more than this long after the previous one starts a new session
+OKT_PAUSE_MINUTTER = int(os.getenv("OKT_PAUSE_MINUTTER", "90"))
+
+
+def registrer_logg_i_okt(db: Session, utfort: OvelseUtfort, volum: Decimal) -> Treningsokt:
+    """
+    Add a new log to the user's current session, or start a new one.
+
+    Sets utfort.okt_id. Note: commit happens in the caller.
+
+    Args:
+        db: Database session
+        utfort: The new (flushed) log row
+        volum: Volume of the log (sett × reps × vekt)
+
+    Returns:
+        The session the log belongs to
+    """
+    okt = db.query(Treningsokt).filter(
+        Treningsokt.bruker_id == utfort.bruker_id
+    ).order_by(
+        Treningsokt.start_tidspunkt.desc()
+    ).with_for_update().first()
+
+    pause = timedelta(minutes=OKT_PAUSE_MINUTTER)
+
+    if okt and okt.start_tidspunkt <= utfort.tidspunkt <= okt.slutt_tidspunkt + pause:
+        # Is this exercise new in the session? (pruned to the session's partitions)
+        allerede_i_okt = db.query(OvelseUtfort.utfort_id).filter(
+            and_(
+                OvelseUtfort.okt_id == okt.okt_id,
+                OvelseUtfort.ovelse_id == utfort.ovelse_id,
+                OvelseUtfort.tidspunkt >= okt.start_tidspunkt,
+                OvelseUtfort.tidspunkt <= okt.slutt_tidspunkt
+            )
+        ).first() is not None
+
+        okt.slutt_tidspunkt = max(okt.slutt_tidspunkt, utfort.tidspunkt)
+        okt.antall_logginger += 1
+        okt.total_sett += utfort.sett
+        okt.total_volum = (okt.total_volum or Decimal(0)) + volum
+        if not allerede_i_okt:
+            okt.antall_ovelser += 1
+    else:
+        okt = Treningsokt(
+            bruker_id=utfort.bruker_id,
+            start_tidspunkt=utfort.tidspunkt,
+            slutt_tidspunkt=utfort.tidspunkt,
+            antall_ovelser=1,
+            antall_logginger=1,
+            total_sett=utfort.sett,
+            total_volum=volum
+        )
+        db.add(okt)
+        db.flush()  # Get okt_id
+
+    utfort.okt_id = okt.okt_id
+    return okt
+
+
+def okt_sammendrag(okt: Treningsokt) -> Dict:
+    """Session aggregates as a response dict."""
+    return {
+        "okt_id": okt.okt_id,
+        "start_tidspunkt": okt.start_tidspunkt,
+        "slutt_tidspunkt": okt.slutt_tidspunkt,
+        "varighet_minutter": int((okt.slutt_tidspunkt - okt.start_tidspunkt).total_seconds() // 60),
+        "antall_ovelser": okt.antall_ovelser,
+        "antall_logginger": okt.antall_logginger,
+        "total_sett": okt.total_sett,
+        "total_volum": okt.total_volum
+    }
+
+
+def hent_treningsokter(
+    db: Session,
+    bruker_id: int,
+    limit: int,
+    etter: Optional[Tuple[datetime, int]] = None
+) -> List[Treningsokt]:
+    """
+    One page of a user's sessions, newest first.
+
+    Args:
+        db: Database session
+        bruker_id: User ID
+        limit: Max sessions to return
+        etter: Keyset position (start_tidspunkt, okt_id) of the last
+            session on the previous page
+
+    Returns:
+        List of Treningsokt
+    """
+    query = db.query(Treningsokt).filter(
+        Treningsokt.bruker_id == bruker_id
+    )
+
+    if etter is not None:
+        query = query.filter(
+            tuple_(Treningsokt.start_tidspunkt, Treningsokt.okt_id) < etter
+        )
+
+    return query.order_by(
+        Treningsokt.start_tidspunkt.desc(),
+        Treningsokt.okt_id.desc()
+    ).limit(limit).all()
+
+
+def hent_treningsokt_detaljer(db: Session, bruker_id: int, okt_id: int) -> Optional[Dict]:
+    """
+    A session with its exercises.
+
+    Args:
+        db: Database session
+        bruker_id: User ID (sessions of other users are not found)
+        okt_id: Session ID
+
+    Returns:
+        Dict with session aggregates and ovelser, or None if not found
+    """
+    okt = db.query(Treningsokt).filter(
+        and_(
+            Treningsokt.okt_id == okt_id,
+            Treningsokt.bruker_id == bruker_id
+        )
+    ).first()
+
+    if not okt:
+        return None
+
+    # The time bounds let the planner prune to the session's partitions
+    utforte = db.query(OvelseUtfort).filter(
+        and_(
+            OvelseUtfort.okt_id == okt_id,
+            OvelseUtfort.tidspunkt >= okt.start_tidspunkt,
+            OvelseUtfort.tidspunkt <= okt.slutt_tidspunkt
+        )
+    ).order_by(
+        OvelseUtfort.tidspunkt
+    ).all()
+
+    katalog = hent_katalog(db, (utfort.ovelse_id for utfort in utforte))
+
+    return {
+        **okt_sammendrag(okt),
+        "ovelser": [
+            {
+                "utfort_id": utfort.utfort_id,
+                "bruker_id": utfort.bruker_id,
+                "ovelse_id": utfort.ovelse_id,
+                "ovelse_navn": katalog.navn.get(utfort.ovelse_id),
+                "sett": utfort.sett,
+                "repetisjoner": utfort.repetisjoner,
+                "vekt": utfort.vekt,
+                "tidspunkt": utfort.tidspunkt,
+                "okt_id": utfort.okt_id,
+                "involverte_muskler": katalog.muskler.get(utfort.ovelse_id, [])
+            }
+            for utfort in utforte
+        ]
+    }
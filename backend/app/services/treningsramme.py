@@ -0,0 +1,390 @@
+"""
+Columnar per-user training frame cache
+
+A window of a user's ovelser_utfort history is loaded once (one query)
+into NumPy arrays: tidspunkt, dag (local calendar day in the user's
+time zone, computed in the query), ovelse_id, sett, repetisjoner and
+vekt. Analytics that slice the same window in different ways (volume
+over time, progression) compute from these arrays with vectorized
+operations instead of re-querying the log.
+
+A frame only covers the window it was built for (from vindu_fra); a query
+reaching further back misses, and callers fall back to SQL or rebuild
+with the larger window. Loads are never larger than the query asking.
+
+Freshness is tied to brukere.data_versjon: a log handled by this
+worker appends to the frame and advances its version, any other change
+(imports, logs handled by another worker) makes the version differ and
+the frame is rebuilt on next use. Changing the time zone bumps the
+version too.
+
+Memory is bounded by a byte budget with LRU eviction by user.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+# Total memory budget for all cached frames
+TRENINGSRAMME_BUDSJETT_MB = float(os.getenv("TRENINGSRAMME_BUDSJETT_MB", "64"))
+
+_STARTKAPASITET = 64
+
+# Version, time zone and rows in one statement, so they come from the same
+# snapshot (a log committing during the build can't be in the rows but
+# not in the version). The user row is returned even without logs.
+_RAMME_SQL = text("""
+    SELECT
+        b.data_versjon,
+        b.tidssone,
+        u.tidspunkt,
+        ((u.tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE b.tidssone)::date AS dag,
+        u.ovelse_id, u.sett, u.repetisjoner, u.vekt
+    FROM brukere b
+    LEFT JOIN ovelser_utfort u
+        ON u.bruker_id = b.bruker_id AND u.tidspunkt >= :fra
+    WHERE b.bruker_id = :bruker_id
+    ORDER BY u.tidspunkt
+""")
+
+
+class Treningsramme:
+    """
+    Column arrays for one user's log, in tidspunkt order.
+
+    Arrays have spare capacity for cheap appends; use the properties,
+    which return views of the filled part.
+    """
+
+    def __init__(self, rader: List[tuple], data_versjon: int, tidssone: str, fra: datetime):
+        self.data_versjon = data_versjon
+        self.tidssone = tidssone
+        self.vindu_fra = fra
+        self.antall = len(rader)
+
+        kapasitet = max(_STARTKAPASITET, self.antall)
+        self._tidspunkt = np.empty(kapasitet, dtype="datetime64[us]")
+        self._dag = np.empty(kapasitet, dtype="datetime64[D]")
+        self._ovelse_id = np.empty(kapasitet, dtype=np.int32)
+        self._sett = np.empty(kapasitet, dtype=np.int16)
+        self._repetisjoner = np.empty(kapasitet, dtype=np.int16)
+        self._vekt = np.empty(kapasitet, dtype=np.float64)
+
+        if rader:
+            tidspunkt, dag, ovelse_id, sett, repetisjoner, vekt = zip(*rader)
+            self._tidspunkt[:self.antall] = np.array(tidspunkt, dtype="datetime64[us]")
+            self._dag[:self.antall] = np.array(dag, dtype="datetime64[D]")
+            self._ovelse_id[:self.antall] = ovelse_id
+            self._sett[:self.antall] = sett
+            self._repetisjoner[:self.antall] = repetisjoner
+            self._vekt[:self.antall] = np.array(vekt, dtype=np.float64)
+
+    @property
+    def tidspunkt(self) -> np.ndarray:
+        return self._tidspunkt[:self.antall]
+
+    @property
+    def dag(self) -> np.ndarray:
+        """Local calendar day of each row (user's time zone)."""
+        return self._dag[:self.antall]
+
+    @property
+    def ovelse_id(self) -> np.ndarray:
+        return self._ovelse_id[:self.antall]
+
+    @property
+    def sett(self) -> np.ndarray:
+        return self._sett[:self.antall]
+
+    @property
+    def repetisjoner(self) -> np.ndarray:
+        return self._repetisjoner[:self.antall]
+
+    @property
+    def vekt(self) -> np.ndarray:
+        return self._vekt[:self.antall]
+
+    @property
+    def volum(self) -> np.ndarray:
+        """sett × repetisjoner × vekt per row."""
+        return self.sett * self.repetisjoner * self.vekt
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self._tidspunkt.nbytes + self._dag.nbytes + self._ovelse_id.nbytes + self._sett.nbytes
+            + self._repetisjoner.nbytes + self._vekt.nbytes
+        )
+
+    def fra(self, start: datetime) -> int:
+        """Index of the first row at or after start."""
+        return int(np.searchsorted(self.tidspunkt, np.datetime64(start, "us"), side="left"))
+
+    def legg_til(self, tidspunkt: datetime, ovelse_id: int, sett: int, repetisjoner: int, vekt: float):
+        """Append one row, doubling capacity when full."""
+        if self.antall == len(self._vekt):
+            nye_kapasitet = 2 * len(self._vekt)
+            for navn in ("_tidspunkt", "_dag", "_ovelse_id", "_sett", "_repetisjoner", "_vekt"):
+                gammel = getattr(self, navn)
+                ny = np.empty(nye_kapasitet, dtype=gammel.dtype)
+                ny[:self.antall] = gammel[:self.antall]
+                setattr(self, navn, ny)
+
+        i = self.antall
+        self._tidspunkt[i] = np.datetime64(tidspunkt, "us")
+        self._dag[i] = np.datetime64(
+            tidspunkt.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(self.tidssone)).date(), "D"
+        )
+        self._ovelse_id[i] = ovelse_id
+        self._sett[i] = sett
+        self._repetisjoner[i] = repetisjoner
+        self._vekt[i] = float(vekt)
+        self.antall += 1
+
+
+class RammeCache:
+    """
+    Per-user frame cache with a memory budget and LRU eviction.
+
+    Thread-safe: statistics functions run in threadpool workers.
+    """
+
+    def __init__(self, budsjett_bytes: int):
+        self.budsjett_bytes = budsjett_bytes
+
+        self._lock = threading.Lock()
+        self._rammer: "OrderedDict[int, Treningsramme]" = OrderedDict()
+        self._bytes = 0
+
+        self.treff = 0
+        self.bom = 0
+        self.tillegg = 0
+        self.utkastelser = 0
+
+    def hent(self, db: Session, bruker_id: int, fra: datetime, bygg: bool = True) -> Optional[Treningsramme]:
+        """
+        Get the user's frame covering rows from 'fra'.
+
+        Args:
+            db: Database session
+            bruker_id: User ID
+            fra: Earliest time the caller needs
+            bygg: On a miss, build a frame for the window from 'fra'
+                (otherwise return None)
+
+        Returns:
+            Treningsramme for the user's current data version, or None
+        """
+        data_versjon = db.execute(
+            text("SELECT data_versjon FROM brukere WHERE bruker_id = :bruker_id"),
+            {"bruker_id": bruker_id}
+        ).scalar()
+
+        with self._lock:
+            ramme = self._rammer.get(bruker_id)
+            if ramme is not None and ramme.data_versjon == data_versjon and ramme.vindu_fra <= fra:
+                self._rammer.move_to_end(bruker_id)
+                self.treff += 1
+                return ramme
+
+        self.bom += 1
+        if not bygg:
+            return None
+
+        rader = db.execute(_RAMME_SQL, {"bruker_id": bruker_id, "fra": fra}).all()
+        ramme = Treningsramme(
+            [rad[2:] for rad in rader if rad.tidspunkt is not None],
+            rader[0].data_versjon, rader[0].tidssone, fra
+        )
+
+        with self._lock:
+            self._fjern(bruker_id)
+            self._rammer[bruker_id] = ramme
+            self._bytes += ramme.nbytes
+            self._kast_ut()
+
+        return ramme
+
+    def legg_til(
+        self,
+        bruker_id: int,
+        data_versjon: int,
+        tidspunkt: datetime,
+        ovelse_id: int,
+        sett: int,
+        repetisjoner: int,
+        vekt
+    ):
+        """
+        Append a committed log to a cached frame.
+
+        Only applied if the frame is at the version just before this log
+        (data_versjon - 1); otherwise the frame is dropped and rebuilt
+        on next use.
+        """
+        with self._lock:
+            ramme = self._rammer.get(bruker_id)
+            if ramme is None:
+                return
+
+            if ramme.data_versjon != data_versjon - 1:
+                self._fjern(bruker_id)
+                return
+
+            self._bytes -= ramme.nbytes
+            ramme.legg_til(tidspunkt, ovelse_id, sett, repetisjoner, vekt)
+            ramme.data_versjon = data_versjon
+            self._bytes += ramme.nbytes
+            self.tillegg += 1
+            self._kast_ut()
+
+    def glem_bruker(self, bruker_id: int):
+        """Drop a user's frame."""
+        with self._lock:
+            self._fjern(bruker_id)
+
+    def _fjern(self, bruker_id: int):
+        ramme = self._rammer.pop(bruker_id, None)
+        if ramme is not None:
+            self._bytes -= ramme.nbytes
+
+    def _kast_ut(self):
+        """Evict least recently used frames until within budget (keeps the newest)."""
+        while self._bytes > self.budsjett_bytes and len(self._rammer) > 1:
+            _, ramme = self._rammer.popitem(last=False)
+            self._bytes -= ramme.nbytes
+            self.utkastelser += 1
+
+    def statistikk(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            return {
+                "brukere": len(self._rammer),
+                "rader": sum(r.antall for r in self._rammer.values()),
+                "bytes": self._bytes,
+                "budsjett_bytes": self.budsjett_bytes,
+                "treff": self.treff,
+                "bom": self.bom,
+                "tillegg": self.tillegg,
+                "utkastelser": self.utkastelser
+            }
+
+
+# ============================================================================
+# VECTORIZED ANALYTICS
+# ============================================================================
+
+def _bucket_start(dager: np.ndarray, granularitet: str) -> np.ndarray:
+    """Start day of each row's bucket ('dag', 'uke' from Monday or 'maned')."""
+    if granularitet == "uke":
+        # 1970-01-01 was a Thursday, so Monday is day 4 (mod 7)
+        return dager - ((dager.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+    if granularitet == "maned":
+        return dager.astype("datetime64[M]").astype("datetime64[D]")
+    return dager
+
+
+def volum_over_tid(ramme: Treningsramme, start: datetime, granularitet: str) -> List[Dict]:
+    """
+    Total volume and distinct exercises per bucket from start.
+
+    Args:
+        ramme: User's training frame
+        start: Include rows at or after this time
+        granularitet: 'dag', 'uke' or 'maned'
+
+    Returns:
+        List of dicts with dato (bucket start), total_volum, antall_ovelser
+    """
+    i = ramme.fra(start)
+    if i == ramme.antall:
+        return []
+
+    dager = ramme.dag[i:]
+    buckets, bucket_nr = np.unique(_bucket_start(dager, granularitet), return_inverse=True)
+
+    volum = np.bincount(bucket_nr, weights=ramme.volum[i:], minlength=len(buckets))
+
+    # Distinct (bucket, exercise) pairs, counted per bucket
+    par = np.unique(np.stack([bucket_nr, ramme.ovelse_id[i:]]), axis=1)
+    antall_ovelser = np.bincount(par[0], minlength=len(buckets))
+
+    return [
+        {
+            "dato": str(bucket),
+            "total_volum": round(float(v), 2),
+            "antall_ovelser": int(n)
+        }
+        for bucket, v, n in zip(buckets, volum, antall_ovelser)
+    ]
+
+
+def progresjon(ramme: Treningsramme, ovelse_id: int, start: datetime, vindu: int) -> Dict:
+    """
+    Per-session top weight, e1RM (Epley) and volume for one exercise,
+    with a moving average of e1RM and its least-squares slope.
+
+    Args:
+        ramme: User's training frame
+        ovelse_id: Exercise ID
+        start: Include rows at or after this time
+        vindu: Number of sessions in the moving average
+
+    Returns:
+        Dict with stigning_per_dag (None if < 2 sessions) and okter
+    """
+    i = ramme.fra(start)
+    maske = ramme.ovelse_id[i:] == ovelse_id
+    if not maske.any():
+        return {"stigning_per_dag": None, "okter": []}
+
+    vekt = ramme.vekt[i:][maske]
+    repetisjoner = ramme.repetisjoner[i:][maske]
+    volum = ramme.volum[i:][maske]
+    e1rm = vekt * (1 + repetisjoner / 30.0)
+
+    dager, dag_nr = np.unique(ramme.dag[i:][maske], return_inverse=True)
+    n = len(dager)
+
+    topp_vekt = np.full(n, -np.inf)
+    np.maximum.at(topp_vekt, dag_nr, vekt)
+    topp_e1rm = np.full(n, -np.inf)
+    np.maximum.at(topp_e1rm, dag_nr, e1rm)
+    dag_volum = np.bincount(dag_nr, weights=volum, minlength=n)
+
+    # Moving average over the last 'vindu' sessions
+    kumulativ = np.concatenate(([0.0], np.cumsum(topp_e1rm)))
+    slutt = np.arange(1, n + 1)
+    fra = np.maximum(slutt - vindu, 0)
+    glidende_snitt = (kumulativ[slutt] - kumulativ[fra]) / (slutt - fra)
+
+    stigning_per_dag = None
+    if n >= 2:
+        x = dager.astype(np.int64).astype(np.float64)
+        x_avvik = x - x.mean()
+        stigning_per_dag = float((x_avvik * (topp_e1rm - topp_e1rm.mean())).sum() / (x_avvik ** 2).sum())
+
+    return {
+        "stigning_per_dag": stigning_per_dag,
+        "okter": [
+            {
+                "dato": str(dager[j]),
+                "topp_vekt": round(float(topp_vekt[j]), 2),
+                "e1rm": round(float(topp_e1rm[j]), 2),
+                "volum": round(float(dag_volum[j]), 2),
+                "e1rm_glidende_snitt": round(float(glidende_snitt[j]), 2)
+            }
+            for j in range(n)
+        ]
+    }
+
+
+# Shared instance for statistics
+treningsrammer = RammeCache(int(TRENINGSRAMME_BUDSJETT_MB * 1024 * 1024))
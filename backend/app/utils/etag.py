@@ -0,0 +1,90 @@
+"""
+Per-user data versioning and ETag handling for statistics endpoints
+
+Every change to a user's training data (logging, imports, equipment
+profiles, ...) bumps brukere.data_versjon. Statistics responses are a
+pure function of that version, the current date (for "last N days"
+windows) and the request URL, so a strong ETag can be derived without
+running any service function.
+"""
+import hashlib
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.models import Bruker
+from app.utils.security import get_current_user
+from app.utils.tidssone import lokal_idag
+
+
+def bump_data_versjon(db: Session, bruker_id: int) -> int:
+    """
+    Increment the user's data version.
+
+    Call this in the same transaction as any change to the user's data.
+    Note: commit happens in the caller.
+
+    Returns:
+        The new data version
+    """
+    return db.execute(
+        update(Bruker)
+        .where(Bruker.bruker_id == bruker_id)
+        .values(data_versjon=Bruker.data_versjon + 1)
+        .returning(Bruker.data_versjon)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+
+def lag_etag(bruker: Bruker, request: Request) -> str:
+    """
+    Build a strong ETag for a per-user statistics response.
+
+    Keyed on user, data version, the current date in the user's time
+    zone and the full request URL (path + sorted query parameters).
+    """
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    nokkel = f"{bruker.bruker_id}:{bruker.data_versjon}:{lokal_idag(bruker.tidssone)}:{request.url.path}?{query}"
+
+    return '"' + hashlib.sha1(nokkel.encode()).hexdigest() + '"'
+
+
+def _matcher(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison)."""
+    if if_none_match.strip() == "*":
+        return True
+
+    for kandidat in if_none_match.split(","):
+        kandidat = kandidat.strip()
+        if kandidat.startswith("W/"):
+            kandidat = kandidat[2:]
+        if kandidat == etag:
+            return True
+
+    return False
+
+
+async def sjekk_etag(
+    request: Request,
+    response: Response,
+    current_user: Bruker = Depends(get_current_user)
+) -> str:
+    """
+    FastAPI dependency for conditional GET on per-user statistics.
+
+    Sets ETag on the response. If the client's If-None-Match matches,
+    responds 304 Not Modified before the endpoint body runs.
+
+    Raises:
+        HTTPException 304: If the client already has the current representation
+    """
+    etag = lag_etag(current_user, request)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matcher(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+
+    return etag
@@ -0,0 +1,91 @@
+"""
+In-process pub/sub for live statistics updates (server-sent events)
+
+Each open /api/statistikk/stream connection subscribes with a bounded
+queue. Endpoints publish small deltas for a user after their changes
+are committed, and every open session of that user receives them.
+
+Publishing and subscribing happen on the event loop, so no locking is
+needed. Fan-out is per worker process: with several workers, a client
+only receives events from logs handled by the worker it is connected to.
+"""
+import asyncio
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Set
+
+
+# Events buffered per connection before the oldest are dropped
+MAKS_KO_LENGDE = 100
+
+
+def _json_standard(verdi: Any):
+    """JSON encoding for Decimal and dates in event payloads."""
+    if isinstance(verdi, Decimal):
+        return float(verdi)
+    if isinstance(verdi, (datetime, date)):
+        return verdi.isoformat()
+    raise TypeError(f"Cannot serialize {type(verdi).__name__}")
+
+
+def formater_sse(hendelse: str, data: Dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {hendelse}\ndata: {json.dumps(data, default=_json_standard)}\n\n"
+
+
+class HendelseHub:
+    """Fan-out of events to all open streams of a user."""
+
+    def __init__(self):
+        self._abonnenter: Dict[int, Set[asyncio.Queue]] = {}
+        self.publisert = 0
+        self.forkastet = 0
+
+    def abonner(self, bruker_id: int) -> asyncio.Queue:
+        """Open a subscription for a user's events."""
+        ko = asyncio.Queue(maxsize=MAKS_KO_LENGDE)
+        self._abonnenter.setdefault(bruker_id, set()).add(ko)
+        return ko
+
+    def avslutt(self, bruker_id: int, ko: asyncio.Queue):
+        """Close a subscription."""
+        koer = self._abonnenter.get(bruker_id)
+        if koer is None:
+            return
+        koer.discard(ko)
+        if not koer:
+            del self._abonnenter[bruker_id]
+
+    def publiser(self, bruker_id: int, hendelse: str, data: Dict):
+        """
+        Send an event to all open streams of a user.
+
+        Never blocks: a slow client loses its oldest buffered events.
+
+        Args:
+            bruker_id: User ID
+            hendelse: Event name (SSE 'event' field)
+            data: JSON-serializable payload
+        """
+        melding = formater_sse(hendelse, data)
+
+        for ko in self._abonnenter.get(bruker_id, ()):
+            if ko.full():
+                ko.get_nowait()
+                self.forkastet += 1
+            ko.put_nowait(melding)
+            self.publisert += 1
+
+    def statistikk(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        return {
+            "brukere": len(self._abonnenter),
+            "strommer": sum(len(koer) for koer in self._abonnenter.values()),
+            "publisert": self.publisert,
+            "forkastet": self.forkastet
+        }
+
+
+# Shared instance for statistics streams
+statistikk_hendelser = HendelseHub()
@@ -0,0 +1,95 @@
+"""
+In-process scheduler for periodic background jobs
+
+Jobs are blocking functions (typically opening their own SessionLocal)
+run in the threadpool at a fixed interval, so the event loop is never
+blocked. Each job runs once at startup and then every interval seconds.
+
+Jobs are per worker process: with several workers each runs its own.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List
+
+from starlette.concurrency import run_in_threadpool
+
+
+class _Jobb:
+    """One registered job with its run counters."""
+
+    def __init__(self, navn: str, intervall_sekunder: float, fn: Callable[[], Any]):
+        self.navn = navn
+        self.intervall_sekunder = intervall_sekunder
+        self.fn = fn
+
+        self.kjoringer = 0
+        self.feil = 0
+        self.siste_varighet: float = None
+        self.siste_feil: str = None
+
+
+class Planlegger:
+    """
+    Runs registered jobs periodically on the running event loop.
+
+    Register jobs with legg_til() before start() is called on startup.
+    """
+
+    def __init__(self):
+        self._jobber: List[_Jobb] = []
+        self._oppgaver: List[asyncio.Task] = []
+
+    def legg_til(self, navn: str, intervall_sekunder: float, fn: Callable[[], Any]):
+        """
+        Register a periodic job.
+
+        Args:
+            navn: Job name (used in logs and counters)
+            intervall_sekunder: Seconds between the end of one run and the next
+            fn: Blocking function without arguments
+        """
+        self._jobber.append(_Jobb(navn, intervall_sekunder, fn))
+
+    def start(self):
+        """Start all registered jobs (call from the startup event)."""
+        for jobb in self._jobber:
+            self._oppgaver.append(asyncio.create_task(self._kjor_periodisk(jobb)))
+
+    async def _kjor_periodisk(self, jobb: _Jobb):
+        while True:
+            start = time.monotonic()
+            try:
+                await run_in_threadpool(jobb.fn)
+                jobb.kjoringer += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                jobb.feil += 1
+                jobb.siste_feil = str(e)
+                print(f"Scheduled job '{jobb.navn}' failed: {e}")
+            jobb.siste_varighet = time.monotonic() - start
+
+            await asyncio.sleep(jobb.intervall_sekunder)
+
+    def stopp(self):
+        """Cancel all running jobs (call from the shutdown event)."""
+        for oppgave in self._oppgaver:
+            oppgave.cancel()
+        self._oppgaver.clear()
+
+    def statistikk(self) -> Dict[str, Any]:
+        """Counters per job for monitoring."""
+        return {
+            jobb.navn: {
+                "intervall_sekunder": jobb.intervall_sekunder,
+                "kjoringer": jobb.kjoringer,
+                "feil": jobb.feil,
+                "siste_varighet_sekunder": round(jobb.siste_varighet, 3) if jobb.siste_varighet is not None else None,
+                "siste_feil": jobb.siste_feil
+            }
+            for jobb in self._jobber
+        }
+
+
+# Shared instance, started and stopped in app.main
+planlegger = Planlegger()
@@ -0,0 +1,80 @@
+"""
+Single-flight request coalescing for expensive computations
+
+When several requests ask for the same computation at the same time
+(e.g. the frontend firing /heatmap, /dashboard and
+/antagonistisk-balanse in parallel, retries, multiple tabs), only the
+first one runs it. The others await the same in-flight result.
+
+Keys should include the user's data version, so a computation started
+before a log is never shared with requests made after it.
+"""
+import asyncio
+from typing import Any, Callable, Dict, Hashable
+
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical computations within one process.
+
+    The computation runs in the threadpool so the event loop stays free
+    while it runs, which is what lets concurrent requests join it.
+    """
+
+    def __init__(self):
+        self._pagaende: Dict[Hashable, asyncio.Future] = {}
+        self.ledere = 0  # Computations actually run
+        self.delte = 0  # Requests served from another request's computation
+
+    async def kjor(self, nokkel: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run fn(*args), or join an in-flight run with the same key.
+
+        Args:
+            nokkel: Coalescing key, e.g. (bruker_id, "heatmap", data_versjon)
+            fn: Blocking function to run
+            *args: Arguments passed to fn
+
+        Returns:
+            The result of fn (shared between all coalesced callers)
+        """
+        fremtid = self._pagaende.get(nokkel)
+        if fremtid is not None:
+            self.delte += 1
+            return await asyncio.shield(fremtid)
+
+        fremtid = asyncio.get_running_loop().create_future()
+        # Mark exceptions as retrieved when nobody joined the computation
+        fremtid.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pagaende[nokkel] = fremtid
+        self.ledere += 1
+
+        try:
+            resultat = await run_in_threadpool(fn, *args)
+        except asyncio.CancelledError:
+            fremtid.cancel()
+            raise
+        except Exception as e:
+            fremtid.set_exception(e)
+            raise
+        else:
+            fremtid.set_result(resultat)
+            return resultat
+        finally:
+            self._pagaende.pop(nokkel, None)
+
+    def statistikk(self) -> Dict[str, Any]:
+        """Counters for monitoring the coalescing rate."""
+        totalt = self.ledere + self.delte
+        return {
+            "beregninger": self.ledere,
+            "delte_svar": self.delte,
+            "pagaende": len(self._pagaende),
+            "sammenslaingsrate": round(self.delte / totalt, 4) if totalt else 0.0
+        }
+
+
+# Shared instance for statistics endpoints
+statistikk_singleflight = SingleFlight()
@@ -0,0 +1,221 @@
+"""
+Stale-while-revalidate snapshot store for statistics results
+
+Heavier analytics (long-range volume, per-muscle details) are served
+from the last computed snapshot:
+
+- Current snapshot (same user data version and UTC date): returned
+  directly; once older than the route's staleness budget a background
+  recompute is scheduled (drift of "last N days" windows)
+- Outdated snapshot (older data version or date) computed within the
+  budget: returned immediately as stale, and a background recompute is
+  scheduled, so the first read after a log does not wait
+- No snapshot, or an outdated one older than the budget: computed
+  synchronously
+
+A stale result does not match the current ETag, so callers must not
+send the ETag with it (see api/statistikk._fra_snapshot).
+
+Memory is bounded with LRU eviction by user, and by key (route +
+parameters) within a user.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Bruker
+
+
+# Max number of users kept in the store (least recently used are evicted)
+SNAPSHOT_MAKS_BRUKERE = int(os.getenv("SNAPSHOT_MAKS_BRUKERE", "1000"))
+
+# Max snapshots (route + parameters) kept per user (least recently used are evicted)
+SNAPSHOT_MAKS_PER_BRUKER = int(os.getenv("SNAPSHOT_MAKS_PER_BRUKER", "20"))
+
+# Staleness budget per route in seconds
+SNAPSHOT_BUDSJETT_SEKUNDER = {
+    "volum-over-tid": float(os.getenv("SNAPSHOT_BUDSJETT_VOLUM_OVER_TID", "60")),
+    "muskel": float(os.getenv("SNAPSHOT_BUDSJETT_MUSKEL", "30")),
+}
+
+
+class _Snapshot:
+    """One computed result with the version and time it was computed for."""
+
+    __slots__ = ("verdi", "data_versjon", "dato", "beregnet")
+
+    def __init__(self, verdi: Any, data_versjon: int):
+        self.verdi = verdi
+        self.data_versjon = data_versjon
+        self.dato = datetime.utcnow().date()
+        self.beregnet = time.monotonic()
+
+
+class SnapshotLager:
+    """
+    Per-user snapshot store with background refresh and LRU eviction.
+
+    Thread-safe: used from threadpool workers and the refresher threads.
+    """
+
+    def __init__(self, maks_brukere: int, maks_per_bruker: int, budsjetter: Dict[str, float]):
+        self.maks_brukere = maks_brukere
+        self.maks_per_bruker = maks_per_bruker
+        self.budsjetter = budsjetter
+
+        self._lock = threading.Lock()
+        self._brukere: "OrderedDict[int, OrderedDict[Hashable, _Snapshot]]" = OrderedDict()
+        self._oppfrisker = ThreadPoolExecutor(max_workers=2, thread_name_prefix="snapshot")
+        self._pagaende = set()
+
+        self.treff = 0
+        self.foreldet = 0
+        self.bom = 0
+        self.oppfriskinger = 0
+        self.utkastelser = 0
+
+    def hent(
+        self,
+        db: Session,
+        bruker_id: int,
+        data_versjon: int,
+        rute: str,
+        params: Hashable,
+        fn: Callable[..., Any],
+        *args
+    ) -> Tuple[Any, bool]:
+        """
+        Get a result from the store, computing it on a miss.
+
+        Args:
+            db: Database session (used only on a miss)
+            bruker_id: User ID
+            data_versjon: User's current data version
+            rute: Route name, selects the staleness budget
+            params: Hashable route parameters (part of the key)
+            fn: Function computing the result as fn(db, *args)
+            *args: Arguments passed to fn after db
+
+        Returns:
+            (result, gjeldende) - gjeldende is False if the result was
+            computed for an older data version or date
+        """
+        nokkel = (rute, params)
+
+        with self._lock:
+            snapshots = self._brukere.get(bruker_id)
+            snapshot = snapshots.get(nokkel) if snapshots is not None else None
+            if snapshot is not None:
+                self._brukere.move_to_end(bruker_id)
+                snapshots.move_to_end(nokkel)
+
+        if snapshot is not None:
+            gjeldende = (
+                snapshot.data_versjon == data_versjon
+                and snapshot.dato == datetime.utcnow().date()
+            )
+            innenfor_budsjett = time.monotonic() - snapshot.beregnet <= self.budsjetter.get(rute, 0)
+
+            if gjeldende:
+                if innenfor_budsjett:
+                    self.treff += 1
+                else:
+                    self.foreldet += 1
+                    self._planlegg_oppfrisking(bruker_id, nokkel, fn, args)
+                return snapshot.verdi, True
+
+            if innenfor_budsjett:
+                self.foreldet += 1
+                self._planlegg_oppfrisking(bruker_id, nokkel, fn, args)
+                return snapshot.verdi, False
+
+        self.bom += 1
+        verdi = fn(db, *args)
+        self._lagre(bruker_id, nokkel, _Snapshot(verdi, data_versjon))
+
+        return verdi, True
+
+    def _lagre(self, bruker_id: int, nokkel: Hashable, snapshot: _Snapshot):
+        """Store a snapshot and evict least recently used keys and users if needed."""
+        with self._lock:
+            snapshots = self._brukere.setdefault(bruker_id, OrderedDict())
+            snapshots[nokkel] = snapshot
+            snapshots.move_to_end(nokkel)
+            self._brukere.move_to_end(bruker_id)
+
+            while len(snapshots) > self.maks_per_bruker:
+                snapshots.popitem(last=False)
+                self.utkastelser += 1
+
+            while len(self._brukere) > self.maks_brukere:
+                self._brukere.popitem(last=False)
+                self.utkastelser += 1
+
+    def _planlegg_oppfrisking(self, bruker_id: int, nokkel: Hashable, fn: Callable[..., Any], args: tuple):
+        """Schedule a background recompute (at most one per key at a time)."""
+        with self._lock:
+            if (bruker_id, nokkel) in self._pagaende:
+                return
+            self._pagaende.add((bruker_id, nokkel))
+
+        self._oppfrisker.submit(self._oppfrisk, bruker_id, nokkel, fn, args)
+
+    def _oppfrisk(self, bruker_id: int, nokkel: Hashable, fn: Callable[..., Any], args: tuple):
+        """Recompute a snapshot with its own database session."""
+        db = SessionLocal()
+        try:
+            # Read the version before computing, so a log racing with the
+            # recompute makes the snapshot invalid rather than wrongly fresh
+            data_versjon = db.query(Bruker.data_versjon).filter(
+                Bruker.bruker_id == bruker_id
+            ).scalar()
+
+            verdi = fn(db, *args)
+            self._lagre(bruker_id, nokkel, _Snapshot(verdi, data_versjon))
+            self.oppfriskinger += 1
+        except Exception as e:
+            print(f"Snapshot refresh failed for user {bruker_id} {nokkel}: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._pagaende.discard((bruker_id, nokkel))
+
+    def glem_bruker(self, bruker_id: int):
+        """Drop all snapshots for a user."""
+        with self._lock:
+            self._brukere.pop(bruker_id, None)
+
+    def statistikk(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        with self._lock:
+            antall_snapshots = sum(len(s) for s in self._brukere.values())
+            antall_brukere = len(self._brukere)
+
+        return {
+            "brukere": antall_brukere,
+            "snapshots": antall_snapshots,
+            "treff": self.treff,
+            "foreldet": self.foreldet,
+            "bom": self.bom,
+            "oppfriskinger": self.oppfriskinger,
+            "utkastelser": self.utkastelser,
+            "maks_per_bruker": self.maks_per_bruker,
+            "budsjetter_sekunder": dict(self.budsjetter)
+        }
+
+    def stopp(self):
+        """Stop the background refresher (on application shutdown)."""
+        self._oppfrisker.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared instance for statistics endpoints
+statistikk_snapshots = SnapshotLager(
+    SNAPSHOT_MAKS_BRUKERE, SNAPSHOT_MAKS_PER_BRUKER, SNAPSHOT_BUDSJETT_SEKUNDER
+)
@@ -0,0 +1,52 @@
+"""
+Per-user time zones for day grouping
+
+Timestamps in the log are naive UTC. A log belongs to the calendar day
+in the user's time zone (brukere.tidssone), so an evening workout in
+Norway is not moved to the next day. The conversion is done in SQL:
+
+    ((tidspunkt AT TIME ZONE 'UTC') AT TIME ZONE <tidssone>)::date
+
+ix_ovelser_utfort_bruker_lokal_dato indexes this expression for
+STANDARD_TIDSSONE, so day lookups for users in the default zone are
+index scans on the local date.
+"""
+from datetime import date, datetime, time, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import Date, cast, func
+
+
+STANDARD_TIDSSONE = "Europe/Oslo"
+
+
+def lokal_dato(tidspunkt, tidssone: str):
+    """
+    SQL expression for the local calendar date of a naive UTC timestamp.
+
+    Args:
+        tidspunkt: Timestamp column or expression
+        tidssone: IANA time zone name (e.g. 'Europe/Oslo')
+
+    Returns:
+        SQLAlchemy expression of type DATE
+    """
+    return cast(func.timezone(tidssone, func.timezone("UTC", tidspunkt)), Date)
+
+
+def lokal_idag(tidssone: str) -> date:
+    """Today's date in the given time zone."""
+    return datetime.now(ZoneInfo(tidssone)).date()
+
+
+def dagstart_utc(dato: date, tidssone: str) -> datetime:
+    """Start of a local calendar day as a naive UTC timestamp (for range filters on tidspunkt)."""
+    return datetime.combine(dato, time.min, ZoneInfo(tidssone)).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def er_gyldig_tidssone(navn: str) -> bool:
+    """True if navn is a known IANA time zone."""
+    try:
+        ZoneInfo(navn)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
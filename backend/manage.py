@@ -6,6 +6,8 @@ Usage:
     python manage.py create-admin          # Create first admin user
     python manage.py create-invitation     # Create invitation code
     python manage.py list-users            # List all users
+    python manage.py partitions [--detach-older-than N]  # Maintain log partitions
+    python manage.py archive [--older-than N]            # Move old log rows to cold storage
 """
 import sys
 import os
@@ -263,6 +265,89 @@ def list_invitations():
         db.close()
 
 
+def partitions():
+    """Create upcoming log partitions and optionally detach old ones"""
+    from app.services.partisjoner import (
+        hent_partisjoner,
+        opprett_fremtidige_partisjoner,
+        koble_fra_gamle_partisjoner,
+        PARTISJON_MANEDER_FREMOVER
+    )
+
+    print("=" * 70)
+    print("PARTITION MAINTENANCE (ovelser_utfort)")
+    print("=" * 70)
+
+    eldre_enn_maneder = None
+    if "--detach-older-than" in sys.argv:
+        try:
+            eldre_enn_maneder = int(sys.argv[sys.argv.index("--detach-older-than") + 1])
+        except (IndexError, ValueError):
+            print("❌ --detach-older-than needs a number of months")
+            return
+
+    db = SessionLocal()
+
+    try:
+        opprettet = opprett_fremtidige_partisjoner(db)
+        print(f"\nCreated {len(opprettet)} partition(s) (up to {PARTISJON_MANEDER_FREMOVER} months ahead)")
+        for navn, flyttet in opprettet:
+            print(f"   + {navn}" + (f" (moved {flyttet} rows from the default partition)" if flyttet else ""))
+
+        if eldre_enn_maneder is not None:
+            frakoblet = koble_fra_gamle_partisjoner(db, eldre_enn_maneder)
+            print(f"\nDetached {len(frakoblet)} partition(s) older than {eldre_enn_maneder} months")
+            for navn in frakoblet:
+                print(f"   - {navn} (kept as a standalone table)")
+
+        db.commit()
+
+        print("\nAttached partitions:")
+        for partisjon in hent_partisjoner(db):
+            print(f"   {partisjon['navn']}  ~{partisjon['estimerte_rader']} rows")
+        print()
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def archive():
+    """Move old log rows into compressed segment files"""
+    from app.services.arkiv import arkiver_gamle_rader, ARKIV_HORISONT_MANEDER, ARKIV_KATALOG
+
+    print("=" * 70)
+    print("ARCHIVE OLD LOG ROWS (ovelser_utfort)")
+    print("=" * 70)
+
+    maneder = ARKIV_HORISONT_MANEDER
+    if "--older-than" in sys.argv:
+        try:
+            maneder = int(sys.argv[sys.argv.index("--older-than") + 1])
+        except (IndexError, ValueError):
+            print("❌ --older-than needs a number of months")
+            return
+
+    db = SessionLocal()
+
+    try:
+        arkivert = arkiver_gamle_rader(db, maneder)
+
+        print(f"\nArchived rows older than {maneder} months into {ARKIV_KATALOG.resolve()}")
+        for bruker in arkivert:
+            print(f"   [{bruker['bruker_id']}] {bruker['rader']} rows in {bruker['segmenter']} segment(s)")
+        print(f"\nTotal: {sum(b['rader'] for b in arkivert)} rows for {len(arkivert)} user(s)")
+        print()
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 def show_help():
     """Show help message"""
     print("=" * 70)
@@ -273,6 +358,10 @@ def show_help():
     print("  create-invitation    Create an invitation code")
     print("  list-users           List all users")
     print("  list-invitations     List all invitation codes")
+    print("  partitions           Create upcoming log partitions")
+    print("                       (--detach-older-than N: detach months older than N)")
+    print("  archive              Move old log rows to compressed segment files")
+    print("                       (--older-than N: months to keep in the database)")
     print("  help                 Show this help message")
     print("\nUsage:")
     print("  python manage.py <command>")
@@ -295,6 +384,8 @@ def main():
         'create-invitation': create_invitation,
         'list-users': list_users,
         'list-invitations': list_invitations,
+        'partitions': partitions,
+        'archive': archive,
         'help': show_help,
     }
 
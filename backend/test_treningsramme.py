@@ -0,0 +1,62 @@
+"""
+Tests for the columnar training frame (no database needed)
+
+Run with: pytest test_treningsramme.py
+"""
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.treningsramme import Treningsramme, volum_over_tid, progresjon
+
+
+FRA = datetime(2026, 1, 1)
+
+
+def _ramme() -> Treningsramme:
+    # (tidspunkt, dag, ovelse_id, sett, repetisjoner, vekt)
+    rader = [
+        (datetime(2026, 1, 5, 17, 0), date(2026, 1, 5), 1, 3, 10, Decimal("50")),
+        (datetime(2026, 1, 5, 17, 20), date(2026, 1, 5), 2, 3, 8, Decimal("30")),
+        (datetime(2026, 1, 7, 17, 0), date(2026, 1, 7), 1, 3, 8, Decimal("60")),
+        (datetime(2026, 1, 9, 23, 30), date(2026, 1, 10), 1, 3, 5, Decimal("70")),
+    ]
+    return Treningsramme(rader, data_versjon=4, tidssone="Europe/Oslo", fra=FRA)
+
+
+def test_vindu_fra():
+    ramme = _ramme()
+    assert ramme.vindu_fra == FRA
+    assert ramme.fra(datetime(2026, 1, 6)) == 2
+
+
+def test_volum_over_tid():
+    resultat = volum_over_tid(_ramme(), FRA, "dag")
+
+    assert resultat == [
+        {"dato": "2026-01-05", "total_volum": 2220.0, "antall_ovelser": 2},
+        {"dato": "2026-01-07", "total_volum": 1440.0, "antall_ovelser": 1},
+        {"dato": "2026-01-10", "total_volum": 1050.0, "antall_ovelser": 1},
+    ]
+    assert volum_over_tid(_ramme(), datetime(2026, 2, 1), "dag") == []
+
+
+def test_progresjon():
+    resultat = progresjon(_ramme(), 1, datetime(2026, 1, 6), vindu=2)
+
+    assert [okt["dato"] for okt in resultat["okter"]] == ["2026-01-07", "2026-01-10"]
+    assert resultat["okter"][0]["topp_vekt"] == 60.0
+    assert resultat["okter"][1]["e1rm_glidende_snitt"] == round((60 * (1 + 8 / 30) + 70 * (1 + 5 / 30)) / 2, 2)
+    assert resultat["stigning_per_dag"] > 0
+
+
+def test_progresjon_etter_legg_til():
+    ramme = _ramme()
+    ramme.legg_til(datetime(2026, 1, 12, 16, 0), 1, 3, 5, Decimal("75"))
+
+    resultat = progresjon(ramme, 1, FRA, vindu=3)
+
+    assert resultat["okter"][-1]["dato"] == "2026-01-12"
+    assert resultat["okter"][-1]["topp_vekt"] == 75.0